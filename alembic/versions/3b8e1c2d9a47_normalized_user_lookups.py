@@ -0,0 +1,61 @@
+"""normalized user lookups
+
+Revision ID: 3b8e1c2d9a47
+Revises: f032d5f6656f
+Create Date: 2026-10-18 09:12:41.307215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e1c2d9a47'
+down_revision: Union[str, Sequence[str], None] = 'f032d5f6656f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _case_duplicates(conn, column: str) -> list:
+    # values the UPDATEs below would fold together, breaking a unique index
+    return conn.execute(sa.text(
+        f"SELECT lower({column}), count(*) FROM users GROUP BY lower({column}) HAVING count(*) > 1"
+    )).all()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # read-only check first, so a conflict stops the upgrade before any change
+    conn = op.get_bind()
+    duplicates = [
+        f"{column} {value!r} ({count} users)"
+        for column in ('username', 'email')
+        for value, count in _case_duplicates(conn, column)
+    ]
+    if duplicates:
+        raise RuntimeError(
+            "users differing only by case must be merged or renamed before this upgrade: "
+            + ", ".join(duplicates)
+        )
+
+    # lower(username) in a real column with its own unique index, so
+    # case-insensitive lookups are an index seek instead of a full scan
+    op.add_column('users', sa.Column('username_normalized', sa.String(length=100), nullable=True))
+    op.execute("UPDATE users SET username_normalized = lower(username)")
+    # emails are lowercased on write; bring older rows in line so the
+    # existing unique index on email serves plain equality lookups
+    op.execute("UPDATE users SET email = lower(email)")
+
+    # batch mode so SQLite can rebuild the table for the NOT NULL change
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('username_normalized', existing_type=sa.String(length=100), nullable=False)
+        batch_op.create_index('ix_users_username_normalized', ['username_normalized'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_index('ix_users_username_normalized')
+        batch_op.drop_column('username_normalized')
@@ -0,0 +1,34 @@
+"""user history indexes
+
+Revision ID: 5c7e2a9b4f10
+Revises: 9d4f6a1e2b73
+Create Date: 2026-10-18 15:02:47.530918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c7e2a9b4f10'
+down_revision: Union[str, Sequence[str], None] = '9d4f6a1e2b73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# per-user history, newest first: keyset pages walk (user_id, created_at)
+HISTORY_TABLES = ('drawings', 'ai_results', 'flipbooks')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in HISTORY_TABLES:
+        op.create_index(f'ix_{table}_user_id_created_at', table, ['user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in HISTORY_TABLES:
+        op.drop_index(f'ix_{table}_user_id_created_at', table_name=table)
@@ -0,0 +1,112 @@
+"""renormalize user lookups
+
+Revision ID: 8f2b6d0c3e15
+Revises: c41d7e9a2f58
+Create Date: 2026-10-18 19:05:33.918402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2b6d0c3e15'
+down_revision: Union[str, Sequence[str], None] = 'c41d7e9a2f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 1000
+
+users = sa.table(
+    'users',
+    sa.column('id', sa.String),
+    sa.column('username', sa.String),
+    sa.column('username_normalized', sa.String),
+    sa.column('email', sa.String),
+)
+
+
+def _normalize(value) -> str:
+    # as app.crud normalizes on every write and lookup
+    return (value or '').strip().lower()
+
+
+def _pending_changes(conn) -> dict:
+    # id -> (username_normalized, email) for the rows that change, read in
+    # primary-key order BATCH_SIZE rows at a time
+    changes = {}
+    after = ''
+    while True:
+        rows = conn.execute(
+            sa.select(users.c.id, users.c.username, users.c.username_normalized, users.c.email)
+            .where(users.c.id > after)
+            .order_by(users.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        for id_, username, normalized, email in rows:
+            wanted = (_normalize(username), _normalize(email))
+            if wanted != (normalized, email):
+                changes[id_] = wanted
+        if len(rows) < BATCH_SIZE:
+            return changes
+        after = rows[-1][0]
+
+
+def _collisions(conn, changes: dict) -> list:
+    # new values that would break a unique index: shared by two changed rows,
+    # or already held by a row that keeps its value
+    problems = []
+    for position, column in ((0, users.c.username_normalized), (1, users.c.email)):
+        claimed = {}
+        for id_, values in changes.items():
+            claimed.setdefault(values[position], []).append(id_)
+        values = list(claimed)
+        for i in range(0, len(values), BATCH_SIZE):
+            chunk = values[i:i + BATCH_SIZE]
+            for id_, value in conn.execute(sa.select(users.c.id, column).where(column.in_(chunk))):
+                # a case-insensitive collation (MySQL) can match other casings
+                ids = claimed.get(value) or claimed.get(_normalize(value))
+                if ids is not None and id_ not in changes and id_ not in ids:
+                    ids.append(id_)
+        problems.extend(
+            f"{column.name} {value!r} (users {', '.join(sorted(ids))})"
+            for value, ids in claimed.items() if len(ids) > 1
+        )
+    return problems
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 3b8e1c2d9a47 backfilled with SQL lower(), which only folds ASCII on
+    # SQLite: "Émile" stayed unfolded and could no longer match a lookup.
+    # Redo both columns with the Python normalization, after checking that
+    # no two users end up with the same value.
+    conn = op.get_bind()
+    changes = _pending_changes(conn)
+    problems = _collisions(conn, changes)
+    if problems:
+        raise RuntimeError(
+            "users that only differ by case must be merged or renamed before this upgrade: "
+            + "; ".join(problems)
+        )
+
+    update = (
+        users.update()
+        .where(users.c.id == sa.bindparam('b_id'))
+        .values(username_normalized=sa.bindparam('b_username'), email=sa.bindparam('b_email'))
+    )
+    items = list(changes.items())
+    for i in range(0, len(items), BATCH_SIZE):
+        conn.execute(update, [
+            {'b_id': id_, 'b_username': username, 'b_email': email}
+            for id_, (username, email) in items[i:i + BATCH_SIZE]
+        ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # data only; the normalized values stay valid
+    pass
@@ -0,0 +1,34 @@
+"""flipbook frame order index
+
+Revision ID: 9d4f6a1e2b73
+Revises: 3b8e1c2d9a47
+Create Date: 2026-10-18 11:40:05.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f6a1e2b73'
+down_revision: Union[str, Sequence[str], None] = '3b8e1c2d9a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # frames are read back in frame_number order with keyset pagination
+    op.create_index(
+        'ix_flipbook_frames_flipbook_id_frame_number',
+        'flipbook_frames',
+        ['flipbook_id', 'frame_number'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_flipbook_frames_flipbook_id_frame_number', table_name='flipbook_frames')
@@ -0,0 +1,29 @@
+"""flipbook frame deltas
+
+Revision ID: c41d7e9a2f58
+Revises: 5c7e2a9b4f10
+Create Date: 2026-10-18 17:40:12.204611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d7e9a2f58'
+down_revision: Union[str, Sequence[str], None] = '5c7e2a9b4f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL: a whole frame; otherwise a delta on the chain starting at that frame_number
+    op.add_column('flipbook_frames', sa.Column('keyframe', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('flipbook_frames', 'keyframe')
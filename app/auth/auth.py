@@ -1,13 +1,17 @@
+import os
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.database import get_async_db, get_db
 from app.models.models import User    # add models when newly created
 from app.crud import crud
+from app.auth.hashing import password_context
+from app.services.lru_cache import LRUCache
 
 # JWT config (use environment vars in prod)
 SECRET_KEY = "your-secret-key"
@@ -16,14 +20,22 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 1080
 REFRESH_TOKEN_EXPIRE_DAYS = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")  # ***
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login", auto_error=False)
+
+# Principal cache: user id -> column snapshot, so get_current_user can
+# resolve a token without a DB round trip. Entries are dropped when the
+# user row is updated or deleted through the ORM; the TTL bounds how stale
+# another worker's copy can get.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "300"))
+principal_cache = LRUCache(max_entries=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 def create_token(data: dict, expires_delta: timedelta) -> str:
     to_encode = data.copy()
@@ -31,23 +43,88 @@ def create_token(data: dict, expires_delta: timedelta) -> str:
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def decode_access_token(token: str) -> Optional[str]:
+def decode_token_claims(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        return username
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
-    username = decode_access_token(token)
-    if username is None:
+def decode_access_token(token: str) -> Optional[str]:
+    payload = decode_token_claims(token)
+    return payload.get("sub") if payload else None
+
+# ---------------- PRINCIPAL CACHE ---------------- #
+
+def _snapshot(user: User) -> dict:
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+def _from_snapshot(db: Session, snapshot: dict) -> User:
+    # Rebuild a detached User and attach it to this session without a SELECT;
+    # relationships still lazy-load through `db` if a route touches them.
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+def invalidate_principal(user_id: str) -> None:
+    principal_cache.invalidate(user_id)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _user_changed(mapper, connection, target):
+    invalidate_principal(target.id)
+
+def _token_claims(token: str) -> dict:
+    claims = decode_token_claims(token)
+    if claims is None or claims.get("sub") is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    user = crud.get_user_by_username(db, username)
+    return claims
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+    claims = _token_claims(token)
+    user_id = claims.get("uid")
+    if user_id:
+        snapshot = principal_cache.get(user_id)
+        if snapshot is not None:
+            return _from_snapshot(db, snapshot)
+        user = crud.get_user_by_id(db, user_id)
+    else:
+        # tokens issued before "uid" was added to the claims
+        user = crud.get_user_by_username(db, claims["sub"])
+
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
\ No newline at end of file
+    principal_cache.set(user.id, _snapshot(user))
+    return user
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> User:
+    # get_current_user for async routes: a cache miss is looked up on the
+    # request's AsyncSession, so the route never checks out a sync connection.
+    # The User is detached; only its columns are loaded.
+    claims = _token_claims(token)
+    user_id = claims.get("uid")
+    if user_id:
+        snapshot = principal_cache.get(user_id)
+        if snapshot is not None:
+            user = User(**snapshot)
+            make_transient_to_detached(user)
+            return user
+        user = await crud.get_user_by_id_async(db, user_id)
+    else:
+        user = await crud.get_user_by_username_async(db, claims["sub"])
+
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    principal_cache.set(user.id, _snapshot(user))
+    return user
+
+def get_optional_user_id(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[str]:
+    # For routes that work anonymously but attribute work to a signed-in
+    # user: the token's "uid" claim, no DB lookup
+    claims = decode_token_claims(token) if token else None
+    return claims.get("uid") if claims else None
@@ -0,0 +1,130 @@
+import os
+import time
+from contextlib import asynccontextmanager
+from app.services.metrics import observe_span
+from app.services.process_pool import BoundedProcessPool
+
+# bcrypt costs ~250 ms of CPU per call. /login and /register run it on a
+# small dedicated process pool instead of inline on the shared anyio
+# threadpool, so a login burst can't starve every other sync route.
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "32"))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "10"))
+HASH_PER_IP_LIMIT = int(os.getenv("HASH_PER_IP_LIMIT", "4"))
+
+hashing_pool = BoundedProcessPool(
+    max_workers=HASH_WORKERS,
+    max_pending=HASH_MAX_PENDING,
+    timeout=HASH_TIMEOUT,
+)
+
+_pwd_context = None
+
+
+class TooManyHashRequests(Exception):
+    """Raised when one client already has HASH_PER_IP_LIMIT hashes in flight."""
+
+
+# ---------------- WORKER SIDE ---------------- #
+
+def password_context():
+    # the process's one CryptContext, built (and passlib imported) on first use
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
+def _hash_job(password: str):
+    start = time.perf_counter()
+    hashed = password_context().hash(password)
+    return hashed, time.perf_counter() - start
+
+
+def _verify_job(plain_password: str, hashed_password: str):
+    start = time.perf_counter()
+    ok = password_context().verify(plain_password, hashed_password)
+    return ok, time.perf_counter() - start
+
+
+# ---------------- METRICS ---------------- #
+
+class _Timings:
+    def __init__(self):
+        self.calls = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hash_total = 0.0
+        self.hash_max = 0.0
+
+    def record(self, elapsed: float, hash_time: float):
+        # time spent queued = round trip minus the worker's own bcrypt time
+        wait = max(0.0, elapsed - hash_time)
+        self.calls += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        self.hash_total += hash_time
+        self.hash_max = max(self.hash_max, hash_time)
+
+    def stats(self) -> dict:
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "queue_wait_avg_ms": round(self.wait_total / calls * 1000, 3),
+            "queue_wait_max_ms": round(self.wait_max * 1000, 3),
+            "hash_avg_ms": round(self.hash_total / calls * 1000, 3),
+            "hash_max_ms": round(self.hash_max * 1000, 3),
+        }
+
+
+timings = {"hash": _Timings(), "verify": _Timings()}
+_in_flight = {}  # client ip -> hashes running or queued
+rate_limited = 0
+
+
+@asynccontextmanager
+async def _client_slot(client_ip: str):
+    global rate_limited
+    if _in_flight.get(client_ip, 0) >= HASH_PER_IP_LIMIT:
+        rate_limited += 1
+        raise TooManyHashRequests(client_ip)
+    _in_flight[client_ip] = _in_flight.get(client_ip, 0) + 1
+    try:
+        yield
+    finally:
+        _in_flight[client_ip] -= 1
+        if not _in_flight[client_ip]:
+            del _in_flight[client_ip]
+
+
+async def _run(kind: str, client_ip: str, fn, *args):
+    async with _client_slot(client_ip):
+        start = time.perf_counter()
+        result, hash_time = await hashing_pool.run(fn, *args)
+        elapsed = time.perf_counter() - start
+        timings[kind].record(elapsed, hash_time)
+        observe_span(f"password.{kind}", hash_time)
+        observe_span(f"password.{kind}_queue", max(0.0, elapsed - hash_time))
+        return result
+
+
+# ---------------- ASYNC API ---------------- #
+
+async def hash_password_async(password: str, client_ip: str = "") -> str:
+    return await _run("hash", client_ip, _hash_job, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str, client_ip: str = "") -> bool:
+    return await _run("verify", client_ip, _verify_job, plain_password, hashed_password)
+
+
+def hashing_stats() -> dict:
+    return {
+        "pool": hashing_pool.stats(),
+        "per_ip_rejected": rate_limited,
+        "clients_in_flight": len(_in_flight),
+        **{kind: t.stats() for kind, t in timings.items()},
+    }
@@ -1,20 +1,17 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from passlib.context import CryptContext
-from app.models.models import User
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, func, insert, or_, select
+from app.auth.hashing import password_context
+from app.models.models import User, Drawing, AIResult, Flipbook, FlipbookFrame
 
 # -----------------------------
 # User CRUD
 # -----------------------------
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 def _clean_email(email: str) -> str:
     return (email or "").strip().lower()
@@ -22,20 +19,26 @@ def _clean_email(email: str) -> str:
 def _clean_username(username: str) -> str:
     return (username or "").strip()
 
+def _normalize_username(username: str) -> str:
+    return _clean_username(username).lower()
+
 def _clean_name(name: str) -> str:
     return (name or "").strip()
 
-def create_user(db: Session, name: str, email: str, username: str, password: str) -> User:
+def create_user(db: Session, name: str, email: str, username: str, password: str, hashed_password: str = None) -> User:
     # Normalize inputs (validation is mostly handled in schemas, but keep safe here too)
     name = _clean_name(name)
     email = _clean_email(email)
     username = _clean_username(username)
 
-    hashed_password = hash_password(password)
+    # callers on the async path hash off-thread (app.auth.hashing) and pass the result
+    if hashed_password is None:
+        hashed_password = hash_password(password)
     db_user = User(
         name=name,
         email=email,
         username=username,
+        username_normalized=_normalize_username(username),
         password=hashed_password
     )
     db.add(db_user)
@@ -44,14 +47,169 @@ def create_user(db: Session, name: str, email: str, username: str, password: str
     return db_user
 
 def get_user_by_email(db: Session, email: str) -> User:
-    email = _clean_email(email)
-    # case-insensitive compare
-    return db.query(User).filter(func.lower(User.email) == email).first()
+    # emails are stored lowercased, so this is a seek on the unique email index
+    return db.query(User).filter(User.email == _clean_email(email)).first()
 
 def get_user_by_username(db: Session, username: str) -> User:
-    username = _clean_username(username)
-    # case-insensitive compare to avoid "Harsh" vs "harsh"
-    return db.query(User).filter(func.lower(User.username) == username.lower()).first()
+    # case-insensitive ("Harsh" vs "harsh") via the indexed lower(username) column
+    return db.query(User).filter(User.username_normalized == _normalize_username(username)).first()
 
 def get_user_by_id(db: Session, user_id: str) -> User:
-    return db.query(User).filter(User.id == user_id).first()
+    # primary-key lookup, served from the session identity map when possible
+    return db.get(User, user_id)
+
+async def get_user_by_username_async(db, username: str) -> User:
+    # get_user_by_username on an AsyncSession (app.database.get_async_db)
+    query = select(User).where(User.username_normalized == _normalize_username(username)).limit(1)
+    return (await db.execute(query)).scalars().first()
+
+async def get_user_by_id_async(db, user_id: str) -> User:
+    return await db.get(User, user_id)
+
+# -----------------------------
+# Drawing CRUD
+# -----------------------------
+
+def create_drawing(db: Session, user_id: str, filename: str) -> Drawing:
+    db_drawing = Drawing(user_id=user_id, filename=filename)
+    db.add(db_drawing)
+    db.commit()
+    db.refresh(db_drawing)
+    return db_drawing
+
+def get_drawing(db: Session, drawing_id: str) -> Drawing:
+    return db.get(Drawing, drawing_id)
+
+# -----------------------------
+# Flipbook CRUD
+# -----------------------------
+
+def create_flipbook(db: Session, user_id: str, title: str) -> Flipbook:
+    db_flipbook = Flipbook(user_id=user_id, title=title.strip())
+    db.add(db_flipbook)
+    db.commit()
+    db.refresh(db_flipbook)
+    return db_flipbook
+
+def get_flipbook(db: Session, flipbook_id: str) -> Flipbook:
+    return db.get(Flipbook, flipbook_id)
+
+def next_frame_number(db: Session, flipbook_id: str) -> int:
+    last = db.query(func.max(FlipbookFrame.frame_number)).filter(FlipbookFrame.flipbook_id == flipbook_id).scalar()
+    return 0 if last is None else last + 1
+
+def bulk_insert_frames(db: Session, rows: list, commit: bool = True) -> None:
+    # one executemany INSERT for the whole batch; commit=False leaves the
+    # transaction open for further batches
+    if rows:
+        db.execute(insert(FlipbookFrame), rows)
+        if commit:
+            db.commit()
+
+def frames_exist(db: Session, flipbook_id: str, first: int, last: int) -> bool:
+    # any frame numbered first..last, on the (flipbook_id, frame_number) index
+    return db.query(
+        db.query(FlipbookFrame.id)
+        .filter(
+            FlipbookFrame.flipbook_id == flipbook_id,
+            FlipbookFrame.frame_number >= first,
+            FlipbookFrame.frame_number <= last,
+        )
+        .exists()
+    ).scalar()
+
+def list_frames(db: Session, flipbook_id: str, after: int = -1, limit: int = 100) -> list:
+    # keyset page over (flipbook_id, frame_number); cost doesn't grow with `after`
+    return (
+        db.query(FlipbookFrame.frame_number, FlipbookFrame.filename)
+        .filter(FlipbookFrame.flipbook_id == flipbook_id, FlipbookFrame.frame_number > after)
+        .order_by(FlipbookFrame.frame_number)
+        .limit(limit)
+        .all()
+    )
+
+def list_frames_encoded(db: Session, flipbook_id: str, after: int = -1, limit: int = 100) -> list:
+    # list_frames plus the keyframe column delta-encoded frames need
+    return (
+        db.query(FlipbookFrame.frame_number, FlipbookFrame.filename, FlipbookFrame.keyframe)
+        .filter(FlipbookFrame.flipbook_id == flipbook_id, FlipbookFrame.frame_number > after)
+        .order_by(FlipbookFrame.frame_number)
+        .limit(limit)
+        .all()
+    )
+
+def frame_chain(db: Session, flipbook_id: str, keyframe: int, frame_number: int) -> list:
+    # a keyframe and its delta frames up to frame_number, one index range scan
+    return (
+        db.query(FlipbookFrame.frame_number, FlipbookFrame.filename, FlipbookFrame.keyframe)
+        .filter(
+            FlipbookFrame.flipbook_id == flipbook_id,
+            FlipbookFrame.frame_number >= keyframe,
+            FlipbookFrame.frame_number <= frame_number,
+        )
+        .order_by(FlipbookFrame.frame_number)
+        .all()
+    )
+
+def get_frame(db: Session, flipbook_id: str, frame_number: int) -> FlipbookFrame:
+    return (
+        db.query(FlipbookFrame)
+        .filter(FlipbookFrame.flipbook_id == flipbook_id, FlipbookFrame.frame_number == frame_number)
+        .first()
+    )
+
+# -----------------------------
+# AIResult CRUD
+# -----------------------------
+
+def bulk_insert_ai_results(db: Session, rows: list) -> None:
+    # a single multi-row INSERT ... VALUES (...), (...) for the whole batch
+    if rows:
+        db.execute(insert(AIResult).values(rows))
+        db.commit()
+
+
+# -----------------------------
+# Per-user history (keyset pages)
+# -----------------------------
+
+def _history_query(model, user_id: str, before, limit: int, *options):
+    # Newest first on (created_at, id), served by ix_<table>_user_id_created_at.
+    # `before` is the (created_at, id) of the previous page's last row.
+    # Selects up to limit + 1 rows; the extra row only signals another page.
+    query = select(model).filter(model.user_id == user_id)
+    if before is not None:
+        created_at, row_id = before
+        query = query.filter(or_(
+            model.created_at < created_at,
+            and_(model.created_at == created_at, model.id < row_id),
+        ))
+    return (
+        query.options(*options)
+        .order_by(model.created_at.desc(), model.id.desc())
+        .limit(limit + 1)
+    )
+
+def _history_page(db: Session, model, user_id: str, before, limit: int, *options) -> list:
+    return db.execute(_history_query(model, user_id, before, limit, *options)).scalars().all()
+
+async def _history_page_async(db, model, user_id: str, before, limit: int) -> list:
+    # same page on an AsyncSession (app.database.get_async_db)
+    return (await db.execute(_history_query(model, user_id, before, limit))).scalars().all()
+
+def list_drawings(db: Session, user_id: str, before=None, limit: int = 50) -> list:
+    return _history_page(db, Drawing, user_id, before, limit)
+
+def list_ai_results(db: Session, user_id: str, before=None, limit: int = 50) -> list:
+    return _history_page(db, AIResult, user_id, before, limit)
+
+async def list_drawings_async(db, user_id: str, before=None, limit: int = 50) -> list:
+    return await _history_page_async(db, Drawing, user_id, before, limit)
+
+async def list_ai_results_async(db, user_id: str, before=None, limit: int = 50) -> list:
+    return await _history_page_async(db, AIResult, user_id, before, limit)
+
+def list_flipbooks(db: Session, user_id: str, before=None, limit: int = 50, with_frames: bool = False) -> list:
+    # with_frames: one extra SELECT ... WHERE flipbook_id IN (...) for the page
+    options = [selectinload(Flipbook.frames)] if with_frames else []
+    return _history_page(db, Flipbook, user_id, before, limit, *options)
@@ -1,24 +1,160 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Optional
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
 from dotenv import load_dotenv
+from app.services.metrics import observe_span
 
 # Load .env
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-print("DATABASE_URL:", DATABASE_URL)
 
-# SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+
+# Pool settings, from DB_* environment variables (DB_POOL_SIZE, ...)
+class DatabaseSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_prefix="DB_")
+
+    pool_size: int = 10
+    max_overflow: int = 20
+    pool_recycle: int = 1800      # seconds; stay under MySQL's wait_timeout
+    pool_pre_ping: bool = True
+    pool_timeout: float = 30      # seconds to wait for a free connection
+    async_url: Optional[str] = None  # defaults to DATABASE_URL with an async driver
+    create_tables: bool = True    # create missing tables at startup; off when Alembic owns the schema
+
+
+settings = DatabaseSettings()
+
+
+# ---------------- POOL CHECKOUT METRICS ---------------- #
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, seconds: float):
+        self.checkouts += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+
+pool_metrics = PoolMetrics()
+
+
+def _timed_connect(pool_cls):
+    # Pool.connect() is where a request blocks when every connection is out
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return pool_cls.connect(self)
+        except exc.TimeoutError:
+            pool_metrics.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            pool_metrics.record(elapsed)
+            observe_span("db.pool_checkout", elapsed)
+    return connect
+
+
+class TimedQueuePool(QueuePool):
+    connect = _timed_connect(QueuePool)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    connect = _timed_connect(AsyncAdaptedQueuePool)
+
+
+def _engine_options(url, poolclass) -> dict:
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # in-memory SQLite keeps its single-connection pool
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pool_pre_ping,
+        "pool_timeout": settings.pool_timeout,
+    }
+
+
+# SQL execution time for every engine (async ones run through a sync Engine too)
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    observe_span("db.sql", time.perf_counter() - conn.info["query_start"].pop())
+
+@event.listens_for(Engine, "handle_error")
+def _sql_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+# ---------------- ENGINE ---------------- #
+# Built on first use rather than at import, so importing the app (a worker
+# booting, a script, Alembic) opens no pool. One shared engine per process.
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, TimedQueuePool))
+    return _engine
+
+
+class _LazySessionmaker(sessionmaker):
+    # binds to the shared engine when the first session is opened
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_engine())
+        return super().__call__(**local_kw)
+
+
+def __getattr__(name):
+    # `from app.database import engine` still works, building it on demand
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = _LazySessionmaker(autocommit=False, autoflush=False)
 
 # Declarative Base
 Base = declarative_base()
 
+_schema_checked = False
+
+
+def ensure_schema():
+    # create missing tables, once per process (app startup); skipped with
+    # DB_CREATE_TABLES=false when migrations manage the schema
+    global _schema_checked
+    if settings.create_tables and not _schema_checked:
+        Base.metadata.create_all(bind=get_engine())
+        _schema_checked = True
+
 # Dependency for FastAPI
 def get_db():
     db = SessionLocal()
@@ -26,3 +162,57 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---------------- ASYNC ENGINE (optional) ---------------- #
+# Needs aiomysql / aiosqlite; only built when a route asks for get_async_db.
+
+_ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def async_database_url() -> str:
+    if settings.async_url:
+        return settings.async_url
+    url = make_url(DATABASE_URL)
+    return url.set(drivername=_ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)).render_as_string(hide_password=False)
+
+
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = async_database_url()
+        _async_engine = create_async_engine(url, **_engine_options(url, TimedAsyncQueuePool))
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
+
+async def get_async_db():
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    # app shutdown: close the async pool (aiosqlite keeps a thread per connection)
+    global _async_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+
+
+def pool_stats() -> dict:
+    pool = get_engine().pool
+    checkouts = pool_metrics.checkouts or 1
+    stats = {
+        "checkouts": pool_metrics.checkouts,
+        "timeouts": pool_metrics.timeouts,
+        "checkout_wait_avg_ms": round(pool_metrics.wait_total / checkouts * 1000, 3),
+        "checkout_wait_max_ms": round(pool_metrics.wait_max * 1000, 3),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    return stats
@@ -1,34 +1,111 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import Base, engine
+from starlette.concurrency import run_in_threadpool
+from app.database import dispose_async_engine, ensure_schema, pool_metrics
 from app.routes import routes
 from app.routes.ai_drawing import router as ai_router
+from app.routes.flipbooks import router as flipbook_router
+from app.routes.drawings import router as drawing_router
 from app.models import models
+from app.services import metrics
+from app.services.fast_json import FastJSONResponse
+from app.services.recognition import recognition_pool
+from app.services.recognition_cache import get_recognition_cache
+from app.auth.hashing import hashing_pool
+from app.services import flipbook_render
+from app.services.write_behind import ai_result_writer
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+# The app is built by create_app(); importing this module only builds the
+# routes. The database engine, password hashing context and worker pools
+# are created on first use, and the schema check runs once at startup.
 
-app = FastAPI(
-    title="GESTURE API",
-    description="Backend for the project",
-    version="1.0.0"
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # create missing tables (DB_CREATE_TABLES=false leaves it to Alembic)
+    await run_in_threadpool(ensure_schema)
+    yield
+    # stop recognition / password hashing workers and queued flipbook renders
+    recognition_pool.shutdown()
+    hashing_pool.shutdown()
+    flipbook_render.shutdown()
+    # write out queued AIResult rows
+    ai_result_writer.close()
+    await dispose_async_engine()
 
-# CORS settings
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173", "http://localhost:5174"],  # frontend URL
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Include existing routes
-app.include_router(routes.router, tags=["public"])
-
-# ✅ INCLUDE AI DRAWING ROUTES (THIS WAS MISSING)
-app.include_router(ai_router)
-
-@app.get("/")
 def read_root():
     return {"message": "Gesture API is running"}
+
+
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(
+        title="GESTURE API",
+        description="Backend for the project",
+        version="1.0.0",
+        default_response_class=FastJSONResponse,
+        lifespan=lifespan
+    )
+
+    # CORS settings
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:5173", "http://localhost:5174"],  # frontend URL
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Per-route latency histograms and named spans, served on /metrics
+    app.add_middleware(metrics.TimingMiddleware)
+
+    app.include_router(routes.router, tags=["public"])
+    app.include_router(ai_router)
+    app.include_router(flipbook_router, tags=["Flipbooks"])
+    app.include_router(drawing_router, tags=["Drawings"])
+
+    app.add_api_route("/", read_root, methods=["GET"])
+    app.add_api_route("/metrics", prometheus_metrics, methods=["GET"], include_in_schema=False)
+    _register_collectors()
+    return app
+
+
+# ---------------- METRICS ---------------- #
+
+def _recognition_cache_counts():
+    cache = get_recognition_cache()
+    stats = cache.stats() if cache else {}
+    return {(k,): stats[k] for k in ("hits", "misses") if k in stats}
+
+
+def _register_collectors():
+    metrics.register_collector(
+        "db_pool_checkouts_total", "counter", "Connections checked out of the pool.",
+        lambda: pool_metrics.checkouts,
+    )
+    metrics.register_collector(
+        "db_pool_timeouts_total", "counter", "Pool checkouts that timed out.",
+        lambda: pool_metrics.timeouts,
+    )
+    metrics.register_collector(
+        "worker_pool_pending", "gauge", "Jobs queued or running per worker pool.",
+        lambda: {("recognition",): recognition_pool.pending, ("hashing",): hashing_pool.pending},
+        labelnames=("pool",),
+    )
+    metrics.register_collector(
+        "recognition_cache_requests_total", "counter", "Recognition cache lookups by result.",
+        _recognition_cache_counts, labelnames=("result",),
+    )
+    metrics.register_collector(
+        "ai_result_rows_total", "counter", "AIResult write-behind rows by outcome.",
+        lambda: {(k,): v for k, v in ai_result_writer.stats().items() if k in ("flushed_rows", "dropped", "failed_rows")},
+        labelnames=("outcome",),
+    )
+
+
+app = create_app()
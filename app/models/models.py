@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -9,6 +9,7 @@ class User(Base):
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String(100), nullable=False)
     username = Column(String(100), unique=True, nullable=False)
+    username_normalized = Column(String(100), unique=True, index=True, nullable=False)  # lower(username)
     email = Column(String(255), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -23,6 +24,9 @@ class Drawing(Base):
     filename = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="drawings")
+    __table_args__ = (
+        Index("ix_drawings_user_id_created_at", "user_id", "created_at"),  # history pages
+    )
 
 class AIResult(Base):
     __tablename__ = "ai_results"
@@ -32,6 +36,9 @@ class AIResult(Base):
     output_filename = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="ai_results")
+    __table_args__ = (
+        Index("ix_ai_results_user_id_created_at", "user_id", "created_at"),  # history pages
+    )
 
 class Flipbook(Base):
     __tablename__ = "flipbooks"
@@ -40,7 +47,13 @@ class Flipbook(Base):
     title = Column(String(255), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     user = relationship("User", back_populates="flipbooks")
-    frames = relationship("FlipbookFrame", back_populates="flipbook", cascade="all, delete-orphan")
+    frames = relationship(
+        "FlipbookFrame", back_populates="flipbook", cascade="all, delete-orphan",
+        order_by="FlipbookFrame.frame_number",
+    )
+    __table_args__ = (
+        Index("ix_flipbooks_user_id_created_at", "user_id", "created_at"),  # history pages
+    )
 
 class FlipbookFrame(Base):
     __tablename__ = "flipbook_frames"
@@ -48,5 +61,11 @@ class FlipbookFrame(Base):
     flipbook_id = Column(String(36), ForeignKey("flipbooks.id"), nullable=False)
     frame_number = Column(Integer, nullable=False)
     filename = Column(String(255), nullable=False)
+    # delta-encoded stroke frames: frame_number of their chain's keyframe
+    keyframe = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     flipbook = relationship("Flipbook", back_populates="frames")
+    __table_args__ = (
+        # playback walks frames in order: keyset pagination on this index
+        Index("ix_flipbook_frames_flipbook_id_frame_number", "flipbook_id", "frame_number", unique=True),
+    )
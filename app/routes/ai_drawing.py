@@ -1,23 +1,331 @@
-from fastapi import APIRouter
-from pydantic import BaseModel
-from typing import List, Dict
+import asyncio
+import math
+import os
+import numpy as np
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.auth.auth import get_current_user_async, get_optional_user_id
+from app.crud import crud
+from app.database import get_async_db
+from app.models.models import User
+from app.schemas.schemas import AIResultPage
+from app.services import pagination
+from app.services.metrics import span
+from app.services.online_recognition import OnlineStroke
+from app.services.fast_json import FastJSONResponse, points_fragment
+from app.services.perfect_drawing_numpy import as_array
+from app.services.process_pool import PoolSaturated
+from app.services.recognition import recognize_jobs, recognize_scene, recognition_stats
+from app.services.stroke_preprocess import MAX_RECOGNITION_POINTS
+from app.services import stroke_wire
+from app.services.write_behind import ai_result_writer, record_ai_results
+
+# longest stroke the stream keeps while it is being drawn
+STREAM_MAX_POINTS = int(os.getenv("STREAM_MAX_POINTS", str(16 * MAX_RECOGNITION_POINTS)))
+# most strokes one /batch or /scene request may carry: they all go to the
+# pool as one job, which RECOGNITION_MAX_PENDING alone can't bound
+MAX_BATCH_STROKES = int(os.getenv("MAX_BATCH_STROKES", "512"))
 
 router = APIRouter()
 
 # ---------- Request Model ----------
+# smoothing_window / simplify_eps mean the same as on PointsRequest
 class StrokeData(BaseModel):
     points: List[Dict[str, float]]
+    smoothing_window: Optional[int] = None
+    simplify_eps: Optional[float] = None
 
-# ---------- AI Endpoint ----------
-@router.post("/ai/perfect-drawing")
-def perfect_drawing(data: StrokeData):
-    points = data.points
+class StrokeBatch(BaseModel):
+    strokes: List[StrokeData]
+
+# ---------- Helpers ----------
+async def _recognition(pending):
+    # Recognition runs in the process pool; map saturation / timeouts to HTTP
+    try:
+        return await pending
+    except PoolSaturated:
+        raise HTTPException(
+            status_code=429,
+            detail="Recognition is busy, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    except asyncio.TimeoutError:
+        # 503, like a timed-out hashing pool: the server is busy, not a gateway
+        raise HTTPException(
+            status_code=503,
+            detail="Recognition timed out, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+async def _parse_json(request: Request, model):
+    body = await request.body()
+    try:
+        with span("request.parse_json"):
+            return model.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        )
+
+async def _decode_binary(request: Request, decode, content_type):
+    try:
+        return decode(await request.body(), content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _check_stroke_count(count):
+    if count > MAX_BATCH_STROKES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch is limited to {MAX_BATCH_STROKES} strokes, got {count}",
+        )
 
-    # For now we return same points (frontend AI handles shapes)
+async def _decode_binary_batch(request: Request, content_type):
+    # the stroke count leads the body, so an oversized batch is turned away
+    # before any of it is decoded
+    body = await request.body()
+    if len(body) >= 4:
+        _check_stroke_count(int.from_bytes(body[:4], "little"))
+    return await _decode_binary(request, stroke_wire.decode_batch, content_type)
+
+def _points_array(points):
+    try:
+        arr = as_array(points)
+    except KeyError:
+        raise HTTPException(status_code=422, detail="Every point needs both x and y")
+    if not np.isfinite(arr).all():
+        raise HTTPException(status_code=422, detail="Point coordinates must be finite numbers")
+    return arr
+
+def _binary_response(results, arrays, content_type, batch):
+    # Snapped points (or the input stroke when nothing snapped) in the
+    # requested encoding. A batch carries each stroke's shape and confidence
+    # in the body (see stroke_wire); a single stroke in two headers.
+    outputs = [arr if result[2] is None else result[2] for result, arr in zip(results, arrays)]
+    if batch:
+        encode = lambda arrs, ct: stroke_wire.encode_batch(arrs, ct, results)
+    else:
+        encode = lambda arrs, ct: stroke_wire.encode_stroke(arrs[0], ct)
+    try:
+        body = encode(outputs, content_type)
+    except ValueError:
+        # too large for int16 deltas
+        content_type = stroke_wire.F32
+        body = encode(outputs, content_type)
+    if batch:
+        return Response(content=body, media_type=content_type)
+    shape, confidence, _ = results[0]
+    return Response(
+        content=body,
+        media_type=content_type,
+        headers={"X-Recognized-As": shape, "X-Confidence": f"{confidence:.4f}"},
+    )
+
+def _json_result(result, arr, points=None):
+    # response dict with smoothed_points pre-serialized from the array; only
+    # FastJSONResponse can render it. When nothing snapped the stroke goes
+    # back as sent: `points` (the request's point dicts, extra keys such as
+    # pressure or t included) if given, else the input array.
+    shape, confidence, smoothed = result
+    if smoothed is None and points is not None:
+        return {"recognized_as": shape, "confidence": confidence, "smoothed_points": points}
     return {
-        "recognized_as": "shape",
-        "confidence": 0.99,
-        "smoothed_points": points
+        "recognized_as": shape,
+        "confidence": confidence,
+        "smoothed_points": points_fragment(arr if smoothed is None else smoothed),
     }
-# Note: The actual AI logic for recognizing and perfecting drawings
-# is handled on the frontend side as per the current implementation.
\ No newline at end of file
+
+def _sent_points(points, strokes):
+    # a scene shape built from one stroke can go back as sent; a joined one can't
+    return points[strokes[0]] if points is not None and len(strokes) == 1 else None
+
+# ---------- AI Endpoint ----------
+# Both endpoints take JSON or a binary stroke encoding (see stroke_wire),
+# picked by Content-Type, and answer in the encoding named by Accept. For
+# binary bodies the preprocessing options come from the query string.
+@router.post("/ai/perfect-drawing")
+async def perfect_drawing(
+    request: Request,
+    smoothing_window: Optional[int] = None,
+    simplify_eps: Optional[float] = None,
+    user_id: Optional[str] = Depends(get_optional_user_id),
+):
+    content_type = stroke_wire.wire_type(request.headers.get("content-type"))
+    points = None
+    if content_type:
+        arr = await _decode_binary(request, stroke_wire.decode_stroke, content_type)
+    else:
+        data = await _parse_json(request, StrokeData)
+        points = data.points
+        arr = _points_array(points)
+        smoothing_window, simplify_eps = data.smoothing_window, data.simplify_eps
+
+    [result] = await _recognition(recognize_jobs([(arr, smoothing_window, simplify_eps)]))
+    record_ai_results(user_id, [arr], [result])
+
+    accept = stroke_wire.wire_type(request.headers.get("accept"))
+    if accept:
+        return _binary_response([result], [arr], accept, batch=False)
+    return FastJSONResponse(_json_result(result, arr, points))
+
+# Recognizes a whole canvas in one round trip; results keep the order of `strokes`.
+@router.post("/ai/perfect-drawing/batch")
+async def perfect_drawing_batch(
+    request: Request,
+    smoothing_window: Optional[int] = None,
+    simplify_eps: Optional[float] = None,
+    user_id: Optional[str] = Depends(get_optional_user_id),
+):
+    content_type = stroke_wire.wire_type(request.headers.get("content-type"))
+    if content_type:
+        arrays = await _decode_binary_batch(request, content_type)
+        jobs = [(arr, smoothing_window, simplify_eps) for arr in arrays]
+        points = [None] * len(arrays)
+    else:
+        data = await _parse_json(request, StrokeBatch)
+        _check_stroke_count(len(data.strokes))
+        points = [s.points for s in data.strokes]
+        arrays = [_points_array(p) for p in points]
+        jobs = [(arr, s.smoothing_window, s.simplify_eps) for arr, s in zip(arrays, data.strokes)]
+
+    results = await _recognition(recognize_jobs(jobs))
+    record_ai_results(user_id, arrays, results)
+
+    accept = stroke_wire.wire_type(request.headers.get("accept"))
+    if accept:
+        return _binary_response(results, arrays, accept, batch=True)
+    return FastJSONResponse({
+        "results": [_json_result(result, arr, p) for result, arr, p in zip(results, arrays, points)]
+    })
+
+# Recognizes a whole canvas, strokes that touch as one shape (a rectangle
+# drawn as four strokes, an arrow as shaft + head) when SHAPE_ENGINE is one
+# of recognition.SCENE_JOIN_ENGINES, else stroke by stroke. Takes the same
+# bodies as /batch; answers JSON only, one entry per shape with the indices
+# of the strokes it was built from.
+@router.post("/ai/perfect-drawing/scene")
+async def perfect_drawing_scene(
+    request: Request,
+    smoothing_window: Optional[int] = None,
+    simplify_eps: Optional[float] = None,
+    user_id: Optional[str] = Depends(get_optional_user_id),
+):
+    content_type = stroke_wire.wire_type(request.headers.get("content-type"))
+    points = None
+    if content_type:
+        arrays = await _decode_binary_batch(request, content_type)
+    else:
+        data = await _parse_json(request, StrokeBatch)
+        _check_stroke_count(len(data.strokes))
+        points = [s.points for s in data.strokes]
+        arrays = [_points_array(p) for p in points]
+        # per-stroke options don't apply once strokes are joined; take the first
+        if data.strokes:
+            smoothing_window = data.strokes[0].smoothing_window
+            simplify_eps = data.strokes[0].simplify_eps
+
+    shapes = await _recognition(recognize_scene(arrays, smoothing_window, simplify_eps))
+    record_ai_results(user_id, [arr for _, arr, _ in shapes], [result for _, _, result in shapes])
+
+    return FastJSONResponse({
+        "shapes": [
+            {"strokes": strokes, **_json_result(result, arr, _sent_points(points, strokes))}
+            for strokes, arr, result in shapes
+        ]
+    })
+
+# Live "snap to shape" while the stroke is drawn. Client messages (JSON):
+#   {"points": [{"x":..,"y":..}, ...]}  more points of the current stroke
+#   {"end": true}                       stroke finished -> final result
+#   {"reset": true}                     discard the current stroke
+# Each points message is answered with a provisional
+# {"type": "provisional", "recognized_as", "confidence", "n_points"} from
+# O(1)-per-point running accumulators; "end" answers with the full pipeline
+# result ({"type": "final", ...}) and starts a new stroke. Invalid messages
+# (not JSON, bad points, a stroke past STREAM_MAX_POINTS) are answered with
+# {"type": "error", "detail"} and otherwise ignored.
+@router.websocket("/ai/perfect-drawing/stream")
+async def perfect_drawing_stream(websocket: WebSocket):
+    await websocket.accept()
+    stroke = OnlineStroke()
+    points = []
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except (ValueError, KeyError):
+                # not JSON, or a binary frame
+                await websocket.send_json({"type": "error", "detail": "Expected a JSON object"})
+                continue
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "detail": "Expected a JSON object"})
+                continue
+
+            if message.get("reset"):
+                stroke.reset()
+                points = []
+                continue
+
+            new_points = message.get("points") or []
+            try:
+                # validate the whole message before touching the accumulators
+                new_points = [{"x": float(p["x"]), "y": float(p["y"])} for p in new_points]
+                if not all(math.isfinite(p["x"]) and math.isfinite(p["y"]) for p in new_points):
+                    raise ValueError("non-finite coordinate")
+            except (KeyError, TypeError, ValueError):
+                await websocket.send_json({"type": "error", "detail": "Every point needs finite x and y"})
+                continue
+            if len(points) + len(new_points) > STREAM_MAX_POINTS:
+                await websocket.send_json({
+                    "type": "error",
+                    "detail": f"Stroke is limited to {STREAM_MAX_POINTS} points; send end or reset",
+                })
+                continue
+            stroke.extend(new_points)
+            points.extend(new_points)
+
+            if message.get("end"):
+                try:
+                    arr = as_array(points)
+                    [result] = await recognize_jobs([(arr, None, None)])
+                    final = {"type": "final", **_json_result(result, arr, points)}
+                    await websocket.send_text(orjson.dumps(final).decode())
+                except (PoolSaturated, asyncio.TimeoutError):
+                    shape, confidence = stroke.classify()
+                    await websocket.send_json({
+                        "type": "final", "recognized_as": shape, "confidence": confidence,
+                        "smoothed_points": points, "provisional": True,
+                    })
+                stroke.reset()
+                points = []
+            elif new_points:
+                shape, confidence = stroke.classify()
+                await websocket.send_json({
+                    "type": "provisional", "recognized_as": shape,
+                    "confidence": confidence, "n_points": stroke.n,
+                })
+    except WebSocketDisconnect:
+        pass
+
+# The user's recorded recognitions, newest first, keyset-paginated by
+# ?cursor=; read-only, on the async session
+@router.get("/ai/results", response_model=AIResultPage)
+async def list_ai_results(
+    cursor: str = None,
+    limit: int = pagination.DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    limit = pagination.page_size(limit)
+    rows = await crud.list_ai_results_async(db, user.id, pagination.before_from(cursor), limit)
+    return {"items": rows[:limit], "next_cursor": pagination.next_cursor(rows, limit)}
+
+# Pool and result-cache counters (hits / misses / evictions), plus the
+# AIResult write-behind queue (flushed / dropped rows)
+@router.get("/ai/perfect-drawing/stats")
+def perfect_drawing_stats():
+    return {**recognition_stats(), "audit": ai_result_writer.stats()}
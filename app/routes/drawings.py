@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.auth.auth import get_current_user, get_current_user_async
+from app.crud import crud
+from app.database import get_async_db, get_db
+from app.models.models import User
+from app.schemas.schemas import DrawingPage, DrawingResponse
+from app.services import pagination
+from app.services.blob_store import blob_response, blob_store
+
+router = APIRouter()
+
+
+# Saves the drawing's bytes in the blob store; re-saving identical content
+# (by anyone) reuses the stored blob.
+@router.post("/drawings", response_model=DrawingResponse)
+async def upload_drawing(
+    file: UploadFile,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    digest = await run_in_threadpool(blob_store.put_file, file.file)
+    return await run_in_threadpool(crud.create_drawing, db, user.id, digest)
+
+
+# The user's drawings, newest first, keyset-paginated by ?cursor=. Read-only,
+# so it runs on the async session instead of taking a threadpool slot.
+@router.get("/drawings", response_model=DrawingPage)
+async def list_drawings(
+    cursor: str = None,
+    limit: int = pagination.DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db),
+    user: User = Depends(get_current_user_async),
+):
+    limit = pagination.page_size(limit)
+    rows = await crud.list_drawings_async(db, user.id, pagination.before_from(cursor), limit)
+    return {"items": rows[:limit], "next_cursor": pagination.next_cursor(rows, limit)}
+
+
+@router.get("/drawings/{drawing_id}/content")
+def get_drawing_content(
+    drawing_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    drawing = crud.get_drawing(db, drawing_id)
+    if not drawing or drawing.user_id != user.id or not blob_store.exists(drawing.filename):
+        raise HTTPException(status_code=404, detail="Drawing not found")
+    return blob_response(request, drawing.filename)
@@ -0,0 +1,297 @@
+import json
+import os
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+
+from app.auth.auth import get_current_user
+from app.crud import crud
+from app.database import SessionLocal, get_db
+from app.models.models import User
+from app.services import flipbook_render, frame_codec, pagination
+from app.services.blob_store import blob_response, blob_store, is_digest
+from app.schemas.schemas import (
+    FlipbookCreate,
+    FlipbookFramePage,
+    FlipbookPage,
+    FlipbookResponse,
+    FrameUploadResponse,
+)
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+FRAMES_DIR = os.path.join(UPLOAD_DIR, "frames")  # frames uploaded before the blob store
+FRAME_BATCH_SIZE = int(os.getenv("FRAME_BATCH_SIZE", "100"))
+MAX_FRAMES_PER_UPLOAD = int(os.getenv("MAX_FRAMES_PER_UPLOAD", "1000"))
+PLAYBACK_PAGE_SIZE = 200
+PREVIEW_MAX_SIZE = 1024
+
+router = APIRouter()
+
+
+# -----------------------------
+# Helpers
+# -----------------------------
+def _owned_flipbook(db: Session, flipbook_id: str, user: User):
+    flipbook = crud.get_flipbook(db, flipbook_id)
+    if not flipbook or flipbook.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Flipbook not found")
+    return flipbook
+
+def _frame_url(flipbook_id: str, frame_number: int) -> str:
+    return f"/flipbooks/{flipbook_id}/frames/{frame_number}"
+
+def _frame_json_response(request: Request, key: str, frame: dict):
+    # a rebuilt delta frame; its content key never changes meaning, like a digest
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(frame_codec.dumps(frame), media_type="application/json", headers=headers)
+
+def _broken_chain(e: ValueError):
+    return HTTPException(status_code=422, detail=f"Flipbook frames can't be rebuilt: {e}")
+
+def _frames_conflict():
+    return HTTPException(status_code=409, detail="Frame numbers already exist in this flipbook")
+
+def _insert_frames(db: Session, rows: list):
+    # batches share one transaction: an upload is stored whole or not at all
+    try:
+        crud.bulk_insert_frames(db, rows, commit=False)
+    except IntegrityError:
+        db.rollback()
+        raise _frames_conflict()
+
+def _commit_frames(db: Session):
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise _frames_conflict()
+
+
+# -----------------------------
+# Flipbook routes
+# -----------------------------
+@router.post("/flipbooks", response_model=FlipbookResponse)
+def create_flipbook(data: FlipbookCreate, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    return crud.create_flipbook(db, user.id, data.title)
+
+
+# The user's flipbooks, newest first, keyset-paginated by ?cursor=.
+# include_frames nests each flipbook's frame list, loaded for the whole page
+# with one selectinload query.
+@router.get("/flipbooks", response_model=FlipbookPage)
+def list_flipbooks(
+    cursor: str = None,
+    limit: int = pagination.DEFAULT_PAGE_SIZE,
+    include_frames: bool = False,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    limit = pagination.page_size(limit)
+    rows = crud.list_flipbooks(db, user.id, pagination.before_from(cursor), limit, with_frames=include_frames)
+    items = []
+    for flipbook in rows[:limit]:
+        item = {"id": flipbook.id, "title": flipbook.title, "created_at": flipbook.created_at}
+        if include_frames:
+            item["frames"] = [
+                {"frame_number": f.frame_number, "url": _frame_url(flipbook.id, f.frame_number)}
+                for f in flipbook.frames
+            ]
+        items.append(item)
+    return {"items": items, "next_cursor": pagination.next_cursor(rows, limit)}
+
+
+# Multipart upload of many frames (repeated "frames" file parts). Frames are
+# numbered in part order from the optional "start_frame" field, or appended
+# after the last frame, and inserted FRAME_BATCH_SIZE rows per statement in
+# one transaction. A range that overlaps existing frames is rejected (409)
+# before anything is stored.
+# Images are streamed into the blob store; stroke JSON frames are stored as
+# deltas against the frame before when that is smaller (frame_codec).
+@router.post("/flipbooks/{flipbook_id}/frames", response_model=FrameUploadResponse)
+async def upload_frames(
+    flipbook_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    await run_in_threadpool(_owned_flipbook, db, flipbook_id, user)
+
+    form = await request.form(max_files=MAX_FRAMES_PER_UPLOAD)
+    try:
+        start_frame = form.get("start_frame")
+        if start_frame is not None:
+            try:
+                next_number = int(start_frame)
+            except ValueError:
+                raise HTTPException(status_code=422, detail="start_frame must be an integer")
+            if next_number < 0:
+                raise HTTPException(status_code=422, detail="start_frame must not be negative")
+            count = sum(1 for _, value in form.multi_items() if isinstance(value, UploadFile))
+            if count and await run_in_threadpool(
+                crud.frames_exist, db, flipbook_id, next_number, next_number + count - 1
+            ):
+                raise _frames_conflict()
+        else:
+            next_number = await run_in_threadpool(crud.next_frame_number, db, flipbook_id)
+        encoder = await run_in_threadpool(frame_codec.FrameEncoder.resume, db, flipbook_id, next_number)
+
+        stored = 0
+        rows = []
+        for _, value in form.multi_items():
+            if not isinstance(value, UploadFile):
+                continue
+            filename, keyframe = await run_in_threadpool(encoder.store, next_number, value.file)
+            rows.append({"flipbook_id": flipbook_id, "frame_number": next_number, "filename": filename, "keyframe": keyframe})
+            next_number += 1
+            if len(rows) >= FRAME_BATCH_SIZE:
+                await run_in_threadpool(_insert_frames, db, rows)
+                stored += len(rows)
+                rows = []
+        if rows:
+            await run_in_threadpool(_insert_frames, db, rows)
+            stored += len(rows)
+        await run_in_threadpool(_commit_frames, db)
+    finally:
+        await form.close()
+
+    return {"flipbook_id": flipbook_id, "frames_stored": stored, "next_frame_number": next_number}
+
+
+# Keyset-paginated frame listing: pass the previous page's next_after.
+@router.get("/flipbooks/{flipbook_id}/frames", response_model=FlipbookFramePage)
+def list_frames(
+    flipbook_id: str,
+    after: int = -1,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    _owned_flipbook(db, flipbook_id, user)
+    limit = max(1, min(limit, 500))
+    frames = crud.list_frames(db, flipbook_id, after, limit)
+    return {
+        "frames": [{"frame_number": n, "url": _frame_url(flipbook_id, n)} for n, _ in frames],
+        "next_after": frames[-1].frame_number if len(frames) == limit else None,
+    }
+
+
+# Delta-encoded frames come back rebuilt as stroke JSON; with ?delta=true the
+# stored delta itself is returned (its "base" names the frame it applies to),
+# for clients that already hold the previous frame.
+@router.get("/flipbooks/{flipbook_id}/frames/{frame_number}")
+def get_frame(
+    flipbook_id: str,
+    frame_number: int,
+    request: Request,
+    delta: bool = False,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    _owned_flipbook(db, flipbook_id, user)
+    frame = crud.get_frame(db, flipbook_id, frame_number)
+    if frame and frame.keyframe is not None:
+        if delta:
+            return blob_response(request, frame.filename, media_type="application/json")
+        try:
+            stored = frame_codec.load_frame(db, frame)
+        except ValueError as e:
+            raise _broken_chain(e)
+        return _frame_json_response(request, stored.key, stored.frame)
+    if frame and is_digest(frame.filename) and blob_store.exists(frame.filename):
+        return blob_response(request, frame.filename)
+    path = frame and os.path.join(FRAMES_DIR, frame.filename)
+    if not path or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Frame not found")
+    return FileResponse(path)
+
+
+# Whole flipbook as NDJSON, one frame per line in frame_number order. The
+# generator pages through the frame index with its own session (the request
+# session is closed before streaming starts), so memory stays flat however
+# many frames there are.
+def _playback_lines(flipbook_id: str):
+    db = SessionLocal()
+    try:
+        after = -1
+        while True:
+            frames = crud.list_frames(db, flipbook_id, after, PLAYBACK_PAGE_SIZE)
+            for frame_number, _ in frames:
+                yield json.dumps({"frame_number": frame_number, "url": _frame_url(flipbook_id, frame_number)}) + "\n"
+            if len(frames) < PLAYBACK_PAGE_SIZE:
+                break
+            after = frames[-1].frame_number
+    finally:
+        db.close()
+
+@router.get("/flipbooks/{flipbook_id}/playback")
+def playback(flipbook_id: str, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    _owned_flipbook(db, flipbook_id, user)
+    return StreamingResponse(_playback_lines(flipbook_id), media_type="application/x-ndjson")
+
+
+# One animated preview (GIF / APNG / sprite sheet) of the whole flipbook.
+# Finished renders are served straight from the blob store; otherwise the
+# render is queued on the background pool and the client retries after 202.
+# A recently failed render answers 422 (unreadable frame) or 500 instead of
+# being queued again. Frames are identified by content key (frame_codec), so
+# the cache check needs no blob reads; delta frames are rebuilt by the render
+# job, not on the request thread.
+def _frame_rows(db: Session, flipbook_id: str) -> list:
+    rows = []
+    after = -1
+    while True:
+        frames = crud.list_frames_encoded(db, flipbook_id, after, PLAYBACK_PAGE_SIZE)
+        rows.extend(frames)
+        if len(frames) < PLAYBACK_PAGE_SIZE:
+            return rows
+        after = frames[-1].frame_number
+
+@router.get("/flipbooks/{flipbook_id}/preview")
+def preview(
+    flipbook_id: str,
+    request: Request,
+    format: str = "gif",
+    fps: int = 12,
+    size: int = 512,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    if format not in flipbook_render.FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {', '.join(flipbook_render.FORMATS)}")
+    fps = max(1, min(fps, 60))
+    size = max(16, min(size, PREVIEW_MAX_SIZE))
+
+    _owned_flipbook(db, flipbook_id, user)
+    rows = _frame_rows(db, flipbook_id)
+    try:
+        keys = frame_codec.content_keys(rows)
+    except ValueError as e:
+        raise _broken_chain(e)
+    digests = [
+        key for (_, filename, keyframe), key in zip(rows, keys)
+        if keyframe is not None or (is_digest(filename) and blob_store.exists(filename))
+    ]
+    if not digests:
+        raise HTTPException(status_code=404, detail="Flipbook has no frames")
+
+    key = flipbook_render.render_key(digests, format, size, fps)
+    output = flipbook_render.cached_output(key)
+    if output:
+        return blob_response(request, output, media_type=flipbook_render.FORMATS[format])
+    failure = flipbook_render.render_failure(key)
+    if failure:
+        status = 422 if failure.bad_input else 500
+        raise HTTPException(status_code=status, detail=f"Preview render failed: {failure.message}")
+
+    try:
+        flipbook_render.schedule_render(key, digests, format, size, fps, partial(frame_codec.rebuild, rows, keys))
+    except flipbook_render.RenderQueueFull:
+        raise HTTPException(status_code=429, detail="Render queue is full", headers={"Retry-After": "5"})
+    return JSONResponse(status_code=202, content={"status": "rendering", "frames": len(digests)}, headers={"Retry-After": "1"})
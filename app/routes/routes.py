@@ -1,16 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import os
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 
 from app.crud import crud
 from app.database import get_db
 from app.models.models import User
 from app.auth.auth import get_current_user, create_token
+from app.auth.hashing import TooManyHashRequests, hash_password_async, verify_password_async
+from app.services.process_pool import PoolSaturated
 from app.schemas.schemas import UserCreate, UserResponse
 from app.routes.ai_drawing import router as ai_router
 
 ACCESS_TOKEN_EXPIRE_MINUTES = 1080
+# HASH_PER_IP_LIMIT counts hashes per client address. Behind a reverse proxy
+# every request comes from the proxy, so name the header it puts the real
+# address in (X-Forwarded-For, X-Real-IP); only set this when the proxy
+# always writes it, clients can send it too.
+CLIENT_IP_HEADER = os.getenv("CLIENT_IP_HEADER", "").strip()
 
 router = APIRouter()
 
@@ -18,50 +28,89 @@ router = APIRouter()
 router.include_router(ai_router, prefix="/ai", tags=["AI Drawing"])
 
 
+# -----------------------------
+# Password hashing
+# -----------------------------
+# bcrypt runs on the hashing process pool; the routes only await it. DB calls
+# stay sync and go through the threadpool, so the event loop never blocks.
+
+async def _hashing(job):
+    try:
+        return await job
+    except (TooManyHashRequests, PoolSaturated):
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    except asyncio.TimeoutError:
+        # a timed-out worker pool is 503, here and on the recognition routes
+        raise HTTPException(
+            status_code=503,
+            detail="Authentication is busy, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+def _client_ip(request: Request) -> str:
+    if CLIENT_IP_HEADER:
+        # the proxy appends the address it saw last; anything before that
+        # came from the client
+        forwarded = request.headers.get(CLIENT_IP_HEADER, "").split(",")[-1].strip()
+        if forwarded:
+            return forwarded
+    return request.client.host if request.client else ""
+
+
 # -----------------------------
 # Register route
 # -----------------------------
 from sqlalchemy.exc import IntegrityError
 
-@router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
-    email = (user.email or "").strip().lower()
-    username = (user.username or "").strip()
-
+def _check_available(db: Session, email: str, username: str):
     if crud.get_user_by_email(db, email):
         raise HTTPException(status_code=409, detail="Email already exists")
 
     if crud.get_user_by_username(db, username):
         raise HTTPException(status_code=409, detail="Username already exists")
 
+def _insert_user(db: Session, user: UserCreate, email: str, username: str, hashed_password: str):
     try:
-        new_user = crud.create_user(db, user.name, email, username, user.password)
-        return new_user
+        return crud.create_user(db, user.name, email, username, user.password, hashed_password=hashed_password)
     except IntegrityError:
         db.rollback()
         # if DB unique constraint triggers anyway
         raise HTTPException(status_code=409, detail="Email or username already exists")
 
+@router.post("/register", response_model=UserResponse)
+async def register(user: UserCreate, request: Request, db: Session = Depends(get_db)):
+    email = (user.email or "").strip().lower()
+    username = (user.username or "").strip()
+
+    await run_in_threadpool(_check_available, db, email, username)
+    hashed_password = await _hashing(hash_password_async(user.password, _client_ip(request)))
+    return await run_in_threadpool(_insert_user, db, user, email, username, hashed_password)
+
 
 # -----------------------------
 # Login route
 # -----------------------------
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     username = (form_data.username or "").strip()
     password = form_data.password or ""
 
     if not username or not password:
         raise HTTPException(status_code=400, detail="Username and password are required")
 
-    db_user = crud.get_user_by_username(db, username)
-    if not db_user or not crud.verify_password(password, db_user.password):
+    db_user = await run_in_threadpool(crud.get_user_by_username, db, username)
+    if not db_user or not await _hashing(
+        verify_password_async(password, db_user.password, _client_ip(request))
+    ):
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_token(
-        data={"sub": db_user.username},
+        data={"sub": db_user.username, "uid": db_user.id},
         expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
-
@@ -104,3 +104,88 @@ class PointsRequest(BaseModel):
     class Config:
         from_attributes = True
         orm_mode = True
+
+# -----------------------------
+# Drawing Schemas
+# -----------------------------
+class DrawingResponse(BaseModel):
+    id: str
+    filename: str  # content hash in the blob store
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+# newest first; pass next_cursor back as ?cursor= for the following page
+class DrawingPage(BaseModel):
+    items: List[DrawingResponse]
+    next_cursor: Optional[str] = None
+
+
+# -----------------------------
+# AI Result Schemas
+# -----------------------------
+class AIResultResponse(BaseModel):
+    id: str
+    output_filename: str  # recognition response JSON in the blob store
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AIResultPage(BaseModel):
+    items: List[AIResultResponse]
+    next_cursor: Optional[str] = None
+
+
+# -----------------------------
+# Flipbook Schemas
+# -----------------------------
+class FlipbookCreate(BaseModel):
+    title: str
+
+    @field_validator("title")
+    @classmethod
+    def title_valid(cls, v: str):
+        v = (v or "").strip()
+        if not v:
+            raise ValueError("Title is required")
+        if len(v) > 255:
+            raise ValueError("Title must be max 255 characters")
+        return v
+
+
+class FlipbookResponse(BaseModel):
+    id: str
+    title: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class FlipbookFrameResponse(BaseModel):
+    frame_number: int
+    url: str
+
+
+class FlipbookFramePage(BaseModel):
+    frames: List[FlipbookFrameResponse]
+    next_after: Optional[int] = None
+
+
+class FlipbookSummary(FlipbookResponse):
+    frames: Optional[List[FlipbookFrameResponse]] = None  # only with include_frames
+
+
+class FlipbookPage(BaseModel):
+    items: List[FlipbookSummary]
+    next_cursor: Optional[str] = None
+
+
+class FrameUploadResponse(BaseModel):
+    flipbook_id: str
+    frames_stored: int
+    next_frame_number: int
@@ -0,0 +1,141 @@
+import hashlib
+import io
+import mmap
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+# Local content-addressed blob store. A blob lives at
+# BLOB_DIR/<aa>/<bb>/<sha256>, so identical frames or re-saved drawings are
+# stored once no matter which user uploads them. Writes go to a temp file
+# in the same filesystem and are renamed into place, so readers never see a
+# partial blob.
+
+BLOB_DIR = os.getenv("BLOB_DIR", os.path.join(os.getenv("UPLOAD_DIR", "uploads"), "blobs"))
+CHUNK_SIZE = 1024 * 1024
+
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_digest(value: str) -> bool:
+    return bool(value) and bool(_DIGEST_RE.match(value))
+
+
+class BlobStore:
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        if not is_digest(digest):
+            raise ValueError(f"Not a blob digest: {digest!r}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.isfile(self.path(digest))
+
+    def put_file(self, fileobj) -> str:
+        # Stream into a temp file while hashing, then publish it atomically
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        h = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = fileobj.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    out.write(chunk)
+                out.flush()
+                os.fsync(out.fileno())
+            return self._publish(tmp_path, h.hexdigest())
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def put_bytes(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        if self.exists(digest):
+            return digest
+        return self.put_file(io.BytesIO(data))
+
+    def _publish(self, tmp_path: str, digest: str) -> str:
+        final = self.path(digest)
+        if not os.path.exists(final):
+            os.makedirs(os.path.dirname(final), exist_ok=True)
+            # atomic on POSIX; a concurrent writer of the same content just
+            # replaces identical bytes
+            os.replace(tmp_path, final)
+        return digest
+
+    @contextmanager
+    def open_mmap(self, digest: str):
+        # Read-only mapping: callers slice it without copying into Python bytes
+        with open(self.path(digest), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def read_bytes(self, digest: str) -> bytes:
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+
+blob_store = BlobStore(BLOB_DIR)
+
+
+# ---------------- HTTP ---------------- #
+
+class BlobResponse(FileResponse):
+    # Hands the file to the server via the ASGI "http.response.pathsend"
+    # extension when available (sendfile(2) under the hood); otherwise
+    # FileResponse streams it, including Range requests.
+    async def __call__(self, scope, receive, send):
+        pathsend = "http.response.pathsend" in scope.get("extensions", {})
+        has_range = any(name == b"range" for name, _ in scope.get("headers", []))
+        if not pathsend or has_range or scope["method"].upper() == "HEAD":
+            return await super().__call__(scope, receive, send)
+
+        self.set_stat_headers(os.stat(self.path))
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+
+
+_MAGIC = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"RIFF", "image/webp"),
+    (b"{", "application/json"),
+    (b"[", "application/json"),
+)
+
+
+def sniff_media_type(digest: str) -> str:
+    with open(blob_store.path(digest), "rb") as f:
+        head = f.read(16)
+    for magic, media_type in _MAGIC:
+        if head.startswith(magic):
+            return media_type
+    return "application/octet-stream"
+
+
+def blob_response(request: Request, digest: str, media_type: str = None, filename: str = None):
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return BlobResponse(
+        blob_store.path(digest),
+        media_type=media_type or sniff_media_type(digest),
+        filename=filename,
+        headers=headers,
+        content_disposition_type="inline",
+    )
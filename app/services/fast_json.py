@@ -0,0 +1,38 @@
+import numpy as np
+import orjson
+from fastapi.responses import ORJSONResponse
+
+# orjson-backed responses. Point lists are the bulk of recognition
+# responses, so they are written straight from the (N, 2) array: orjson
+# formats the flat float array once, and the {"x":..,"y":..} framing is
+# interleaved as bytes. No dict per point, no pydantic pass over the result.
+
+_FIRST = b'[{"x":'
+_NEXT = b'},{"x":'
+_Y = b',"y":'
+
+
+def points_json(arr) -> bytes:
+    # [{"x": .., "y": ..}, ...] for an (N, 2) float array. Coordinates must
+    # be finite (the routes reject anything else): orjson writes NaN as null.
+    arr = np.asarray(arr, dtype=np.float64).reshape(-1, 2)
+    if len(arr) == 0:
+        return b"[]"
+    numbers = orjson.dumps(np.ascontiguousarray(arr).ravel(), option=orjson.OPT_SERIALIZE_NUMPY)[1:-1].split(b",")
+    framing = [_NEXT, _Y] * len(arr)
+    framing[0] = _FIRST
+    parts = [None] * (2 * len(numbers))
+    parts[0::2] = framing
+    parts[1::2] = numbers
+    return b"".join(parts) + b"}]"
+
+
+def points_fragment(arr) -> orjson.Fragment:
+    # embeddable in any content passed to ORJSONResponse
+    return orjson.Fragment(points_json(arr))
+
+
+class FastJSONResponse(ORJSONResponse):
+    # default response class: orjson, with numpy values serialized natively
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
@@ -0,0 +1,237 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageDraw
+from app.services.blob_store import blob_store
+from app.services.lru_cache import LRUCache
+
+# Server-side flipbook preview: the ordered frames (images or stroke JSON,
+# both stored as blobs) become one animated GIF / APNG or a sprite sheet.
+#
+# - Outputs are content-addressed: the render key hashes the output options
+#   and the ordered frame digests, and points at the output blob. Unchanged
+#   flipbooks are one cached download.
+# - Each frame's raster is cached by (frame digest, size), so after editing
+#   a few frames only those are decoded / rasterized again. Delta-encoded
+#   stroke frames (frame_codec) are keyed by their content key in place of a
+#   digest; the render rebuilds them through `load_sources`.
+# - Renders run on a small background thread pool (Pillow releases the GIL
+#   while encoding), so the request only schedules work: rebuilding delta
+#   frames happens in the render job too.
+# - A failed render is remembered for RENDER_FAILURE_TTL seconds, so polling
+#   clients get the error instead of the same render being retried.
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+RENDER_MAX_PENDING = int(os.getenv("RENDER_MAX_PENDING", "8"))
+RENDER_FRAME_CACHE_BYTES = int(os.getenv("RENDER_FRAME_CACHE_BYTES", str(256 * 1024 * 1024)))
+RENDER_FAILURE_TTL = float(os.getenv("RENDER_FAILURE_TTL", "60"))
+
+FORMATS = {"gif": "image/gif", "apng": "image/apng", "sprite": "image/png"}
+STROKE_WIDTH = 3
+
+_executor = None
+_pending = {}  # render key -> Future
+_lock = threading.Lock()
+_failures = LRUCache(max_entries=1024, ttl=RENDER_FAILURE_TTL)  # render key -> RenderFailure
+logger = logging.getLogger(__name__)
+frame_cache = LRUCache(
+    max_entries=100_000,
+    max_bytes=RENDER_FRAME_CACHE_BYTES,
+    sizeof=lambda image: image.width * image.height * len(image.getbands()),
+)
+
+
+class RenderQueueFull(Exception):
+    """Raised when RENDER_MAX_PENDING renders are already queued or running."""
+
+
+class FrameDecodeError(Exception):
+    """Raised when a frame can't be decoded or rasterized."""
+
+
+class RenderFailure:
+    # why a render key failed; `bad_input` when a frame was unreadable
+    def __init__(self, message: str, bad_input: bool):
+        self.message = message
+        self.bad_input = bad_input
+
+
+def render_key(digests, fmt: str, size: int, fps: int) -> str:
+    h = hashlib.sha256(f"{fmt}|{size}|{fps}|".encode())
+    for digest in digests:
+        h.update(digest.encode())
+    return h.hexdigest()
+
+
+def _index_path(key: str) -> str:
+    return os.path.join(blob_store.root, "renders", key[:2], key)
+
+
+def cached_output(key: str):
+    # digest of a finished render, or None
+    try:
+        with open(_index_path(key)) as f:
+            digest = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return digest if blob_store.exists(digest) else None
+
+
+def _record_output(key: str, digest: str):
+    path = _index_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(digest)
+    os.replace(tmp, path)
+
+
+# ---------------- FRAME RASTERS ---------------- #
+
+def _stroke_points(stroke):
+    points = stroke.get("points", []) if isinstance(stroke, dict) else stroke
+    return [(p["x"], p["y"]) for p in points]
+
+
+def _rasterize_strokes(frame: dict, size: int) -> Image.Image:
+    strokes = [_stroke_points(s) for s in frame.get("strokes", [])]
+    width, height = frame.get("width"), frame.get("height")
+    if not width or not height:
+        xs = [x for s in strokes for x, _ in s] or [0]
+        ys = [y for s in strokes for _, y in s] or [0]
+        width, height = max(xs) + STROKE_WIDTH, max(ys) + STROKE_WIDTH
+    scale = size / max(width, height, 1)
+
+    image = Image.new("RGB", (max(1, round(width * scale)), max(1, round(height * scale))), "white")
+    draw = ImageDraw.Draw(image)
+    for points in strokes:
+        scaled = [(x * scale, y * scale) for x, y in points]
+        if len(scaled) > 1:
+            draw.line(scaled, fill="black", width=STROKE_WIDTH, joint="curve")
+        elif scaled:
+            draw.point(scaled, fill="black")
+    return image
+
+
+def _load_frame(digest: str, size: int) -> Image.Image:
+    with blob_store.open_mmap(digest) as data:
+        head = bytes(data[:1])
+        if head in (b"{", b"["):
+            frame = json.loads(bytes(data))
+            if isinstance(frame, list):
+                frame = {"strokes": frame}
+            return _rasterize_strokes(frame, size)
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert("RGB")
+            image.thumbnail((size, size))
+            return image
+
+
+def frame_raster(digest: str, size: int, frame: dict = None) -> Image.Image:
+    # `frame`: the parsed stroke frame, when `digest` isn't a stored blob
+    key = (digest, size)
+    image = frame_cache.get(key)
+    if image is None:
+        image = _rasterize_strokes(frame, size) if frame is not None else _load_frame(digest, size)
+        frame_cache.set(key, image)
+    return image
+
+
+# ---------------- OUTPUT ---------------- #
+
+def _fit(image: Image.Image, canvas_size) -> Image.Image:
+    if image.size == canvas_size:
+        return image
+    canvas = Image.new("RGB", canvas_size, "white")
+    fitted = image.copy()
+    fitted.thumbnail(canvas_size)
+    canvas.paste(fitted, ((canvas_size[0] - fitted.width) // 2, (canvas_size[1] - fitted.height) // 2))
+    return canvas
+
+
+def render(digests, fmt: str, size: int, fps: int, sources: dict = None) -> bytes:
+    sources = sources or {}
+    frames = []
+    for i, digest in enumerate(digests):
+        try:
+            frames.append(frame_raster(digest, size, sources.get(digest)))
+        except Exception as e:
+            raise FrameDecodeError(f"frame {i} ({digest[:12]}) could not be read: {e}") from e
+    canvas_size = frames[0].size
+    frames = [_fit(frame, canvas_size) for frame in frames]
+    out = io.BytesIO()
+
+    if fmt == "sprite":
+        cols = max(1, int(len(frames) ** 0.5 + 0.999))
+        rows = (len(frames) + cols - 1) // cols
+        sheet = Image.new("RGB", (cols * canvas_size[0], rows * canvas_size[1]), "white")
+        for i, frame in enumerate(frames):
+            sheet.paste(frame, ((i % cols) * canvas_size[0], (i // cols) * canvas_size[1]))
+        sheet.save(out, format="PNG", optimize=True)
+    else:
+        duration = max(1, round(1000 / fps))
+        frames[0].save(
+            out,
+            format="GIF" if fmt == "gif" else "PNG",
+            save_all=True,
+            append_images=frames[1:],
+            duration=duration,
+            loop=0,
+        )
+    return out.getvalue()
+
+
+def _sources(load_sources) -> dict:
+    # a broken delta chain (missing or corrupt blob, bad reference) is
+    # unreadable input, like a corrupt image
+    try:
+        return load_sources() if load_sources else None
+    except Exception as e:
+        raise FrameDecodeError(f"delta frames could not be rebuilt: {e}") from e
+
+
+def _render_job(key: str, digests, fmt: str, size: int, fps: int, load_sources=None) -> str:
+    try:
+        digest = blob_store.put_bytes(render(digests, fmt, size, fps, _sources(load_sources)))
+        _record_output(key, digest)
+        return digest
+    except Exception as e:
+        logger.exception("flipbook render %s failed", key)
+        _failures.set(key, RenderFailure(str(e), isinstance(e, FrameDecodeError)))
+        raise
+    finally:
+        with _lock:
+            _pending.pop(key, None)
+
+
+def render_failure(key: str):
+    # the RenderFailure of a recent failed render of `key`, or None
+    return _failures.get(key)
+
+
+def schedule_render(key: str, digests, fmt: str, size: int, fps: int, load_sources=None):
+    # Starts the render unless it is already running; returns its Future.
+    # `load_sources`: called in the render job, -> {content key: stroke frame}
+    # for the keys in `digests` that aren't stored blobs
+    global _executor
+    with _lock:
+        if key in _pending:
+            return _pending[key]
+        if len(_pending) >= RENDER_MAX_PENDING:
+            raise RenderQueueFull(f"{len(_pending)} renders pending")
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="flipbook-render")
+        future = _executor.submit(_render_job, key, list(digests), fmt, size, fps, load_sources)
+        _pending[key] = future
+        return future
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
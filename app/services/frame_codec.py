@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+from app.crud import crud
+from app.services.blob_store import blob_store, is_digest
+from app.services.lru_cache import LRUCache
+
+# Delta-encoded stroke frames. Consecutive frames of a flipbook are mostly
+# the same drawing, so a stroke frame (JSON) is stored in full only every
+# FRAME_KEYFRAME_INTERVAL frames ("keyframes"); the frames in between are
+# stroke-level diffs against the frame before:
+#
+#   {"v": 1, "base": 41, "strokes": [0, 1, {"move": [3, 12.0, -4.5]}, {"add": {...}}], "width": ...}
+#
+# Each entry of "strokes" is the previous frame's stroke at that index
+# (kept), {"move": [index, dx, dy]} (that stroke, translated), or
+# {"add": stroke} (a new one, wrapped so no stroke can pass for a
+# reference); previous strokes that aren't referenced were removed.
+# Other frame keys (width, height, ...) are stored as they are. A frame
+# whose diff wouldn't be smaller than the frame itself becomes a keyframe.
+#
+# A delta frame's row keeps the frame_number of its chain's keyframe, so
+# frame N is rebuilt from one range query: the keyframe, then every delta up
+# to N. Rebuilt frames go into an LRU cache under a hash of the chain that
+# produced them, so scrubbing only applies deltas it hasn't seen yet. Image
+# frames are stored whole and end a chain.
+
+FRAME_KEYFRAME_INTERVAL = int(os.getenv("FRAME_KEYFRAME_INTERVAL", "30"))
+FRAME_CACHE_BYTES = int(os.getenv("FRAME_CACHE_BYTES", str(64 * 1024 * 1024)))
+
+StoredFrame = namedtuple("StoredFrame", "number key keyframe frame")
+
+
+def _frame_size(frame) -> int:
+    # rough in-memory footprint: ~100 bytes per point dict
+    if frame is None:
+        return 64
+    points = 0
+    for stroke in frame["strokes"]:
+        points += len(_points(stroke) or ())
+    return 256 + 100 * points
+
+
+frame_cache = LRUCache(max_entries=100_000, max_bytes=FRAME_CACHE_BYTES, sizeof=_frame_size)
+
+
+def dumps(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def parse_stroke_frame(data: bytes):
+    # {"strokes": [...], ...} for a JSON stroke frame (a bare list of strokes
+    # is normalized to that), None for anything else
+    if data[:1] not in (b"{", b"["):
+        return None
+    try:
+        frame = json.loads(data)
+    except ValueError:
+        return None
+    if isinstance(frame, list):
+        frame = {"strokes": frame}
+    if not isinstance(frame, dict) or not isinstance(frame.get("strokes"), list):
+        return None
+    return frame
+
+
+# ---------------- DIFFS ---------------- #
+
+def _points(stroke):
+    points = stroke.get("points") if isinstance(stroke, dict) else stroke
+    if not isinstance(points, list) or not points or not all(isinstance(p, dict) for p in points):
+        return None
+    return points
+
+
+def _shifted(stroke, dx: float, dy: float):
+    points = [{**p, "x": p["x"] + dx, "y": p["y"] + dy} for p in _points(stroke)]
+    return {**stroke, "points": points} if isinstance(stroke, dict) else points
+
+
+def _stroke_key(stroke) -> str:
+    return json.dumps(stroke, sort_keys=True, separators=(",", ":"))
+
+
+def _shape_key(stroke):
+    # (key equal for translated copies, origin), or None when the stroke has
+    # no usable points
+    points = _points(stroke)
+    try:
+        x0, y0 = points[0]["x"], points[0]["y"]
+        relative = [(p["x"] - x0, p["y"] - y0) for p in points]
+    except (TypeError, KeyError):
+        return None
+    attrs = {k: v for k, v in stroke.items() if k != "points"} if isinstance(stroke, dict) else None
+    return json.dumps([attrs, relative], sort_keys=True, separators=(",", ":")), (x0, y0)
+
+
+def diff_frames(prev: dict, cur: dict, base: int) -> dict:
+    exact, shapes = {}, {}
+    for i, stroke in enumerate(prev["strokes"]):
+        exact.setdefault(_stroke_key(stroke), []).append(i)
+        shape = _shape_key(stroke)
+        if shape:
+            shapes.setdefault(shape[0], []).append((i, shape[1]))
+
+    used = set()
+    refs = []
+    for stroke in cur["strokes"]:
+        ref = next((i for i in exact.get(_stroke_key(stroke), ()) if i not in used), None)
+        if ref is None:
+            shape = _shape_key(stroke)
+            for i, (x0, y0) in shapes.get(shape[0], ()) if shape else ():
+                if i in used:
+                    continue
+                dx, dy = shape[1][0] - x0, shape[1][1] - y0
+                # only when replaying the move gives back exactly this stroke
+                if _shifted(prev["strokes"][i], dx, dy) == stroke:
+                    ref = {"move": [i, dx, dy]}
+                    used.add(i)
+                    break
+        else:
+            used.add(ref)
+        refs.append({"add": stroke} if ref is None else ref)
+
+    delta = {k: v for k, v in cur.items() if k != "strokes"}
+    delta.update({"v": 1, "base": base, "strokes": refs})
+    return delta
+
+
+def apply_delta(prev: dict, delta: dict) -> dict:
+    strokes = []
+    for ref in delta["strokes"]:
+        if isinstance(ref, int) and not isinstance(ref, bool):
+            strokes.append(prev["strokes"][ref])
+        elif isinstance(ref, dict) and ref.keys() == {"move"}:
+            i, dx, dy = ref["move"]
+            strokes.append(_shifted(prev["strokes"][i], dx, dy))
+        elif isinstance(ref, dict) and ref.keys() == {"add"}:
+            strokes.append(ref["add"])
+        else:
+            raise ValueError(f"Unknown stroke reference in delta frame: {ref!r}")
+    frame = {k: v for k, v in delta.items() if k not in ("v", "base", "strokes")}
+    frame["strokes"] = strokes
+    return frame
+
+
+# ---------------- CHAINS ---------------- #
+
+def _chain_key(prev_key: str, digest: str) -> str:
+    return hashlib.sha256(f"{prev_key}:{digest}".encode()).hexdigest()
+
+
+def _read_full(digest: str):
+    # parsed keyframe (cached under its digest), None for image frames
+    if not is_digest(digest) or not blob_store.exists(digest):
+        return None
+    frame = frame_cache.get(digest)
+    if frame is None:
+        frame = parse_stroke_frame(blob_store.read_bytes(digest))
+        if frame is None:
+            return None
+        frame_cache.set(digest, frame)
+    return frame
+
+
+def content_keys(rows) -> list:
+    # rows: (frame_number, filename, keyframe) in frame order. Whole frames
+    # are identified by their blob digest, delta frames by the chain hash.
+    keys = []
+    prev_number = prev_key = None
+    for number, filename, keyframe in rows:
+        if keyframe is None:
+            key = filename
+        else:
+            if prev_number != number - 1:
+                raise ValueError(f"Delta frame {number} has no base frame")
+            key = _chain_key(prev_key, filename)
+        keys.append(key)
+        prev_number, prev_key = number, key
+    return keys
+
+
+def rebuild(rows, keys=None) -> dict:
+    # content key -> frame for every delta frame in `rows`. Walks forward:
+    # cached frames cost a lookup, the rest one blob read and one apply.
+    keys = keys or content_keys(rows)
+    frames = {}
+    prev = None  # rebuilt frame of the previous delta row
+    for i, ((number, filename, keyframe), key) in enumerate(zip(rows, keys)):
+        if keyframe is None:
+            prev = None
+            continue
+        frame = frame_cache.get(key)
+        if frame is None:
+            base = prev if prev is not None else _read_full(rows[i - 1][1])
+            delta = json.loads(blob_store.read_bytes(filename))
+            if base is None or delta.get("base") != number - 1:
+                raise ValueError(f"Delta frame {number} has no base frame")
+            frame = apply_delta(base, delta)
+            frame_cache.set(key, frame)
+        frames[key] = prev = frame
+    return frames
+
+
+def load_frame(db, row) -> StoredFrame:
+    # any frame row -> its content key and parsed stroke frame (None for images)
+    if row.keyframe is None:
+        return StoredFrame(row.frame_number, row.filename, row.frame_number, _read_full(row.filename))
+    rows = crud.frame_chain(db, row.flipbook_id, row.keyframe, row.frame_number)
+    keys = content_keys(rows)
+    return StoredFrame(row.frame_number, keys[-1], row.keyframe, rebuild(rows, keys)[keys[-1]])
+
+
+# ---------------- UPLOADS ---------------- #
+
+class FrameEncoder:
+    # Stores one upload's frames in order, carrying the previous stroke frame
+    # over so each new one can be a delta against it.
+    def __init__(self, previous: StoredFrame = None, interval: int = FRAME_KEYFRAME_INTERVAL):
+        self.previous = previous if previous is not None and previous.frame is not None else None
+        self.interval = interval
+
+    @classmethod
+    def resume(cls, db, flipbook_id: str, frame_number: int):
+        # continue the chain of frame_number - 1, if it is a stroke frame
+        row = crud.get_frame(db, flipbook_id, frame_number - 1)
+        return cls(load_frame(db, row) if row is not None else None)
+
+    def store(self, frame_number: int, fileobj):
+        # -> (filename, keyframe) for the frame row
+        if fileobj.read(1) not in (b"{", b"["):
+            fileobj.seek(0)
+            self.previous = None
+            return blob_store.put_file(fileobj), None
+        fileobj.seek(0)
+        data = fileobj.read()
+        frame = parse_stroke_frame(data)
+        if frame is None:
+            self.previous = None
+            return blob_store.put_bytes(data), None
+
+        previous = self.previous
+        if (
+            previous is not None
+            and frame_number == previous.number + 1
+            and frame_number - previous.keyframe < self.interval
+        ):
+            encoded = dumps(diff_frames(previous.frame, frame, previous.number))
+            if len(encoded) < len(data):
+                digest = blob_store.put_bytes(encoded)
+                key = _chain_key(previous.key, digest)
+                frame_cache.set(key, frame)
+                self.previous = StoredFrame(frame_number, key, previous.keyframe, frame)
+                return digest, previous.keyframe
+
+        digest = blob_store.put_bytes(data)
+        self.previous = StoredFrame(frame_number, digest, frame_number, frame)
+        return digest, None
@@ -0,0 +1,204 @@
+import bisect
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# In-process request metrics, rendered in the Prometheus text format on
+# /metrics:
+#
+# - http_request_duration_seconds{method, route, status}: per route
+#   template, so /flipbooks/{flipbook_id} is one series, not one per id
+# - span_duration_seconds{span}: named sections inside a request (pool
+#   checkout, SQL, password hashing, recognition, ...)
+#
+# Spans also add up per request and go back to the client as a
+# Server-Timing header, so one slow call shows where its time went.
+#
+# PROFILE_SAMPLE_RATE (0..1) runs cProfile on that fraction of requests; if
+# a sampled request takes longer than PROFILE_SLOW_MS its stats are written
+# to PROFILE_DIR and the top entries logged. Only the event-loop thread is
+# profiled, so sync routes show up as the threadpool hand-off.
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "500"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# seconds; spans are often sub-millisecond, so the low end is finer than
+# Prometheus' defaults
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames, buckets=BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labelnames, labels))
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{_braces(base)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_braces(base)} {series[-1]}")
+        return lines
+
+
+def _braces(labels: str) -> str:
+    return f"{{{labels}}}" if labels else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+span_duration = Histogram("span_duration_seconds", "Time spent in named spans.", ("span",))
+
+# name -> (type, help, fn returning a number or {labels tuple: number})
+_collectors = {}
+
+
+def register_collector(name: str, kind: str, documentation: str, fn, labelnames=()):
+    _collectors[name] = (kind, documentation, fn, tuple(labelnames))
+
+
+# ---------------- SPANS ---------------- #
+
+# per-request span totals; a dict so threadpool copies of the context still
+# write into the request's own totals
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+def observe_span(name: str, seconds: float):
+    span_duration.observe(seconds, name)
+    totals = _request_spans.get()
+    if totals is not None:
+        totals[name] = totals.get(name, 0.0) + seconds
+
+
+@contextmanager
+def span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_span(name, time.perf_counter() - start)
+
+
+# ---------------- MIDDLEWARE ---------------- #
+
+_profiling = threading.Lock()  # one profiler at a time per process
+
+
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        totals = {}
+        token = _request_spans.set(totals)
+        status = {"code": 500}
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                if totals:
+                    elapsed = (time.perf_counter() - start) * 1000
+                    timing = ", ".join(f"{_metric_name(k)};dur={v * 1000:.2f}" for k, v in totals.items())
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", f"{timing}, total;dur={elapsed:.2f}".encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        profiler = None
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE and _profiling.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = _route_template(scope)
+            request_duration.observe(elapsed, scope["method"], route, str(status["code"]))
+            _request_spans.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                _profiling.release()
+                if elapsed * 1000 >= PROFILE_SLOW_MS:
+                    _dump_profile(profiler, scope["method"], route, elapsed)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _metric_name(span_name: str) -> str:
+    return span_name.replace(".", "_")
+
+
+def _dump_profile(profiler, method: str, route: str, elapsed: float):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    slug = route.strip("/").replace("/", "_").replace("{", "").replace("}", "") or "root"
+    path = os.path.join(PROFILE_DIR, f"{int(time.time() * 1000)}_{method}_{slug}.prof")
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(20)
+    logger.warning("slow request %s %s took %.0f ms, profile in %s\n%s", method, route, elapsed * 1000, path, out.getvalue())
+
+
+# ---------------- EXPOSITION ---------------- #
+
+def render_metrics() -> str:
+    lines = request_duration.render() + span_duration.render()
+    for name, (kind, documentation, fn, labelnames) in sorted(_collectors.items()):
+        try:
+            value = fn()
+        except Exception:
+            logger.exception("metrics collector %s failed", name)
+            continue
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+        if isinstance(value, dict):
+            for labels, v in sorted(value.items()):
+                base = ",".join(f'{k}="{_escape(l)}"' for k, l in zip(labelnames, labels))
+                lines.append(f"{name}{_braces(base)} {v}")
+        else:
+            lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,141 @@
+import math
+from collections import deque
+
+# Online twin of detect_shape for strokes that are still being drawn. Every
+# quantity the detector needs is kept as a running accumulator, so adding a
+# point is O(1) no matter how long the stroke already is:
+#
+# - centroid: sums of x and y
+# - bounding box: running min / max
+# - radial moments: power sums of x, y up to degree 4. E[r^2] and Var[r^2]
+#   about the *current* centroid expand into these sums, and Var[r] follows
+#   from the delta method, Var[r] ~ Var[r^2] / (4 E[r^2]).
+# - corners: the (i-2, i, i+2) turning angle is final once point i+2
+#   arrives, so only the last five points are kept.
+#
+# Results are provisional: the detector thresholds are the same, but the
+# final answer still comes from the full pipeline once the stroke ends.
+
+MIN_POINTS = 6
+CORNER_ANGLE = 95  # degrees, as in detect_shape
+
+
+class OnlineStroke:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.first = None
+        self.last = None
+        self.min_x = self.min_y = math.inf
+        self.max_x = self.max_y = -math.inf
+        # power sums of (x, y) relative to the first point, which keeps the
+        # degree-4 terms small enough to subtract without losing precision
+        self._s = [0.0] * 12
+        self._window = deque(maxlen=5)
+        self.corners = 0
+
+    def add(self, x: float, y: float):
+        if self.first is None:
+            self.first = (x, y)
+        self.last = (x, y)
+        self.n += 1
+        self.min_x, self.max_x = min(self.min_x, x), max(self.max_x, x)
+        self.min_y, self.max_y = min(self.min_y, y), max(self.max_y, y)
+
+        u, v = x - self.first[0], y - self.first[1]
+        uu, vv, uv = u * u, v * v, u * v
+        s = self._s
+        s[0] += u
+        s[1] += v
+        s[2] += uu
+        s[3] += vv
+        s[4] += uv
+        s[5] += uu * u
+        s[6] += vv * v
+        s[7] += uu * v
+        s[8] += u * vv
+        s[9] += uu * uu
+        s[10] += vv * vv
+        s[11] += uu * vv
+
+        self._window.append((x, y))
+        if len(self._window) == 5:
+            self._count_corner()
+
+    def extend(self, points):
+        for p in points:
+            self.add(p["x"], p["y"])
+
+    def _count_corner(self):
+        (px, py), _, (mx, my), _, (nx, ny) = self._window
+        a = math.hypot(px - mx, py - my)
+        b = math.hypot(mx - nx, my - ny)
+        c = math.hypot(px - nx, py - ny)
+        if a * b == 0:
+            return
+        cos = (a * a + b * b - c * c) / (2 * a * b)
+        if math.degrees(math.acos(max(-1.0, min(1.0, cos)))) < CORNER_ANGLE:
+            self.corners += 1
+
+    # ---------------- RUNNING STATISTICS ---------------- #
+
+    def centroid(self):
+        return self.first[0] + self._s[0] / self.n, self.first[1] + self._s[1] / self.n
+
+    def radial_stats(self):
+        # (mean radius, radius variance) about the current centroid
+        n = self.n
+        (su, sv, suu, svv, suv, su3, sv3, su2v, suv2,
+         su4, sv4, su2v2) = (t / n for t in self._s)
+        a, b = su, sv  # centroid in first-point coordinates
+
+        # E[r^2] with r^2 = (u - a)^2 + (v - b)^2
+        r2 = suu + svv - a * a - b * b
+
+        # E[r^4]: expand ((u^2 + v^2) - 2(a u + b v) + (a^2 + b^2))^2
+        q = a * a + b * b
+        e_w2 = su4 + 2 * su2v2 + sv4                        # E[(u^2+v^2)^2]
+        e_w_l = a * (su3 + suv2) + b * (su2v + sv3)          # E[(u^2+v^2)(a u + b v)]
+        e_l2 = a * a * suu + 2 * a * b * suv + b * b * svv    # E[(a u + b v)^2]
+        e_w = suu + svv
+        e_l = a * su + b * sv
+        r4 = e_w2 - 4 * e_w_l + 4 * e_l2 + 2 * q * e_w - 4 * q * e_l + q * q
+
+        var_r2 = max(0.0, r4 - r2 * r2)
+        if r2 <= 0:
+            return 0.0, 0.0
+        var_r = min(var_r2 / (4 * r2), r2)
+        return math.sqrt(max(0.0, r2 - var_r)), var_r
+
+    # ---------------- CLASSIFICATION ---------------- #
+
+    def classify(self):
+        # Same decision order and thresholds as detect_shape
+        if self.n < MIN_POINTS:
+            return "unknown", 0.0
+
+        width = self.max_x - self.min_x
+        height = self.max_y - self.min_y
+
+        # a flat stroke (zero width or height) is a line, or a dot
+        if width == 0 or height == 0:
+            return ("line", 0.95) if width or height else ("unknown", 0.0)
+
+        avg_r, variance = self.radial_stats()
+        start_end_dist = math.hypot(self.first[0] - self.last[0], self.first[1] - self.last[1])
+        if (
+            avg_r > 0
+            and variance < avg_r * 0.35
+            and start_end_dist < avg_r * 0.6
+            and 0.7 <= width / height <= 1.3
+        ):
+            return "circle", min(0.98, 0.7 + (1 - variance / avg_r))
+
+        if 2 <= self.corners <= 4:
+            return "triangle", 0.9
+
+        if 0.85 <= width / height <= 1.15:
+            return "square", 0.92
+        return "rectangle", 0.88
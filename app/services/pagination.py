@@ -0,0 +1,52 @@
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+
+# Opaque keyset cursors for newest-first history lists. A cursor is the
+# (created_at, id) of the last row on the previous page; the next page is
+# everything strictly older, so every page is one index range scan no matter
+# how deep into the history it is.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    # -> (created_at, id), or None for the first page
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+
+
+def before_from(cursor: str):
+    # route-side decode: a malformed cursor is the client's error
+    try:
+        return decode_cursor(cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def next_cursor(rows: list, limit: int):
+    # rows were fetched with limit + 1 to learn whether another page exists
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last.created_at, last.id)
@@ -0,0 +1,76 @@
+import numpy as np
+from app.services.perfect_drawing_numpy import as_array, to_points
+from app.services.shape_classifiers import classify
+from app.services.shape_features import StrokeFeatures
+from app.services.shape_fitting import ellipse_points, fit_circle, fit_ellipse, fit_rectangle, fit_triangle
+
+# Feature-vector engine: one StrokeFeatures pass per stroke feeds every
+# registered classifier (see shape_classifiers.py) and then the fit, so
+# adding a shape means adding a classifier, not another scan of the points.
+# On top of the original circle / square / rectangle / triangle / line it
+# knows ellipses, arrows, polygons and stars.
+#
+# recognition.recognize_array calls extract_features / classify / fit
+# directly so the features are shared between detection and smoothing;
+# detect_shape / smooth_points keep the common engine API.
+
+# ---------------- ENGINE API ---------------- #
+
+def extract_features(arr):
+    return StrokeFeatures(arr)
+
+
+def detect_shape(points):
+    if points is None or len(points) < 6:
+        return "unknown", 0.0
+    return detect_shape_array(as_array(points))
+
+
+def detect_shape_array(arr):
+    return classify(extract_features(arr))
+
+
+def smooth_points(shape, points):
+    smoothed = smooth_points_array(shape, as_array(points))
+    if smoothed is None:
+        return points
+    return to_points(smoothed)
+
+
+def smooth_points_array(shape, arr):
+    return fit(shape, extract_features(arr))
+
+
+# ---------------- PERFECT SHAPES ---------------- #
+
+def fit(shape, f):
+    # Snapped points for `shape` from the stroke's features, or None when
+    # the shape is not snapped. Hull-based fits reuse the features' hull.
+    if shape == "line":
+        return f.points[[0, -1]].copy()
+
+    if shape == "circle":
+        cx, cy, r = fit_circle(f.points)
+        return ellipse_points((cx, cy), r, r)
+
+    if shape == "ellipse":
+        fitted = fit_ellipse(f.points)
+        if fitted is None:
+            fitted = (f.ellipse_center, f.semi_major, f.semi_minor, f.orientation)
+        return ellipse_points(*fitted)
+
+    if shape in ("square", "rectangle"):
+        return fit_rectangle(f.min_area_rect, square=shape == "square")
+
+    if shape == "triangle":
+        return fit_triangle(f.hull)
+
+    if shape in ("polygon", "star"):
+        vertices = f.corner_points
+        return np.vstack((vertices, vertices[:1]))
+
+    if shape == "arrow":
+        # shaft from the first point, then through the head's corners
+        return np.vstack((f.points[:1], f.corner_points, f.points[-1:]))
+
+    return None
@@ -1,4 +1,13 @@
 import math
+import os
+
+# Pure-Python engine: no numpy anywhere, so it also runs where numpy isn't
+# installed. perfect_drawing_numpy is its array-backed twin.
+
+# as in shape_fitting
+FIT_TOLERANCE_PX = float(os.getenv("FIT_TOLERANCE_PX", "0.5"))
+MIN_CURVE_POINTS = 12
+MAX_CURVE_POINTS = 360
 
 # ---------------- UTILS ---------------- #
 
@@ -30,6 +39,10 @@ def detect_shape(points):
 
     cx, cy = centroid(points)
 
+    # a flat stroke (zero width or height) is a line, or a dot
+    if width == 0 or height == 0:
+        return ("line", 0.95) if width or height else ("unknown", 0.0)
+
     # ---------------- CIRCLE (PRIORITY 1) ---------------- #
 
     radii = [distance(p, {"x": cx, "y": cy}) for p in points]
@@ -97,54 +110,174 @@ def detect_shape(points):
         return "unknown", 0.4
 
 # ---------------- PERFECT SHAPES ---------------- #
+# Pure-Python versions of the shape_fitting fits the numpy engine uses:
+# same algorithms, same outputs, no numpy.
+
+def convex_hull(points):
+    # Andrew's monotone chain, counter-clockwise, as (x, y) tuples
+    pts = sorted(set((p["x"], p["y"]) for p in points))
+    if len(pts) < 3:
+        return pts
+
+    def half(ordered):
+        chain = []
+        for px, py in ordered:
+            while len(chain) >= 2:
+                (ox, oy), (ax, ay) = chain[-2], chain[-1]
+                if (ax - ox) * (py - oy) - (ay - oy) * (px - ox) > 0:
+                    break
+                chain.pop()
+            chain.append((px, py))
+        return chain
+
+    lower = half(pts)
+    upper = half(reversed(pts))
+    return lower[:-1] + upper[:-1]
+
+
+def min_area_rect(hull):
+    # rotating calipers, see shape_fitting.min_area_rect;
+    # -> (4 corners counter-clockwise, width along the edge, height)
+    h = len(hull)
+    if h < 3:
+        if h == 2:
+            (x0, y0), (x1, y1) = hull
+            return [hull[0], hull[1], hull[1], hull[0]], math.hypot(x1 - x0, y1 - y0), 0.0
+        return [hull[0] if h else (0.0, 0.0)] * 4, 0.0, 0.0
+
+    units = []
+    for i in range(h):
+        ex, ey = hull[(i + 1) % h][0] - hull[i][0], hull[(i + 1) % h][1] - hull[i][1]
+        length = math.hypot(ex, ey)
+        units.append((ex / length, ey / length))
+
+    def along(k, ux, uy):
+        return hull[k][0] * ux + hull[k][1] * uy
+
+    best = None
+    right = top = left = 0
+    for i in range(h):
+        ux, uy = units[i]
+        nx, ny = -uy, ux  # inward normal
+        if i == 0:
+            right = 1
+        while along((right + 1) % h, ux, uy) > along(right, ux, uy):
+            right = (right + 1) % h
+        if i == 0:
+            top = right
+        while along((top + 1) % h, nx, ny) > along(top, nx, ny):
+            top = (top + 1) % h
+        if i == 0:
+            left = top
+        while along((left + 1) % h, ux, uy) < along(left, ux, uy):
+            left = (left + 1) % h
+
+        u0, u1 = along(left, ux, uy), along(right, ux, uy)
+        v0, v1 = along(i, nx, ny), along(top, nx, ny)
+        area = (u1 - u0) * (v1 - v0)
+        if best is None or area < best[0]:
+            best = (area, ux, uy, u0, u1, v0, v1)
+
+    _, ux, uy, u0, u1, v0, v1 = best
+    nx, ny = -uy, ux
+    corners = [(u * ux + v * nx, u * uy + v * ny) for u, v in ((u0, v0), (u1, v0), (u1, v1), (u0, v1))]
+    return corners, u1 - u0, v1 - v0
+
+
+def fit_rectangle(rect, square=False):
+    corners, w, h = rect
+    if square:
+        cx = sum(x for x, _ in corners) / 4
+        cy = sum(y for _, y in corners) / 4
+        ux, uy = corners[1][0] - corners[0][0], corners[1][1] - corners[0][1]
+        nx, ny = corners[3][0] - corners[0][0], corners[3][1] - corners[0][1]
+        u_len = math.hypot(ux, uy) or 1.0
+        n_len = math.hypot(nx, ny) or 1.0
+        ux, uy, nx, ny = ux / u_len, uy / u_len, nx / n_len, ny / n_len
+        half = (w + h) / 4
+        corners = [
+            (cx + half * (su * ux + sn * nx), cy + half * (su * uy + sn * ny))
+            for su, sn in ((-1, -1), (1, -1), (1, 1), (-1, 1))
+        ]
+    return [*corners, corners[0]]
+
+
+def fit_triangle(hull):
+    # drop the vertex spanning the least area with its neighbours down to three
+    vertices = list(hull)
+    while len(vertices) > 3:
+        n = len(vertices)
+        areas = []
+        for i in range(n):
+            (px, py), (x, y), (qx, qy) = vertices[i - 1], vertices[i], vertices[(i + 1) % n]
+            areas.append(abs((x - px) * (qy - y) - (y - py) * (qx - x)))
+        del vertices[areas.index(min(areas))]
+    return [*vertices, vertices[0]]
+
+
+def fit_circle(points):
+    # Kasa least squares on centred coordinates: with the centroid at the
+    # origin the normal equations split into a 2x2 system for the centre
+    n = len(points)
+    mx, my = centroid(points)
+    xs = [p["x"] - mx for p in points]
+    ys = [p["y"] - my for p in points]
+    zs = [x * x + y * y for x, y in zip(xs, ys)]
+    sxx = sum(x * x for x in xs)
+    syy = sum(y * y for y in ys)
+    sxy = sum(x * y for x, y in zip(xs, ys))
+    sxz = sum(x * z for x, z in zip(xs, zs))
+    syz = sum(y * z for y, z in zip(ys, zs))
+
+    det = sxx * syy - sxy * sxy
+    trace = sxx + syy
+    if trace == 0:
+        a = b = 0.0
+    elif det > 1e-12 * trace * trace:
+        a = (syy * sxz - sxy * syz) / det
+        b = (sxx * syz - sxy * sxz) / det
+    else:
+        # collinear: the minimum-norm solution, along the points' direction
+        if sxx >= syy:
+            vx, vy = sxx, sxy
+        else:
+            vx, vy = sxy, syy
+        length = math.hypot(vx, vy)
+        vx, vy = vx / length, vy / length
+        k = (vx * sxz + vy * syz) / trace
+        a, b = k * vx, k * vy
+    c = sum(zs) / n
+    cx, cy = a / 2, b / 2
+    r_squared = c + cx * cx + cy * cy
+    if r_squared <= 0:
+        return mx, my, sum(math.hypot(x, y) for x, y in zip(xs, ys)) / n
+    return mx + cx, my + cy, math.sqrt(r_squared)
+
+
+def curve_points(radius: float) -> int:
+    # chords within FIT_TOLERANCE_PX of the arc, see shape_fitting.curve_points
+    if radius <= FIT_TOLERANCE_PX:
+        return MIN_CURVE_POINTS
+    count = math.ceil(math.pi / math.acos(1 - FIT_TOLERANCE_PX / radius))
+    return min(MAX_CURVE_POINTS, max(MIN_CURVE_POINTS, count))
+
+
+def circle_points(cx, cy, r):
+    # open ring, like shape_fitting.ellipse_points
+    count = curve_points(r)
+    step = 2 * math.pi / count
+    return [{"x": cx + r * math.cos(i * step), "y": cy + r * math.sin(i * step)} for i in range(count)]
 
-def smooth_points(shape, points):
-    min_x, min_y, max_x, max_y = bounding_box(points)
-    cx, cy = centroid(points)
-
-    smoothed = []
 
-    # ---- CIRCLE ----
+def smooth_points(shape, points):
+    # snapped points for `shape`, or the stroke itself when it isn't snapped
     if shape == "circle":
-        r = min(max_x - min_x, max_y - min_y) / 2
-        for i in range(0, 360, 6):
-            rad = math.radians(i)
-            smoothed.append({
-                "x": cx + r * math.cos(rad),
-                "y": cy + r * math.sin(rad)
-            })
-
-    # ---- SQUARE ----
-    elif shape == "square":
-        size = min(max_x - min_x, max_y - min_y)
-        smoothed = [
-            {"x": min_x, "y": min_y},
-            {"x": min_x + size, "y": min_y},
-            {"x": min_x + size, "y": min_y + size},
-            {"x": min_x, "y": min_y + size},
-            {"x": min_x, "y": min_y},
-        ]
+        return circle_points(*fit_circle(points))
 
-    # ---- RECTANGLE ----
-    elif shape == "rectangle":
-        smoothed = [
-            {"x": min_x, "y": min_y},
-            {"x": max_x, "y": min_y},
-            {"x": max_x, "y": max_y},
-            {"x": min_x, "y": max_y},
-            {"x": min_x, "y": min_y},
-        ]
-
-    # ---- TRIANGLE ----
+    if shape in ("square", "rectangle"):
+        corners = fit_rectangle(min_area_rect(convex_hull(points)), square=shape == "square")
     elif shape == "triangle":
-        smoothed = [
-            {"x": cx, "y": min_y},
-            {"x": min_x, "y": max_y},
-            {"x": max_x, "y": max_y},
-            {"x": cx, "y": min_y},
-        ]
-                
+        corners = fit_triangle(convex_hull(points))
     else:
         return points
-
-    return smoothed
+    return [{"x": x, "y": y} for x, y in corners]
@@ -0,0 +1,138 @@
+import math
+import numpy as np
+from app.services.shape_fitting import (
+    convex_hull, ellipse_points, fit_circle, fit_rectangle, fit_triangle, min_area_rect,
+)
+
+# Array-backed twin of perfect_drawing_local: same thresholds, same
+# (shape, confidence) results, but every scan is a batched numpy operation
+# over a contiguous (N, 2) float64 array instead of a loop over dicts. Its
+# fits come from shape_fitting; the local engine has pure-Python copies.
+
+# ---------------- UTILS ---------------- #
+
+def as_array(points):
+    if isinstance(points, np.ndarray):
+        return np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+    return np.array(
+        [(p["x"], p["y"]) for p in points], dtype=np.float64
+    ).reshape(-1, 2)
+
+
+def to_points(arr):
+    return [{"x": x, "y": y} for x, y in arr.tolist()]
+
+
+def centroid(arr):
+    cx, cy = arr.mean(axis=0)
+    return float(cx), float(cy)
+
+
+def bounding_box(arr):
+    min_x, min_y = arr.min(axis=0)
+    max_x, max_y = arr.max(axis=0)
+    return float(min_x), float(min_y), float(max_x), float(max_y)
+
+
+# ---------------- SHAPE DETECTION ---------------- #
+
+def detect_shape(points):
+    if points is None or len(points) < 6:
+        return "unknown", 0.0
+    return detect_shape_array(as_array(points))
+
+
+def detect_shape_array(arr):
+    if len(arr) < 6:
+        return "unknown", 0.0
+
+    min_x, min_y, max_x, max_y = bounding_box(arr)
+    width = max_x - min_x
+    height = max_y - min_y
+
+    cx, cy = centroid(arr)
+
+    # a flat stroke (zero width or height) is a line, or a dot
+    if width == 0 or height == 0:
+        return ("line", 0.95) if width or height else ("unknown", 0.0)
+
+    # ---------------- CIRCLE (PRIORITY 1) ---------------- #
+
+    radii = np.hypot(arr[:, 0] - cx, arr[:, 1] - cy)
+    avg_r = float(radii.mean())
+
+    variance = float(np.mean((radii - avg_r) ** 2))
+
+    # path closure (start ≈ end)
+    start_end_dist = math.hypot(arr[0, 0] - arr[-1, 0], arr[0, 1] - arr[-1, 1])
+
+    if (
+        variance < avg_r * 0.35
+        and start_end_dist < avg_r * 0.6
+        and 0.7 <= width / height <= 1.3
+    ):
+        confidence = min(0.98, 0.7 + (1 - variance / avg_r))
+        return "circle", confidence
+
+    # ---------------- TRIANGLE ---------------- #
+
+    # every (i-2, i, i+2) triple at once
+    prev_pts, mid_pts, next_pts = arr[:-4], arr[2:-2], arr[4:]
+    a = np.hypot(*(prev_pts - mid_pts).T)
+    b = np.hypot(*(mid_pts - next_pts).T)
+    c = np.hypot(*(prev_pts - next_pts).T)
+
+    ab = a * b
+    valid = ab != 0
+    cos = (a[valid] ** 2 + b[valid] ** 2 - c[valid] ** 2) / (2 * ab[valid])
+    angles = np.degrees(np.arccos(np.clip(cos, -1, 1)))
+
+    corners = int(np.count_nonzero(angles < 95))
+
+    if 2 <= corners <= 4:
+        return "triangle", 0.9
+
+    # ---------------- SQUARE / RECTANGLE ---------------- #
+
+    if height != 0:
+        ratio = width / height
+        if 0.85 <= ratio <= 1.15:
+            return "square", 0.92
+        else:
+            return "rectangle", 0.88
+
+    # ---------------- LINE ---------------- #
+
+    (sx, sy), (ex, ey) = arr[0], arr[-1]
+    deviations = np.abs(
+        (ey - sy) * arr[:, 0] - (ex - sx) * arr[:, 1] + ex * sy - ey * sx
+    ) / max(math.hypot(ex - sx, ey - sy), 1)
+    if float(deviations.max()) < 8:
+        return "line", 0.95
+    return "unknown", 0.4
+
+
+# ---------------- PERFECT SHAPES ---------------- #
+
+def smooth_points(shape, points):
+    smoothed = smooth_points_array(shape, as_array(points))
+    if smoothed is None:
+        return points
+    return to_points(smoothed)
+
+
+def smooth_points_array(shape, arr):
+    # Returns None when the shape is not snapped, so callers can hand the
+    # original stroke back untouched. Fits use the whole stroke and follow
+    # its rotation (see shape_fitting).
+    if shape == "circle":
+        cx, cy, r = fit_circle(arr)
+        return ellipse_points((cx, cy), r, r)
+
+    if shape in ("square", "rectangle"):
+        return fit_rectangle(min_area_rect(convex_hull(arr)), square=shape == "square")
+
+    if shape == "triangle":
+        return fit_triangle(convex_hull(arr))
+
+    return None
@@ -0,0 +1,102 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Bounded ProcessPoolExecutor with an async front end. CPU-bound work runs in
+# worker processes so it neither holds the GIL of the web worker nor ties up
+# the anyio threadpool that sync routes share.
+
+
+class PoolSaturated(Exception):
+    """Raised when the pool already has max_pending jobs queued or running."""
+
+
+class BoundedProcessPool:
+    def __init__(self, max_workers: int, max_pending: int, timeout: float, start_method: str = "spawn"):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(1, max_pending)
+        self.timeout = timeout
+        self.start_method = start_method
+        self._executor = None
+        self._pending = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use so importing the app never forks workers.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+            )
+        return self._executor
+
+    def _discard_executor(self, executor=None):
+        # A broken executor still has its management thread and any workers
+        # that survived; shut it down rather than just dropping it. Passing
+        # the executor that broke leaves a replacement another job made alone.
+        executor = executor or self._executor
+        if executor is None:
+            return
+        if executor is self._executor:
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future=None):
+        self._pending -= 1
+
+    def _on_done(self, loop, future):
+        try:
+            loop.call_soon_threadsafe(self._release, future)
+        except RuntimeError:
+            # loop already closed during shutdown
+            pass
+
+    async def run(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PoolSaturated(f"{self._pending} jobs pending")
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            # a worker died (OOM kill, segfault); start a fresh pool once
+            self._discard_executor(executor)
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        self._pending += 1
+        self.submitted += 1
+        # The slot is held until the worker is really done, not until the
+        # caller gives up, so timed-out jobs still count against the bound.
+        future.add_done_callback(lambda f: self._on_done(loop, f))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            future.cancel()
+            raise
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "submitted": self.submitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+    def shutdown(self):
+        self._discard_executor()
@@ -0,0 +1,205 @@
+import os
+import time
+from app.services import perfect_drawing_features, perfect_drawing_local, perfect_drawing_numpy
+from app.services.perfect_drawing_numpy import as_array, to_points
+from app.services.metrics import observe_span
+from app.services.process_pool import BoundedProcessPool
+from app.services.recognition_cache import get_recognition_cache
+from app.services.scene_grouping import group_strokes, join_group
+from app.services.stroke_preprocess import preprocess
+
+# Shape-recognition engines. All expose detect_shape(points) and
+# smooth_points(shape, points); pick one per deployment with SHAPE_ENGINE.
+# "local" and "numpy" give the same results; "features" (feature vector plus
+# pluggable classifiers, see shape_classifiers.py) knows more shapes.
+ENGINES = {
+    "local": perfect_drawing_local,
+    "numpy": perfect_drawing_numpy,
+    "features": perfect_drawing_features,
+}
+
+SHAPE_ENGINE = os.getenv("SHAPE_ENGINE", "local")
+
+# Recognition runs in its own process pool (see process_pool.py)
+RECOGNITION_WORKERS = int(os.getenv("RECOGNITION_WORKERS", str(os.cpu_count() or 1)))
+RECOGNITION_MAX_PENDING = int(os.getenv("RECOGNITION_MAX_PENDING", "64"))
+RECOGNITION_TIMEOUT = float(os.getenv("RECOGNITION_TIMEOUT", "5"))
+
+recognition_pool = BoundedProcessPool(
+    max_workers=RECOGNITION_WORKERS,
+    max_pending=RECOGNITION_MAX_PENDING,
+    timeout=RECOGNITION_TIMEOUT,
+)
+
+
+def get_engine(name=None):
+    if name in ENGINES.values():
+        return name
+    name = (name or SHAPE_ENGINE).strip().lower()
+    if name not in ENGINES:
+        raise ValueError(f"Unknown shape engine: {name!r} (expected one of {sorted(ENGINES)})")
+    return ENGINES[name]
+
+
+def recognize(points, engine=None):
+    engine = get_engine(engine)
+    shape, confidence = engine.detect_shape(points)
+    return {
+        "recognized_as": shape,
+        "confidence": confidence,
+        "smoothed_points": engine.smooth_points(shape, points) if points else points,
+    }
+
+
+def recognize_batch(strokes, engine=None):
+    engine = get_engine(engine)
+    return [recognize(points, engine) for points in strokes]
+
+
+# ---------------- ARRAY PIPELINE (pool workers) ---------------- #
+
+def recognize_array(arr, engine=None, smoothing_window=None, simplify_eps=None, spans=None):
+    # (shape, confidence, output array or None to hand the caller's points back).
+    # `spans`, if given, collects detect_shape / smooth_points seconds.
+    engine = get_engine(engine)
+    if len(arr) == 0:
+        return "unknown", 0.0, None
+
+    sampled, simplified = preprocess(arr, smoothing_window, simplify_eps)
+    start = time.perf_counter()
+    if hasattr(engine, "extract_features"):
+        # one feature pass shared by detection and the fit
+        features = engine.extract_features(sampled)
+        shape, confidence = engine.classify(features)
+        detected = time.perf_counter()
+        smoothed = engine.fit(shape, features)
+    elif hasattr(engine, "detect_shape_array"):
+        shape, confidence = engine.detect_shape_array(sampled)
+        detected = time.perf_counter()
+        smoothed = engine.smooth_points_array(shape, sampled)
+    else:
+        points = to_points(sampled)
+        shape, confidence = engine.detect_shape(points)
+        detected = time.perf_counter()
+        smoothed = engine.smooth_points(shape, points)
+        smoothed = None if smoothed is points else as_array(smoothed)
+    if spans is not None:
+        spans["recognition.detect_shape"] = spans.get("recognition.detect_shape", 0.0) + detected - start
+        spans["recognition.smooth_points"] = spans.get("recognition.smooth_points", 0.0) + time.perf_counter() - detected
+
+    # not snapped: return the simplified polyline, if preprocessing made one
+    if smoothed is None and simplified is not arr:
+        smoothed = simplified
+    return shape, confidence, smoothed
+
+
+def recognize_arrays(jobs, engine=None, spans=None):
+    # jobs: [(arr, smoothing_window, simplify_eps), ...]
+    engine = get_engine(engine)
+    return [recognize_array(arr, engine, window, eps, spans) for arr, window, eps in jobs]
+
+
+def _recognize_arrays_timed(jobs, engine=None):
+    # pool job: results plus the worker-side span times, which the parent
+    # process records (metrics live in the parent)
+    spans = {}
+    return recognize_arrays(jobs, engine, spans), spans
+
+
+def to_response(result, points):
+    shape, confidence, smoothed = result
+    return {
+        "recognized_as": shape,
+        "confidence": confidence,
+        "smoothed_points": points if smoothed is None else to_points(smoothed),
+    }
+
+
+async def recognize_jobs(jobs):
+    # jobs: [(arr, smoothing_window, simplify_eps), ...] -> raw results.
+    # Serve what the cache already knows; send only the misses to the pool,
+    # all of them in one job.
+    cache = get_recognition_cache()
+    if cache:
+        keys = [cache.key(arr, SHAPE_ENGINE, window, eps) for arr, window, eps in jobs]
+        results = [cache.get(key) for key in keys]
+    else:
+        keys = [None] * len(jobs)
+        results = [None] * len(jobs)
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        start = time.perf_counter()
+        computed, spans = await recognition_pool.run(
+            _recognize_arrays_timed, [jobs[i] for i in misses], SHAPE_ENGINE
+        )
+        observe_span("recognition.pool", time.perf_counter() - start)
+        for name, seconds in spans.items():
+            observe_span(name, seconds)
+        for i, result in zip(misses, computed):
+            results[i] = result
+            if cache:
+                cache.put(keys[i], result)
+    return results
+
+
+# ---------------- SCENES ---------------- #
+
+# Engines trusted to recognize joined strokes: their classifiers know the
+# multi-stroke shapes (arrows, rectangles from four lines) and answer
+# "unknown" for a group that is no shape. "local" and "numpy" call almost
+# anything with corners a triangle or rectangle, so under them a scene is
+# recognized stroke by stroke.
+SCENE_JOIN_ENGINES = ("features",)
+
+
+def joins_strokes(engine=None) -> bool:
+    return get_engine(engine) in [ENGINES[name] for name in SCENE_JOIN_ENGINES]
+
+
+def scene_groups(arrays):
+    # pool job: [(stroke indices, joined array or None for a single stroke)]
+    groups = []
+    for group in group_strokes(arrays):
+        if len(group) == 1:
+            groups.append((group, None))
+        else:
+            order, joined = join_group(arrays, group)
+            if order:
+                groups.append((order, joined))
+    return groups
+
+
+async def recognize_scene(arrays, smoothing_window=None, simplify_eps=None):
+    # Every stroke of a canvas -> [(stroke indices, input array, result)],
+    # one entry per shape, ordered by first stroke. Under a SCENE_JOIN_ENGINES
+    # engine strokes that touch are recognized together, and a group that is
+    # no shape as a whole falls back to its strokes one by one.
+    if len(arrays) > 1 and joins_strokes():
+        start = time.perf_counter()
+        groups = await recognition_pool.run(scene_groups, arrays)
+        observe_span("recognition.scene_grouping", time.perf_counter() - start)
+    else:
+        groups = [([i], None) for i in range(len(arrays))]
+
+    inputs = [arrays[order[0]] if joined is None else joined for order, joined in groups]
+    results = await recognize_jobs([(arr, smoothing_window, simplify_eps) for arr in inputs])
+
+    shapes, split = [], []
+    for (order, joined), arr, result in zip(groups, inputs, results):
+        if joined is not None and result[0] == "unknown":
+            split.extend(order)
+        else:
+            shapes.append((order, arr, result))
+    if split:
+        singles = await recognize_jobs([(arrays[i], smoothing_window, simplify_eps) for i in split])
+        shapes.extend(([i], arrays[i], result) for i, result in zip(split, singles))
+    return sorted(shapes, key=lambda shape: min(shape[0]))
+
+
+def recognition_stats():
+    cache = get_recognition_cache()
+    return {
+        "pool": recognition_pool.stats(),
+        "cache": cache.stats() if cache else None,
+    }
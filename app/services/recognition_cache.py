@@ -0,0 +1,172 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+import numpy as np
+from app.services.lru_cache import LRUCache
+
+# Content-addressed cache for recognition results.
+#
+# Strokes are keyed by a hash of their points after translating to the bbox
+# origin, scaling by the bbox extent and quantizing to a RECOGNITION_CACHE_GRID lattice,
+# so the same stroke drawn somewhere else on the canvas hits. The detector's
+# thresholds are in absolute pixels (radial variance, line deviation), so
+# the extent rounded to whole pixels is part of the key as well. Snapped
+# points are stored normalized and mapped back onto the caller's stroke.
+
+RECOGNITION_CACHE = os.getenv("RECOGNITION_CACHE", "memory")  # memory | sqlite | off
+RECOGNITION_CACHE_ENTRIES = int(os.getenv("RECOGNITION_CACHE_ENTRIES", "4096"))
+RECOGNITION_CACHE_MAX_BYTES = int(os.getenv("RECOGNITION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RECOGNITION_CACHE_TTL = float(os.getenv("RECOGNITION_CACHE_TTL", "3600"))
+RECOGNITION_CACHE_PATH = os.getenv("RECOGNITION_CACHE_PATH", "recognition_cache.sqlite3")
+RECOGNITION_CACHE_GRID = int(os.getenv("RECOGNITION_CACHE_GRID", "1024"))
+
+StrokeKey = namedtuple("StrokeKey", ["digest", "origin", "extent"])
+
+
+def _sizeof(value):
+    shape, _, smoothed = value
+    return 128 + len(shape) + (0 if smoothed is None else smoothed.nbytes)
+
+
+class SqliteResultCache:
+    """Cross-worker backend: one local SQLite file shared by all gunicorn workers."""
+
+    def __init__(self, path: str, max_entries: int, ttl: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS recognition_cache ("
+            " key TEXT PRIMARY KEY, shape TEXT NOT NULL, confidence REAL NOT NULL,"
+            " smoothed BLOB, expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_recognition_cache_last_used ON recognition_cache (last_used)"
+        )
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT shape, confidence, smoothed, expires_at FROM recognition_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            shape, confidence, smoothed, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM recognition_cache WHERE key = ?", (key,))
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE recognition_cache SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        if smoothed is not None:
+            smoothed = np.frombuffer(smoothed, dtype="<f8").reshape(-1, 2)
+        return shape, confidence, smoothed
+
+    def set(self, key, value):
+        shape, confidence, smoothed = value
+        blob = None if smoothed is None else np.ascontiguousarray(smoothed, dtype="<f8").tobytes()
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recognition_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, shape, confidence, blob, now + self.ttl, now),
+            )
+            self._writes += 1
+            if self._writes % 64 == 0:
+                self._trim(now)
+
+    def _trim(self, now):
+        self.expirations += self._conn.execute(
+            "DELETE FROM recognition_cache WHERE expires_at <= ?", (now,)
+        ).rowcount
+        self.evictions += self._conn.execute(
+            "DELETE FROM recognition_cache WHERE key IN ("
+            " SELECT key FROM recognition_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM recognition_cache").fetchone()[0]
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class RecognitionCache:
+    def __init__(self, backend, grid: int = RECOGNITION_CACHE_GRID):
+        self.backend = backend
+        self.grid = grid
+
+    def key(self, arr, *params) -> StrokeKey:
+        origin = arr.min(axis=0) if len(arr) else np.zeros(2)
+        extent = float(np.ptp(arr, axis=0).max()) if len(arr) else 0.0
+        scale = extent or 1.0
+        quantized = np.rint((arr - origin) * (self.grid / scale)).astype("<i4")
+
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((self.grid, round(extent), len(arr)) + params).encode())
+        h.update(quantized.tobytes())
+        return StrokeKey(h.hexdigest(), origin, scale)
+
+    def get(self, skey: StrokeKey):
+        value = self.backend.get(skey.digest)
+        if value is None:
+            return None
+        shape, confidence, smoothed = value
+        if smoothed is not None:
+            smoothed = smoothed * skey.extent + skey.origin
+        return shape, confidence, smoothed
+
+    def put(self, skey: StrokeKey, result):
+        shape, confidence, smoothed = result
+        if smoothed is not None:
+            smoothed = (smoothed - skey.origin) / skey.extent
+        self.backend.set(skey.digest, (shape, confidence, smoothed))
+
+    def stats(self) -> dict:
+        return {"backend": RECOGNITION_CACHE, **self.backend.stats()}
+
+
+_cache = None
+
+
+def get_recognition_cache():
+    # Built on first use so pool workers and tooling never open the SQLite file
+    global _cache
+    if _cache is None and RECOGNITION_CACHE != "off":
+        _cache = _build_cache()
+    return _cache
+
+
+def _build_cache():
+    if RECOGNITION_CACHE == "sqlite":
+        backend = SqliteResultCache(RECOGNITION_CACHE_PATH, RECOGNITION_CACHE_ENTRIES, RECOGNITION_CACHE_TTL)
+    else:
+        backend = LRUCache(
+            max_entries=RECOGNITION_CACHE_ENTRIES,
+            max_bytes=RECOGNITION_CACHE_MAX_BYTES,
+            ttl=RECOGNITION_CACHE_TTL,
+            sizeof=_sizeof,
+        )
+    return RecognitionCache(backend)
@@ -0,0 +1,170 @@
+import math
+import os
+from collections import defaultdict
+import numpy as np
+
+# Groups the strokes of a canvas into candidate multi-stroke shapes: a
+# rectangle drawn as four strokes, an arrow drawn as shaft + head. Two
+# strokes belong together when an endpoint of one lies within
+# SCENE_JOIN_DISTANCE px of the other stroke (its endpoints or anywhere
+# along it, for T-junctions such as an arrow head on its shaft).
+#
+# Candidate pairs come from a uniform grid over the strokes' bounding boxes,
+# so each endpoint is only checked against the strokes near it and grouping
+# stays near-linear on canvases with thousands of strokes. Each group is
+# then joined into one polyline (join_group) for the usual recognizer.
+# Boxes spanning more than SCENE_GRID_MAX_CELLS cells (one huge stroke among
+# small ones) aren't bucketed; every query checks them directly.
+
+SCENE_JOIN_DISTANCE = float(os.getenv("SCENE_JOIN_DISTANCE", "20"))
+SCENE_MAX_GROUP = int(os.getenv("SCENE_MAX_GROUP", "6"))
+SCENE_GRID_MAX_CELLS = int(os.getenv("SCENE_GRID_MAX_CELLS", "64"))
+
+
+# ---------------- SPATIAL INDEX ---------------- #
+
+class UniformGrid:
+    # Buckets item ids by the square cells their boxes overlap; boxes over
+    # max_cells cells go to `oversized` instead, so inserting stays O(max_cells)
+    def __init__(self, cell_size: float, max_cells: int = SCENE_GRID_MAX_CELLS):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.cells = defaultdict(list)
+        self.oversized = []
+
+    def _cell(self, x: float, y: float):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def insert(self, item, min_x, min_y, max_x, max_y):
+        try:
+            x0, y0 = self._cell(min_x, min_y)
+            x1, y1 = self._cell(max_x, max_y)
+        except (OverflowError, ValueError):  # inf / nan coordinates
+            self.oversized.append(item)
+            return
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > self.max_cells:
+            self.oversized.append(item)
+            return
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells[(cx, cy)].append(item)
+
+    def query(self, x: float, y: float):
+        # items whose box overlaps the cell containing (x, y), plus the oversized ones
+        try:
+            items = self.cells.get(self._cell(x, y), ())
+        except (OverflowError, ValueError):
+            items = ()
+        return [*items, *self.oversized] if self.oversized else items
+
+
+# ---------------- GROUPING ---------------- #
+
+def _distances(point, arr):
+    # distance from `point` to each segment of the polyline `arr`
+    if len(arr) == 1:
+        return np.hypot(*(arr - point).T)
+    a, b = arr[:-1], arr[1:]
+    ab = b - a
+    length_sq = (ab * ab).sum(axis=1)
+    t = np.clip(((point - a) * ab).sum(axis=1) / np.where(length_sq > 0, length_sq, 1.0), 0.0, 1.0)
+    closest = a + t[:, None] * ab
+    return np.hypot(*(closest - point).T)
+
+
+def group_strokes(arrays, join_distance=SCENE_JOIN_DISTANCE, max_group=SCENE_MAX_GROUP):
+    # -> list of groups (lists of stroke indices, ascending), ordered by
+    # their first stroke. Components larger than max_group are split back
+    # into single strokes: that is a dense sketch, not one shape.
+    n = len(arrays)
+    boxes = [(a.min(axis=0), a.max(axis=0)) if len(a) else None for a in arrays]
+    sizes = [float((hi - lo).max()) for lo, hi in (b for b in boxes if b is not None)]
+    cell_size = max(2 * join_distance, float(np.median(sizes)) if sizes else 0.0, 1.0)
+
+    grid = UniformGrid(cell_size)
+    for i, box in enumerate(boxes):
+        if box is not None:
+            lo, hi = box
+            grid.insert(i, lo[0] - join_distance, lo[1] - join_distance, hi[0] + join_distance, hi[1] + join_distance)
+
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, arr in enumerate(arrays):
+        if not len(arr):
+            continue
+        for point in (arr[0], arr[-1]):
+            for j in grid.query(point[0], point[1]):
+                if j == i or find(i) == find(j):
+                    continue
+                lo, hi = boxes[j]
+                if (point < lo - join_distance).any() or (point > hi + join_distance).any():
+                    continue
+                if _distances(point, arrays[j]).min() <= join_distance:
+                    parent[find(i)] = find(j)
+
+    components = defaultdict(list)
+    for i in range(n):
+        components[find(i)].append(i)
+    groups = []
+    for members in components.values():
+        if len(members) > max_group:
+            groups.extend([i] for i in members)
+        else:
+            groups.append(members)
+    return sorted(groups, key=lambda g: g[0])
+
+
+# ---------------- JOINING ---------------- #
+
+def join_group(arrays, group, join_distance=SCENE_JOIN_DISTANCE):
+    # One polyline through the group's strokes, as if drawn in one go.
+    # Starts with the longest stroke, then repeatedly walks on into the
+    # stroke closest to the current end: straight through when it touches
+    # that stroke's endpoint, and out to one end and back through the
+    # junction when it touches its middle (an arrow head on its shaft).
+    # -> (order, (N, 2) array); `order` lists the strokes as joined.
+    remaining = [i for i in group if len(arrays[i])]
+    if not remaining:
+        return [], np.zeros((0, 2))
+    lengths = {i: float(np.hypot(*np.diff(arrays[i], axis=0).T).sum()) for i in remaining}
+    first = max(remaining, key=lambda i: lengths[i])
+    remaining.remove(first)
+    path = arrays[first]
+
+    # face the end that touches another stroke forward
+    if remaining:
+        start_gap = min(_distances(path[0], arrays[j]).min() for j in remaining)
+        end_gap = min(_distances(path[-1], arrays[j]).min() for j in remaining)
+        if start_gap < end_gap:
+            path = path[::-1]
+
+    parts, order = [path], [first]
+    end = path[-1]
+    while remaining:
+        best = None
+        for j in remaining:
+            distances = np.hypot(*(arrays[j] - end).T)
+            k = int(np.argmin(distances))
+            if best is None or distances[k] < best[0]:
+                best = (distances[k], j, k)
+        _, j, k = best
+        arr = arrays[j]
+        remaining.remove(j)
+        order.append(j)
+        to_start = float(np.hypot(*(arr[k] - arr[0])))
+        to_end = float(np.hypot(*(arr[k] - arr[-1])))
+        if to_start <= join_distance:
+            piece = arr
+        elif to_end <= join_distance:
+            piece = arr[::-1]
+        else:
+            piece = np.vstack((arr[k:], arr[::-1]))
+        parts.append(piece)
+        end = piece[-1]
+    return order, np.vstack(parts)
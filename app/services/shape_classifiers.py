@@ -0,0 +1,156 @@
+from app.services.shape_features import StrokeFeatures
+
+# Pluggable shape classifiers. Each one is a function of a StrokeFeatures
+# vector returning a confidence in 0..1, or None when the stroke is clearly
+# not that shape. Checking the cheap features (closed, elongation, moments)
+# first means most classifiers bail out before the turning-angle profile or
+# the convex hull is ever computed.
+#
+#   @classifier("heart")
+#   def heart(f):
+#       if not f.closed:
+#           return None
+#       ...
+#
+# classify() runs every registered classifier over the one feature vector
+# and keeps the most confident answer; ties go to the higher priority.
+
+MIN_CONFIDENCE = 0.5
+MIN_POINTS = 6
+
+_classifiers = []  # (priority, name, fn), highest priority first
+
+
+def classifier(name: str, priority: int = 0):
+    def register(fn):
+        unregister(name)
+        _classifiers.append((priority, name, fn))
+        _classifiers.sort(key=lambda entry: -entry[0])
+        return fn
+    return register
+
+
+def unregister(name: str):
+    _classifiers[:] = [entry for entry in _classifiers if entry[1] != name]
+
+
+def registered() -> list:
+    return [name for _, name, _ in _classifiers]
+
+
+def classify(features: StrokeFeatures):
+    if features.n < MIN_POINTS or features.diagonal == 0:
+        return "unknown", 0.0
+    best_name, best = "unknown", MIN_CONFIDENCE
+    for _, name, fn in _classifiers:
+        confidence = fn(features)
+        if confidence is not None and confidence > best:
+            best_name, best = name, confidence
+    if best_name == "unknown":
+        return "unknown", 0.4
+    return best_name, round(min(best, 0.99), 4)
+
+
+def _between(value, low, high):
+    # 1 at or beyond `low`, 0 at or beyond `high` (either direction)
+    if low == high:
+        return 1.0 if value <= low else 0.0
+    return min(1.0, max(0.0, (high - value) / (high - low)))
+
+
+# ---------------- OPEN STROKES ---------------- #
+
+@classifier("line", priority=50)
+def line(f):
+    # thin, and the endpoints span the whole extent along the major axis
+    if f.closed or f.elongation > 0.12 or f.end_span < 0.9:
+        return None
+    return 0.8 + 0.18 * _between(f.elongation, 0.02, 0.12)
+
+
+@classifier("arrow", priority=40)
+def arrow(f):
+    # a shaft, then the head drawn at its end: sharp turns, all in the last
+    # part of the path, after a long straight run
+    if f.closed or f.elongation > 0.6:
+        return None
+    sharp = [i for i in f.corner_indices if abs(f.turns[i]) > 100]
+    if not 1 <= len(sharp) <= 3:
+        return None
+    samples = len(f.turns)
+    first = f.corner_indices[0] / samples
+    if first < 0.45 or sharp[0] / samples < 0.45:
+        return None
+    return 0.7 + 0.2 * _between(f.elongation, 0.2, 0.6)
+
+
+# ---------------- CLOSED CURVES ---------------- #
+
+@classifier("circle", priority=30)
+def circle(f):
+    # a regular hexagon already has a radial residual of ~0.045
+    if not f.closed or f.elongation < 0.8 or f.ellipse_residual > 0.035:
+        return None
+    return 0.8 + 0.18 * _between(f.ellipse_residual, 0.01, 0.035)
+
+
+@classifier("ellipse", priority=25)
+def ellipse(f):
+    if not f.closed or f.elongation >= 0.8 or f.elongation < 0.1 or f.ellipse_residual > 0.035:
+        return None
+    return 0.75 + 0.2 * _between(f.ellipse_residual, 0.01, 0.035)
+
+
+# ---------------- POLYGONS ---------------- #
+
+@classifier("triangle", priority=20)
+def triangle(f):
+    # any triangle fills half its minimum-area rectangle; sparse samples can
+    # round a hexagon down to three sharp corners, but not that flat
+    if not f.closed or f.corners != 3 or f.solidity < 0.8 or f.rectangularity > 0.7:
+        return None
+    return 0.8 + 0.15 * _between(1 - f.solidity, 0.02, 0.2)
+
+
+@classifier("square", priority=20)
+def square(f):
+    if not f.closed or f.elongation < 0.75 or f.corners != 4:
+        return None
+    _, w, h = f.min_area_rect
+    if min(w, h) / max(w, h) < 0.85 or f.rectangularity < 0.85:
+        return None
+    return 0.8 + 0.15 * _between(1 - f.rectangularity, 0.02, 0.15)
+
+
+@classifier("rectangle", priority=15)
+def rectangle(f):
+    if not f.closed or f.corners != 4 or f.rectangularity < 0.85:
+        return None
+    _, w, h = f.min_area_rect
+    if min(w, h) / max(w, h) >= 0.85:
+        return None
+    return 0.8 + 0.15 * _between(1 - f.rectangularity, 0.02, 0.15)
+
+
+@classifier("polygon", priority=10)
+def polygon(f):
+    # convex with 5+ corners. Sparse samples round some corners off, so 3
+    # or 4 corners count too when the outline is neither triangle- nor
+    # rectangle-shaped.
+    if not f.closed or not 3 <= f.corners <= 10 or f.solidity < 0.85:
+        return None
+    if f.corners == 3 and f.rectangularity <= 0.7:
+        return None
+    if f.corners == 4 and f.rectangularity >= 0.85:
+        return None
+    return 0.7 + 0.2 * _between(1 - f.solidity, 0.03, 0.15)
+
+
+@classifier("star", priority=10)
+def star(f):
+    # spikes: many sharp corners and a lot of concave area inside the hull
+    if not f.closed or f.radial_cv < 0.12 or f.corners < 8:
+        return None
+    if not 0.3 <= f.solidity <= 0.8:
+        return None
+    return 0.75 + 0.2 * _between(f.solidity, 0.5, 0.8)
@@ -0,0 +1,215 @@
+import math
+from functools import cached_property
+import numpy as np
+from app.services.shape_fitting import convex_hull, min_area_rect
+from app.services.stroke_preprocess import resample
+
+# One shared feature vector per stroke. The cheap features are computed up
+# front from a single set of intermediates (differences, centroid offsets,
+# second moments); the turning-angle profile and the convex hull are cached
+# properties, so a classifier that rejects a stroke on a cheap feature never
+# pays for them. Classifiers (shape_classifiers.py) only read this object.
+
+TURN_SAMPLES = 64        # arc-length samples for the turning-angle profile
+TURN_STEP = 2            # neighbour offset for each turning angle
+TURN_OVERSAMPLE = 4      # profile is averaged over this many dense samples
+CORNER_MIN_TURN = 40.0   # degrees; smaller bends are curvature, not corners
+CLOSED_GAP = 0.12        # start-end gap / path length below which a stroke is closed
+CLOSED_SPAN = 0.2        # ... and gap / bounding-box diagonal (rules out spirals)
+HISTOGRAM_BINS = 8       # |turning angle| histogram over 0..180 degrees
+
+
+class StrokeFeatures:
+    def __init__(self, arr):
+        arr = np.asarray(arr, dtype=np.float64).reshape(-1, 2)
+        self.points = arr
+        self.n = len(arr)
+
+        mins, maxs = arr.min(axis=0), arr.max(axis=0)
+        self.min_x, self.min_y = float(mins[0]), float(mins[1])
+        self.max_x, self.max_y = float(maxs[0]), float(maxs[1])
+        self.width = self.max_x - self.min_x
+        self.height = self.max_y - self.min_y
+        self.diagonal = math.hypot(self.width, self.height)
+
+        # moments
+        center = arr.mean(axis=0)
+        self.cx, self.cy = float(center[0]), float(center[1])
+        offsets = arr - center
+        cov = offsets.T @ offsets / self.n
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        self.minor_var, self.major_var = (float(max(v, 0.0)) for v in eigenvalues)
+        self.major_axis = eigenvectors[:, 1]
+        self.orientation = math.atan2(self.major_axis[1], self.major_axis[0])
+        # 1 for isotropic point sets (circle, square), 0 for a line
+        self.elongation = math.sqrt(self.minor_var / self.major_var) if self.major_var > 0 else 0.0
+
+        # radial profile about the centroid
+        radii = np.hypot(offsets[:, 0], offsets[:, 1])
+        self.mean_radius = float(radii.mean())
+        self.radial_cv = float(radii.std() / self.mean_radius) if self.mean_radius > 0 else 0.0
+
+        # ellipse fit from the principal frame: semi-axes are half the extent
+        # along each axis, centred on the extent's midpoint (independent of
+        # how densely each part of the stroke was sampled)
+        minor_axis = np.array([-self.major_axis[1], self.major_axis[0]])
+        u, v = offsets @ self.major_axis, offsets @ minor_axis
+        u_mid, v_mid = (u.max() + u.min()) / 2, (v.max() + v.min()) / 2
+        self.semi_major = float(u.max() - u.min()) / 2
+        self.semi_minor = float(v.max() - v.min()) / 2
+        self.ellipse_center = center + u_mid * self.major_axis + v_mid * minor_axis
+        # residual: spread of the radii once the fitted ellipse is scaled
+        # onto the unit circle; ~0 for ellipses, ~0.045 for a hexagon
+        if self.semi_minor > 0:
+            unit = np.hypot((u - u_mid) / self.semi_major, (v - v_mid) / self.semi_minor)
+            self.ellipse_residual = float(unit.std() / unit.mean())
+        else:
+            self.ellipse_residual = math.inf
+        # endpoint separation along the major axis over the full extent
+        # along it: 1 when the stroke starts and ends at its two extremes
+        self.end_span = abs(float(u[-1] - u[0])) / (2 * self.semi_major) if self.semi_major > 0 else 0.0
+
+        # path and closure, measured on an arc-length resampling: pointer
+        # jitter between raw samples would otherwise inflate the path
+        outline = resample(arr, TURN_SAMPLES) if self.n > TURN_SAMPLES else arr
+        self.path_length = float(np.hypot(*np.diff(outline, axis=0).T).sum())
+        self.gap = float(math.hypot(*(arr[-1] - arr[0])))
+        self.closure = self.gap / self.path_length if self.path_length > 0 else 1.0
+        self.closed = self.n > 2 and self.closure < CLOSED_GAP and self.gap < CLOSED_SPAN * self.diagonal
+
+        # area enclosed by the stroke (closing segment implied)
+        x, y = arr[:, 0], arr[:, 1]
+        self.area = 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))))
+
+    # ---------------- TURNING ANGLES ---------------- #
+
+    @cached_property
+    def dense(self):
+        # TURN_SAMPLES * TURN_OVERSAMPLE arc-length samples; closed strokes
+        # get the closing segment and are rotated so each profile window is
+        # centred on its sample
+        count = TURN_SAMPLES * TURN_OVERSAMPLE
+        if self.closed:
+            ring = np.vstack((self.points, self.points[:1]))
+            return np.roll(resample(ring, count + 1)[:-1], TURN_OVERSAMPLE // 2, axis=0)
+        return resample(self.points, count)
+
+    @cached_property
+    def profile(self):
+        # TURN_SAMPLES points along the stroke, each the mean of
+        # TURN_OVERSAMPLE dense samples (jitter averages out, corners survive)
+        return self.dense.reshape(TURN_SAMPLES, TURN_OVERSAMPLE, 2).mean(axis=1)
+
+    @cached_property
+    def turns(self):
+        # signed turning angle (degrees) at TURN_SAMPLES arc-length samples;
+        # closed strokes wrap around so a corner at the start is seen too
+        if self.path_length == 0 or self.n < 3:
+            return np.zeros(0)
+        samples = self.profile
+        if self.closed:
+            before = samples - np.roll(samples, TURN_STEP, axis=0)
+            after = np.roll(samples, -TURN_STEP, axis=0) - samples
+        else:
+            before = samples[TURN_STEP:-TURN_STEP] - samples[:-2 * TURN_STEP]
+            after = samples[2 * TURN_STEP:] - samples[TURN_STEP:-TURN_STEP]
+        cross = before[:, 0] * after[:, 1] - before[:, 1] * after[:, 0]
+        dot = (before * after).sum(axis=1)
+        return np.degrees(np.arctan2(cross, dot))
+
+    @cached_property
+    def corner_indices(self):
+        # local maxima of |turn| above CORNER_MIN_TURN, at least 2*TURN_STEP
+        # samples apart (one real corner bends several neighbouring samples)
+        turns = np.abs(self.turns)
+        if len(turns) == 0:
+            return []
+        order = np.argsort(-turns)
+        taken = []
+        size = len(turns)
+        for i in order:
+            if turns[i] < CORNER_MIN_TURN:
+                break
+            near = [abs(i - j) for j in taken]
+            if self.closed:
+                near = [min(d, size - d) for d in near]
+            if all(d > 2 * TURN_STEP for d in near):
+                taken.append(int(i))
+        return sorted(taken)
+
+    @property
+    def corners(self) -> int:
+        return len(self.corner_indices)
+
+    @cached_property
+    def corner_points(self):
+        # the stroke itself at each corner (the averaged profile rounds
+        # corners inward); open profiles lose TURN_STEP samples at each end
+        offset = 0 if self.closed else TURN_STEP
+        centre = TURN_OVERSAMPLE // 2
+        index = [(i + offset) * TURN_OVERSAMPLE + centre for i in self.corner_indices]
+        return self.dense[index].reshape(-1, 2)
+
+    @cached_property
+    def turn_histogram(self):
+        # share of samples per |turning angle| bin
+        if len(self.turns) == 0:
+            return np.zeros(HISTOGRAM_BINS)
+        counts, _ = np.histogram(np.abs(self.turns), bins=HISTOGRAM_BINS, range=(0, 180))
+        return counts / len(self.turns)
+
+    @cached_property
+    def total_turning(self) -> float:
+        # signed; about +-360 for a simple closed loop
+        return float(self.turns.sum())
+
+    # ---------------- CONVEX HULL ---------------- #
+
+    @cached_property
+    def hull(self):
+        return convex_hull(self.points)
+
+    @cached_property
+    def hull_area(self) -> float:
+        x, y = self.hull[:, 0], self.hull[:, 1]
+        return 0.5 * abs(float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))))
+
+    @cached_property
+    def hull_perimeter(self) -> float:
+        return float(np.hypot(*(np.roll(self.hull, -1, axis=0) - self.hull).T).sum())
+
+    @property
+    def solidity(self) -> float:
+        # enclosed area / hull area: ~1 for convex outlines, low for stars
+        return self.area / self.hull_area if self.hull_area > 0 else 0.0
+
+    @cached_property
+    def min_area_rect(self):
+        # (corners (4, 2), width, height) of the smallest enclosing rectangle;
+        # one of its sides lies along a hull edge
+        return min_area_rect(self.hull)
+
+    @property
+    def rectangularity(self) -> float:
+        # hull area / min-area rectangle area: 1 for rectangles, pi/4 for circles
+        _, w, h = self.min_area_rect
+        return self.hull_area / (w * h) if w * h > 0 else 0.0
+
+    def vector(self) -> dict:
+        # the whole feature vector, for logging and tuning
+        return {
+            "points": self.n,
+            "width": self.width,
+            "height": self.height,
+            "elongation": self.elongation,
+            "radial_cv": self.radial_cv,
+            "ellipse_residual": self.ellipse_residual,
+            "end_span": self.end_span,
+            "closure": self.closure,
+            "closed": self.closed,
+            "corners": self.corners,
+            "total_turning": self.total_turning,
+            "turn_histogram": self.turn_histogram.tolist(),
+            "solidity": self.solidity,
+            "rectangularity": self.rectangularity,
+        }
@@ -0,0 +1,225 @@
+import math
+import os
+import numpy as np
+
+# Fitting routines behind smooth_points. Every fit is rotation-aware and
+# uses the whole stroke rather than its bounding box:
+#
+# - circle: algebraic least squares (Kasa)
+# - ellipse: direct least-squares conic fit (Fitzgibbon, in Halir and
+#   Flusser's numerically stable form)
+# - rectangle / square: minimum-area rotated rectangle, convex hull plus
+#   rotating calipers, O(n log n) overall
+# - triangle: the convex hull reduced to its three most significant vertices
+#
+# Curves get as many vertices as their size needs: chords stay within
+# FIT_TOLERANCE_PX of the true curve, so a small circle comes back with a
+# dozen points and a large one stays smooth.
+
+FIT_TOLERANCE_PX = float(os.getenv("FIT_TOLERANCE_PX", "0.5"))
+MIN_CURVE_POINTS = 12
+MAX_CURVE_POINTS = 360
+
+
+# ---------------- CONVEX HULL ---------------- #
+
+def convex_hull(arr):
+    # Andrew's monotone chain, counter-clockwise, O(n log n); the Python
+    # loop only sees the points the octagon filter couldn't rule out
+    pts = arr[~_inside_octagon(arr)] if len(arr) >= 3 else arr
+    pts = pts[np.lexsort((pts[:, 1], pts[:, 0]))]
+    pts = pts[np.concatenate(([True], (np.diff(pts, axis=0) != 0).any(axis=1)))]
+    if len(pts) < 3:
+        return pts
+
+    def half(points):
+        chain = []
+        for px, py in points:
+            while len(chain) >= 2:
+                (ox, oy), (ax, ay) = chain[-2], chain[-1]
+                if (ax - ox) * (py - oy) - (ay - oy) * (px - ox) > 0:
+                    break
+                chain.pop()
+            chain.append((px, py))
+        return chain
+
+    points = pts.tolist()
+    lower = half(points)
+    upper = half(reversed(points))
+    return np.array(lower[:-1] + upper[:-1])
+
+
+def _inside_octagon(pts):
+    # Akl-Toussaint: points strictly inside the polygon through the extreme
+    # points in 8 directions (counter-clockwise) can't be hull vertices
+    x, y = pts[:, 0], pts[:, 1]
+    extremes = [int(np.argmax(d)) for d in (x, x + y, y, y - x, -x, -x - y, -y, x - y)]
+    octagon = pts[list(dict.fromkeys(extremes))]
+    if len(octagon) < 3:
+        return np.zeros(len(pts), dtype=bool)
+    edges = np.roll(octagon, -1, axis=0) - octagon
+    cross = (
+        edges[:, 0, None] * (y - octagon[:, 1, None])
+        - edges[:, 1, None] * (x - octagon[:, 0, None])
+    )
+    return (cross > 0).all(axis=0)
+
+
+# ---------------- RECTANGLES ---------------- #
+
+def min_area_rect(hull):
+    # Rotating calipers over a counter-clockwise hull: the smallest enclosing
+    # rectangle has a side on some hull edge. For each edge the three other
+    # calipers (furthest along the edge, furthest from it, furthest back)
+    # only ever move forward, so the sweep is O(h).
+    # Returns (corners (4, 2) counter-clockwise, width along the edge, height).
+    h = len(hull)
+    if h < 3:
+        corner = hull[:1] if h else np.zeros((1, 2))
+        if h == 2:
+            return np.array([hull[0], hull[1], hull[1], hull[0]]), float(np.hypot(*(hull[1] - hull[0]))), 0.0
+        return np.repeat(corner, 4, axis=0), 0.0, 0.0
+
+    pts = hull.tolist()
+    edges = np.roll(hull, -1, axis=0) - hull
+    units = (edges / np.hypot(edges[:, 0], edges[:, 1])[:, None]).tolist()
+
+    def along(k, ux, uy):
+        return pts[k][0] * ux + pts[k][1] * uy
+
+    best = None
+    right = top = left = 0
+    for i in range(h):
+        ux, uy = units[i]
+        nx, ny = -uy, ux  # inward normal
+        if i == 0:
+            right = 1
+        while along((right + 1) % h, ux, uy) > along(right, ux, uy):
+            right = (right + 1) % h
+        if i == 0:
+            top = right
+        while along((top + 1) % h, nx, ny) > along(top, nx, ny):
+            top = (top + 1) % h
+        if i == 0:
+            left = top
+        while along((left + 1) % h, ux, uy) < along(left, ux, uy):
+            left = (left + 1) % h
+
+        u0, u1 = along(left, ux, uy), along(right, ux, uy)
+        v0, v1 = along(i, nx, ny), along(top, nx, ny)
+        area = (u1 - u0) * (v1 - v0)
+        if best is None or area < best[0]:
+            best = (area, ux, uy, u0, u1, v0, v1)
+
+    _, ux, uy, u0, u1, v0, v1 = best
+    u, n = np.array([ux, uy]), np.array([-uy, ux])
+    corners = np.array([u0 * u + v0 * n, u1 * u + v0 * n, u1 * u + v1 * n, u0 * u + v1 * n])
+    return corners, float(u1 - u0), float(v1 - v0)
+
+
+def fit_rectangle(rect, square=False):
+    # closed ring from a min_area_rect() result; a square keeps its centre
+    # and rotation and takes the mean side
+    corners, w, h = rect
+    if square:
+        center = corners.mean(axis=0)
+        u = corners[1] - corners[0]
+        n = corners[3] - corners[0]
+        u = u / (np.hypot(*u) or 1.0)
+        n = n / (np.hypot(*n) or 1.0)
+        half = (w + h) / 4
+        corners = center + half * np.array([-u - n, u - n, u + n, n - u])
+    return np.vstack((corners, corners[:1]))
+
+
+# ---------------- TRIANGLES ---------------- #
+
+def fit_triangle(hull):
+    # Drop the hull vertex that spans the least area with its neighbours
+    # until three are left: the rounded-off corners and the slight bulges of
+    # a hand-drawn side go first, the three real corners stay.
+    vertices = np.asarray(hull, dtype=np.float64)
+    while len(vertices) > 3:
+        prev, nxt = np.roll(vertices, 1, axis=0), np.roll(vertices, -1, axis=0)
+        a, b = vertices - prev, nxt - vertices
+        areas = np.abs(a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0])
+        vertices = np.delete(vertices, int(np.argmin(areas)), axis=0)
+    return np.vstack((vertices, vertices[:1]))
+
+
+# ---------------- CIRCLES AND ELLIPSES ---------------- #
+
+def fit_circle(arr):
+    # (cx, cy, r) minimising sum((x - cx)^2 + (y - cy)^2 - r^2)^2: linear in
+    # (2cx, 2cy, r^2 - cx^2 - cy^2). Centred first for conditioning.
+    mean = arr.mean(axis=0)
+    x, y = (arr - mean).T
+    design = np.column_stack((x, y, np.ones(len(x))))
+    (a, b, c), *_ = np.linalg.lstsq(design, x * x + y * y, rcond=None)
+    cx, cy = a / 2, b / 2
+    r_squared = c + cx * cx + cy * cy
+    if r_squared <= 0:
+        return float(mean[0]), float(mean[1]), float(np.hypot(x, y).mean())
+    return float(mean[0] + cx), float(mean[1] + cy), math.sqrt(r_squared)
+
+
+def fit_ellipse(arr):
+    # ((cx, cy), a, b, angle) of the least-squares ellipse, a >= b and
+    # angle the direction of the major axis; None when the points don't
+    # determine one (too few, collinear, or better fit by a hyperbola).
+    if len(arr) < 5:
+        return None
+    mean = arr.mean(axis=0)
+    scale = float(np.abs(arr - mean).max()) or 1.0
+    x, y = ((arr - mean) / scale).T
+
+    quadratic = np.column_stack((x * x, x * y, y * y))
+    linear = np.column_stack((x, y, np.ones(len(x))))
+    s1, s2, s3 = quadratic.T @ quadratic, quadratic.T @ linear, linear.T @ linear
+    try:
+        t = -np.linalg.solve(s3, s2.T)
+        m = s1 + s2 @ t
+        # premultiply by the inverse of the constraint 4ac - b^2 = 1
+        m = np.array([m[2] / 2, -m[1], m[0] / 2])
+        eigenvalues, eigenvectors = np.linalg.eig(m)
+    except np.linalg.LinAlgError:
+        return None
+    eigenvectors = np.real(eigenvectors)
+    ellipse = 4 * eigenvectors[0] * eigenvectors[2] - eigenvectors[1] ** 2 > 0
+    if not ellipse.any():
+        return None
+    q = eigenvectors[:, np.flatnonzero(ellipse)[0]]
+    if q[0] < 0:
+        q = -q  # conics are defined up to sign; keep the quadratic part positive
+    A, B, C = q
+    D, E, F = t @ q
+
+    # centre, then axes from the quadratic form at the centre
+    det = 4 * A * C - B * B
+    x0 = (B * E - 2 * C * D) / det
+    y0 = (B * D - 2 * A * E) / det
+    f0 = A * x0 * x0 + B * x0 * y0 + C * y0 * y0 + D * x0 + E * y0 + F
+    values, vectors = np.linalg.eigh(np.array([[A, B / 2], [B / 2, C]]))
+    if f0 == 0 or (values * -f0 <= 0).any():
+        return None
+    a, b = np.sqrt(-f0 / values) * scale  # ascending eigenvalues: major first
+    major = vectors[:, 0]
+    center = (float(mean[0] + x0 * scale), float(mean[1] + y0 * scale))
+    return center, float(a), float(b), math.atan2(major[1], major[0])
+
+
+def curve_points(radius: float) -> int:
+    # vertices for a closed curve of this radius so that no chord strays
+    # more than FIT_TOLERANCE_PX from the arc it replaces
+    if radius <= FIT_TOLERANCE_PX:
+        return MIN_CURVE_POINTS
+    count = math.ceil(math.pi / math.acos(1 - FIT_TOLERANCE_PX / radius))
+    return min(MAX_CURVE_POINTS, max(MIN_CURVE_POINTS, count))
+
+
+def ellipse_points(center, a, b, angle=0.0):
+    # open ring (the first point is not repeated), like the circle output
+    t = np.linspace(0, 2 * np.pi, curve_points(max(a, b)), endpoint=False)
+    c, s = math.cos(angle), math.sin(angle)
+    x, y = a * np.cos(t), b * np.sin(t)
+    return np.column_stack((center[0] + x * c - y * s, center[1] + x * s + y * c))
@@ -0,0 +1,113 @@
+import base64
+import json
+import os
+import struct
+import zlib
+import numpy as np
+from app.services.blob_store import blob_store
+
+# Compact storage format for stroke inputs (AIResult.input_data):
+#
+#   header  "SK" | uint16 scale | uint32 point count     (little-endian)
+#   body    zlib( varint( zigzag( delta( round(points * scale) ) ) ) )
+#
+# Points are quantized to 1/scale px, x and y interleaved. Deltas between
+# neighbouring points are small, so most coordinates fit in one varint byte
+# before zlib even starts. The column holds "sk1:<base64>" for small strokes;
+# anything longer than STROKE_INLINE_MAX characters goes to the blob store
+# and the column keeps "blob:<sha256>".
+
+STROKE_SCALE = int(os.getenv("STROKE_SCALE", "100"))          # 0.01 px
+STROKE_INLINE_MAX = int(os.getenv("STROKE_INLINE_MAX", "1024"))
+
+_MAGIC = b"SK"
+_HEADER = struct.Struct("<2sHI")
+_INLINE = "sk1:"
+_BLOB = "blob:"
+
+
+# ---------------- VARINT ---------------- #
+
+def _zigzag(values):
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _unzigzag(values):
+    values = values.astype(np.uint64)
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+
+def _varint_encode(values) -> bytes:
+    # LEB128 for the whole array at once: one column per 7-bit group, keep
+    # the groups each value needs, continuation bit on all but the last
+    if len(values) == 0:
+        return b""
+    shifts = np.arange(10, dtype=np.uint64) * np.uint64(7)
+    lengths = 1 + np.count_nonzero(values[:, None] >> shifts[1:] != 0, axis=1)
+    groups = int(lengths.max())
+    shifts = shifts[:groups]
+    table = ((values[:, None] >> shifts) & np.uint64(0x7F)).astype(np.uint8)
+    index = np.arange(groups)
+    table[index < (lengths[:, None] - 1)] |= 0x80
+    return table[index < lengths[:, None]].tobytes()
+
+
+def _varint_decode(data: bytes, count: int):
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(raw < 0x80)
+    if len(ends) != count or (count and ends[-1] != len(raw) - 1):
+        raise ValueError(f"Expected {count} varints, found {len(ends)}")
+    if not count:
+        return np.zeros(0, dtype=np.uint64)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+    parts = (raw & 0x7F).astype(np.uint64) << (position.astype(np.uint64) * np.uint64(7))
+    return np.add.reduceat(parts, starts)
+
+
+# ---------------- PAYLOAD ---------------- #
+
+def encode_stroke(arr, scale: int = STROKE_SCALE) -> bytes:
+    arr = np.asarray(arr, dtype=np.float64).reshape(-1, 2)
+    quantized = np.rint(arr * scale).astype(np.int64).ravel()
+    deltas = np.diff(quantized.reshape(-1, 2), axis=0, prepend=np.zeros((1, 2), np.int64)).ravel()
+    body = zlib.compress(_varint_encode(_zigzag(deltas)), 6)
+    return _HEADER.pack(_MAGIC, scale, len(arr)) + body
+
+
+def decode_stroke(payload: bytes):
+    magic, scale, count = _HEADER.unpack_from(payload)
+    if magic != _MAGIC:
+        raise ValueError("Not an encoded stroke")
+    deltas = _unzigzag(_varint_decode(zlib.decompress(payload[_HEADER.size:]), count * 2))
+    return np.cumsum(deltas.reshape(-1, 2), axis=0) / scale
+
+
+# ---------------- COLUMN VALUES ---------------- #
+
+def to_column(arr) -> str:
+    # Value for AIResult.input_data; large strokes are spilled to the blob store
+    payload = encode_stroke(arr)
+    text = _INLINE + base64.b64encode(payload).decode("ascii")
+    if len(text) <= STROKE_INLINE_MAX:
+        return text
+    return _BLOB + blob_store.put_bytes(payload)
+
+
+def from_column(value: str):
+    # (N, 2) float64 points for any stored input_data value, including the
+    # plain JSON rows written before this format
+    if value.startswith(_INLINE):
+        return decode_stroke(base64.b64decode(value[len(_INLINE):]))
+    if value.startswith(_BLOB):
+        return decode_stroke(blob_store.read_bytes(value[len(_BLOB):]))
+    data = json.loads(value)
+    points = data.get("points") if isinstance(data, dict) else data
+    if not isinstance(points, list):
+        raise ValueError("Stroke input was not stored")
+    return np.array([(p["x"], p["y"]) for p in points], dtype=np.float64).reshape(-1, 2)
+
+
+def is_spilled(value: str) -> bool:
+    return value.startswith(_BLOB)
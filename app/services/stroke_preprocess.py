@@ -0,0 +1,88 @@
+import os
+import numpy as np
+
+# Stroke preprocessing run before detect_shape:
+#   moving-average smoothing -> Ramer-Douglas-Peucker -> arc-length resampling
+# Raw pointer strokes carry thousands of nearly collinear points; after this
+# stage recognition sees at most MAX_RECOGNITION_POINTS of them.
+
+MAX_RECOGNITION_POINTS = int(os.getenv("MAX_RECOGNITION_POINTS", "256"))
+MAX_SMOOTHING_WINDOW = 64
+
+
+def moving_average(arr, window):
+    window = min(int(window), MAX_SMOOTHING_WINDOW, len(arr))
+    if window <= 1:
+        return arr
+    # edge padding keeps the stroke length and pins the endpoints in place
+    left = (window - 1) // 2
+    padded = np.pad(arr, ((left, window - 1 - left), (0, 0)), mode="edge")
+    csum = np.cumsum(padded, axis=0)
+    csum = np.vstack((np.zeros((1, 2)), csum))
+    return (csum[window:] - csum[:-window]) / window
+
+
+def simplify_rdp(arr, eps):
+    # Iterative Ramer-Douglas-Peucker: an explicit stack of (start, end)
+    # spans instead of recursion, so long strokes can't hit the recursion limit.
+    n = len(arr)
+    if n < 3 or eps <= 0:
+        return arr
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        seg = arr[end] - arr[start]
+        rel = arr[start + 1:end] - arr[start]
+        seg_len = np.hypot(*seg)
+        if seg_len == 0:
+            dists = np.hypot(rel[:, 0], rel[:, 1])
+        else:
+            dists = np.abs(seg[0] * rel[:, 1] - seg[1] * rel[:, 0]) / seg_len
+        i = int(np.argmax(dists))
+        if dists[i] > eps:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return arr[keep]
+
+
+def resample(arr, count):
+    # `count` points evenly spaced along the polyline's arc length
+    if len(arr) < 2 or count < 2:
+        return arr
+    seg = np.hypot(*np.diff(arr, axis=0).T)
+    dist = np.concatenate(([0.0], np.cumsum(seg)))
+    total = dist[-1]
+    if total == 0:
+        return arr[:count]
+    targets = np.linspace(0.0, total, count)
+    return np.column_stack((
+        np.interp(targets, dist, arr[:, 0]),
+        np.interp(targets, dist, arr[:, 1]),
+    ))
+
+
+def preprocess(arr, smoothing_window=None, simplify_eps=None, max_points=MAX_RECOGNITION_POINTS):
+    # Returns (sampled, simplified). `sampled` is what the recognizer sees:
+    # at most max_points and never more points than the input. `simplified`
+    # is the compact polyline handed back when the stroke doesn't snap.
+    simplified = arr
+    if smoothing_window and smoothing_window > 1:
+        simplified = moving_average(simplified, smoothing_window)
+    if simplify_eps and simplify_eps > 0:
+        simplified = simplify_rdp(simplified, simplify_eps)
+
+    # RDP leaves a handful of vertices; spread them back out so the
+    # neighbour-based corner scan has enough samples, within the budget.
+    count = min(len(arr), max_points)
+    if len(simplified) != count:
+        sampled = resample(simplified, count)
+    else:
+        sampled = simplified
+    return sampled, simplified
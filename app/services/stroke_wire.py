@@ -0,0 +1,107 @@
+import struct
+import numpy as np
+
+# Compact binary stroke encodings, negotiated by Content-Type / Accept.
+#
+#   application/x-stroke-f32       packed little-endian float32 (x, y) pairs
+#   application/x-stroke-i16-delta little-endian int16 (x, y) pairs in whole
+#                                  pixels: first pair absolute, the rest
+#                                  deltas from the previous point
+#
+# A batch body is a little-endian uint32 stroke count, one uint32 point
+# count per stroke, then every stroke's pairs back to back. Batch responses
+# append one result per stroke: a float32 confidence, a uint8 length and
+# that many bytes of UTF-8 shape name (headers would outgrow proxy limits
+# on large batches). Coordinates must be finite.
+
+F32 = "application/x-stroke-f32"
+I16_DELTA = "application/x-stroke-i16-delta"
+CONTENT_TYPES = (F32, I16_DELTA)
+
+_I16_MIN, _I16_MAX = -32768, 32767
+
+
+def wire_type(header):
+    # first binary stroke type named in a Content-Type / Accept header
+    for part in (header or "").split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in CONTENT_TYPES:
+            return media_type
+    return None
+
+
+def _pair_size(content_type):
+    return 8 if content_type == F32 else 4
+
+
+def decode_stroke(body, content_type):
+    if len(body) % _pair_size(content_type):
+        raise ValueError("Stroke body is not a whole number of (x, y) pairs")
+    if content_type == F32:
+        # zero-copy view over the request body
+        arr = np.frombuffer(body, dtype="<f4").reshape(-1, 2)
+        if not np.isfinite(arr).all():
+            raise ValueError("Stroke coordinates must be finite numbers")
+        return arr
+    deltas = np.frombuffer(body, dtype="<i2").reshape(-1, 2)
+    return np.cumsum(deltas, axis=0, dtype=np.float64)
+
+
+def encode_stroke(arr, content_type):
+    if content_type == F32:
+        return np.ascontiguousarray(arr, dtype="<f4").tobytes()
+    # delta from the rounded absolute positions, so rounding never drifts
+    absolute = np.rint(arr).astype(np.int64)
+    deltas = np.diff(absolute, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+    if len(deltas) and (deltas.min() < _I16_MIN or deltas.max() > _I16_MAX):
+        raise ValueError("Stroke does not fit the int16 delta encoding")
+    return deltas.astype("<i2").tobytes()
+
+
+def decode_batch(body, content_type, with_results=False):
+    # -> strokes, or (strokes, [(shape, confidence), ...]) for a batch
+    # response read with_results
+    view = memoryview(body)
+    if len(view) < 4:
+        raise ValueError("Batch body is missing its stroke count")
+    (count,) = struct.unpack_from("<I", view, 0)
+    header_end = 4 + 4 * count
+    if len(view) < header_end:
+        raise ValueError("Batch body is missing point counts")
+    counts = np.frombuffer(view[4:header_end], dtype="<u4").astype(np.int64)
+
+    pair = _pair_size(content_type)
+    ends = header_end + np.cumsum(counts) * pair
+    strokes_end = int(ends[-1]) if count else header_end
+    if strokes_end > len(view) or (strokes_end != len(view) and not with_results):
+        raise ValueError("Batch body length does not match its point counts")
+
+    strokes = []
+    start = header_end
+    for end in ends.tolist():
+        strokes.append(decode_stroke(view[start:end], content_type))
+        start = end
+    if not with_results:
+        return strokes
+
+    results = []
+    for _ in range(count):
+        if start + 5 > len(view):
+            raise ValueError("Batch body is missing its results")
+        confidence, length = struct.unpack_from("<fB", view, start)
+        name = bytes(view[start + 5:start + 5 + length]).decode()
+        results.append((name, round(confidence, 4)))
+        start += 5 + length
+    if start != len(view):
+        raise ValueError("Batch body length does not match its results")
+    return strokes, results
+
+
+def encode_batch(arrays, content_type, results=None):
+    # results: (shape, confidence, ...) per stroke, for a batch response
+    parts = [struct.pack("<I", len(arrays)), np.array([len(a) for a in arrays], dtype="<u4").tobytes()]
+    parts.extend(encode_stroke(arr, content_type) for arr in arrays)
+    for shape, confidence, *_ in results or ():
+        name = shape.encode()[:255]
+        parts.append(struct.pack("<fB", confidence, len(name)) + name)
+    return b"".join(parts)
@@ -0,0 +1,232 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from sqlalchemy.exc import DataError, IntegrityError
+from app.crud import crud
+from app.database import SessionLocal
+from app.services import stroke_codec
+from app.services.blob_store import blob_store
+from app.services.perfect_drawing_numpy import to_points
+from app.services.recognition import to_response
+
+# Write-behind queue for audit rows. Requests only append to an in-memory
+# deque; a background thread turns the entries into rows and writes them
+# with one multi-row INSERT when AUDIT_FLUSH_SIZE rows are waiting or
+# AUDIT_FLUSH_INTERVAL seconds have passed, whichever comes first. The
+# queue is bounded by entry count and by the bytes of the stroke arrays it
+# holds: when the database can't keep up, new entries are dropped and
+# counted instead of growing memory.
+#
+# An INSERT rejected for its data (IntegrityError / DataError: a row for a
+# since-deleted user, say) is bisected down to the offending rows, so only
+# those are dropped, not everyone else's rows in the batch. Any other error
+# (database down, connection lost) fails the batch as a whole: it is
+# retried once after AUDIT_RETRY_DELAY seconds, then dropped.
+
+AUDIT_MAX_QUEUED = int(os.getenv("AUDIT_MAX_QUEUED", "10000"))
+AUDIT_MAX_QUEUED_BYTES = int(os.getenv("AUDIT_MAX_QUEUED_BYTES", str(64 * 1024 * 1024)))
+AUDIT_RETRY_DELAY = float(os.getenv("AUDIT_RETRY_DELAY", "1"))
+AUDIT_FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", "500"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2"))
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    def __init__(
+        self, insert_rows, to_row=None, max_queued=10000, flush_size=500, flush_interval=2.0,
+        max_bytes=None, sizeof=None, retry_delay=1.0,
+    ):
+        self.insert_rows = insert_rows      # fn(db, rows)
+        self.to_row = to_row or (lambda entry: entry)
+        self.max_queued = max_queued
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda entry: 0)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self._queue = deque()  # (entry, size)
+        self._bytes = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+        self.last_flush_ms = 0.0
+
+    def put(self, entry) -> bool:
+        size = self.sizeof(entry)
+        with self._cond:
+            if (
+                self._closed
+                or len(self._queue) >= self.max_queued
+                or (self.max_bytes is not None and self._bytes + size > self.max_bytes)
+            ):
+                self.dropped += 1
+                return False
+            self._queue.append((entry, size))
+            self._bytes += size
+            self.enqueued += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+            if len(self._queue) >= self.flush_size:
+                self._cond.notify()
+        return True
+
+    def _take(self) -> list:
+        batch = []
+        while self._queue and len(batch) < self.flush_size:
+            entry, size = self._queue.popleft()
+            self._bytes -= size
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and len(self._queue) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take()
+                closing = self._closed
+            if batch:
+                self._write(batch)
+            if closing:
+                return
+
+    def _write(self, batch: list):
+        start = time.perf_counter()
+        rows = []
+        for entry in batch:
+            try:
+                rows.append(self.to_row(entry))
+            except Exception:
+                self.failed_rows += 1
+                logger.exception("write-behind entry could not be converted, dropped")
+        pending = [rows] if rows else []
+        db = SessionLocal()
+        try:
+            try:
+                self._insert(db, pending)
+            except Exception:
+                db.rollback()
+                logger.warning("write-behind flush failed, retrying once", exc_info=True)
+                time.sleep(self.retry_delay)
+                try:
+                    self._insert(db, pending)
+                except Exception:
+                    db.rollback()
+                    lost = sum(len(chunk) for chunk in pending)
+                    self.failed_rows += lost
+                    logger.exception("write-behind flush failed again, %d rows dropped", lost)
+            self.flushes += 1
+        finally:
+            db.close()
+            self.last_flush_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    def _insert(self, db, pending: list):
+        # pending: stack of row chunks still to write, the whole batch to
+        # begin with. A chunk the database rejects for its data is split in
+        # halves, down to the single rows that fail. Any other error is
+        # raised with the unwritten chunks left on `pending`.
+        while pending:
+            rows = pending.pop()
+            try:
+                self.insert_rows(db, rows)
+                self.flushed_rows += len(rows)
+            except (IntegrityError, DataError):
+                db.rollback()
+                if len(rows) == 1:
+                    self.failed_rows += 1
+                    logger.warning("write-behind row dropped", exc_info=True)
+                    continue
+                middle = len(rows) // 2
+                pending.extend((rows[middle:], rows[:middle]))
+            except Exception:
+                pending.append(rows)
+                raise
+
+    def flush(self):
+        # Write everything queued so far from the calling thread
+        while True:
+            with self._cond:
+                batch = self._take()
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout: float = 10.0):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "queued_bytes": self._bytes,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+            "last_flush_ms": self.last_flush_ms,
+        }
+
+
+# ---------------- AI RESULTS ---------------- #
+
+def _entry_size(entry) -> int:
+    # the stroke array dominates; results are a few small values
+    return entry[1].nbytes + 256
+
+
+def _ai_result_row(entry) -> dict:
+    # Runs on the flush thread: encoding and blob writes stay off the request
+    # path. input_data uses the compact stroke format (see stroke_codec);
+    # the response JSON is a content-addressed blob, so repeated results are
+    # stored once.
+    user_id, arr, result, created_at = entry
+    output = json.dumps(to_response(result, to_points(arr)), separators=(",", ":")).encode()
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "input_data": stroke_codec.to_column(arr),
+        "output_filename": blob_store.put_bytes(output),
+        "created_at": created_at,
+    }
+
+
+ai_result_writer = WriteBehindQueue(
+    crud.bulk_insert_ai_results,
+    to_row=_ai_result_row,
+    max_queued=AUDIT_MAX_QUEUED,
+    flush_size=AUDIT_FLUSH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+    max_bytes=AUDIT_MAX_QUEUED_BYTES,
+    sizeof=_entry_size,
+    retry_delay=AUDIT_RETRY_DELAY,
+)
+
+
+def record_ai_results(user_id: str, arrays, results) -> None:
+    # results as returned by recognize_jobs, one per input array
+    if user_id:
+        created_at = datetime.utcnow()
+        for arr, result in zip(arrays, results):
+            ai_result_writer.put((user_id, arr, result, created_at))
@@ -0,0 +1,104 @@
+"""/register and /login throughput through the ASGI app, offline on SQLite.
+
+    python -m benchmarks.bench_auth --requests 40 --concurrency 1 8
+
+Sequential requests go through TestClient; concurrent ones through an
+httpx.AsyncClient on the ASGI transport with `concurrency` requests in
+flight. Every request does a real bcrypt hash / verify on the hashing
+pool, so the numbers mostly show how the pool and the event loop share
+that work. The database is a fresh temp file per run.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+from benchmarks.common import emit, summarize
+
+PASSWORD = "Passw0rd!"
+
+
+def _user(tag: str) -> dict:
+    name = f"bench_{tag}_{uuid.uuid4().hex[:12]}"
+    return {"name": "Bench User", "email": f"{name}@example.com", "username": name, "password": PASSWORD}
+
+
+def _result(kind: str, concurrency: int, samples, elapsed: float, statuses) -> dict:
+    return {
+        "endpoint": kind,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "requests_per_s": round(len(samples) / elapsed, 2),
+        "errors": sum(1 for s in statuses if s != 200),
+        "latency": summarize(samples),
+    }
+
+
+def _sequential(client, kind: str, users) -> dict:
+    samples, statuses = [], []
+    started = time.perf_counter()
+    for user in users:
+        start = time.perf_counter()
+        if kind == "register":
+            response = client.post("/register", json=user)
+        else:
+            response = client.post("/login", data={"username": user["username"], "password": PASSWORD})
+        samples.append((time.perf_counter() - start) * 1e6)
+        statuses.append(response.status_code)
+    return _result(kind, 1, samples, time.perf_counter() - started, statuses)
+
+
+async def _concurrent(app, kind: str, users, concurrency: int) -> dict:
+    import httpx
+
+    samples, statuses = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(client, user):
+        async with semaphore:
+            start = time.perf_counter()
+            if kind == "register":
+                response = await client.post("/register", json=user)
+            else:
+                response = await client.post("/login", data={"username": user["username"], "password": PASSWORD})
+            samples.append((time.perf_counter() - start) * 1e6)
+            statuses.append(response.status_code)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(one(client, user) for user in users))
+        return _result(kind, concurrency, samples, time.perf_counter() - started, statuses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    # fresh database; one client IP for every request, so lift the per-IP cap
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_auth_"), "bench.sqlite3")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("HASH_PER_IP_LIMIT", "1000")
+    os.environ.setdefault("HASH_MAX_PENDING", "1000")
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    results = {"benchmark": "auth", "cases": []}
+    with TestClient(app) as client:
+        for concurrency in args.concurrency:
+            users = [_user(str(concurrency)) for _ in range(args.requests)]
+            for kind in ("register", "login"):
+                if concurrency == 1:
+                    case = _sequential(client, kind, users)
+                else:
+                    case = client.portal.call(_concurrent, app, kind, users, concurrency)
+                results["cases"].append(case)
+    emit(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Delta-encoded flipbook frames: storage and random-access cost.
+
+    python -m benchmarks.bench_frames --frames 300 --intervals 1 10 30 60
+
+Frames are a synthetic animation: every frame moves one stroke, and every
+few frames one stroke is added or removed. Each keyframe interval encodes
+the same frames into a throwaway SQLite database and blob store (interval 1
+is "every frame whole", the layout before delta encoding). "cold" loads a
+random frame with the rebuilt-frame cache empty, "warm" with the flipbook
+already in it; both include the chain query.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import uuid
+
+from benchmarks.common import emit, timed
+
+
+def animation(count: int, seed: int = 0):
+    rng = random.Random(seed)
+
+    def stroke():
+        x, y = rng.uniform(0, 800), rng.uniform(0, 600)
+        return {"points": [{"x": round(x + 4 * i, 1), "y": round(y + rng.uniform(-6, 6), 1)} for i in range(50)]}
+
+    strokes = [stroke() for _ in range(20)]
+    frames = []
+    for n in range(count):
+        if n % 5 == 0:
+            strokes.append(stroke())
+        if n % 11 == 0:
+            strokes.pop(rng.randrange(len(strokes)))
+        i = rng.randrange(len(strokes))
+        moved = [{"x": p["x"] + 3, "y": p["y"] - 2} for p in strokes[i]["points"]]
+        strokes[i] = {**strokes[i], "points": moved}
+        frames.append(json.dumps({"width": 1000, "height": 700, "strokes": list(strokes)}).encode())
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--intervals", type=int, nargs="+", default=[1, 10, 30, 60])
+    parser.add_argument("--lookups", type=int, default=100)
+    args = parser.parse_args()
+
+    # the app reads DATABASE_URL and the blob store root at import time
+    workdir = tempfile.mkdtemp(prefix="bench_frames_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'frames.sqlite3')}"
+    os.environ["UPLOAD_DIR"] = workdir
+    from app.crud import crud
+    from app.database import Base, SessionLocal, engine
+    from app.services import frame_codec
+    from app.services.blob_store import blob_store
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    frames = animation(args.frames)
+    rng = random.Random(1)
+    lookups = [rng.randrange(args.frames) for _ in range(args.lookups)]
+
+    results = {"benchmark": "frames", "frames": args.frames, "frame_bytes": sum(map(len, frames)), "cases": []}
+    for interval in args.intervals:
+        flipbook_id = str(uuid.uuid4())
+        encoder = frame_codec.FrameEncoder(interval=interval)
+        rows = []
+        for n, data in enumerate(frames):
+            filename, keyframe = encoder.store(n, io.BytesIO(data))
+            rows.append({"flipbook_id": flipbook_id, "frame_number": n, "filename": filename, "keyframe": keyframe})
+        crud.bulk_insert_frames(db, rows)
+
+        def load(n):
+            frame_codec.load_frame(db, crud.get_frame(db, flipbook_id, n))
+
+        def load_cold(n):
+            frame_codec.frame_cache.clear()
+            load(n)
+
+        for n in range(args.frames):
+            load(n)
+        results["cases"].append({
+            "interval": interval,
+            "keyframes": sum(row["keyframe"] is None for row in rows),
+            "stored_bytes": sum(os.path.getsize(blob_store.path(row["filename"])) for row in rows),
+            "cold": timed(load_cold, lookups),
+            "warm": timed(load, lookups),
+        })
+    db.close()
+    emit(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Cold import cost of app.main, with a budget check.
+
+    python -m benchmarks.bench_import --runs 5 --budget-ms 1500
+
+Each run imports app.main in a fresh interpreter, as a worker boot does,
+and records the wall time plus python -X importtime's per-module numbers.
+Importing must also stay free of side effects: nothing printed, and the
+database named by DATABASE_URL not created (the engine and schema check
+belong to startup, not import).
+
+Exits with status 1 when the median import time is over --budget-ms or
+the import had a side effect, so it can gate CI next to the benchmarks.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.common import emit, summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "import sys; sys.stderr.write('wall_us %d\\n' % ((time.perf_counter() - start) * 1e6))"
+)
+
+
+def _import_once(db_path: str):
+    # -> (wall time in us, {module: (self us, cumulative us)}, stdout)
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        "DATABASE_URL": f"sqlite:///{db_path}",
+    }
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    modules, wall = {}, None
+    for line in proc.stderr.splitlines():
+        if line.startswith("wall_us "):
+            wall = int(line.split()[1])
+        elif line.startswith("import time:") and "|" in line and "self [us]" not in line:
+            own, cumulative, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = (int(own), int(cumulative))
+    return wall, modules, proc.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "1500")))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench_import_"), "never_created.sqlite3")
+    walls, runs, printed = [], [], ""
+    for _ in range(args.runs):
+        wall, modules, stdout = _import_once(db_path)
+        walls.append(wall)
+        runs.append(modules)
+        printed = printed or stdout
+
+    # median self time per module across runs; first-party modules cumulative
+    names = set().union(*runs)
+    own = {name: statistics.median(r[name][0] for r in runs if name in r) for name in names}
+    app_modules = {
+        name: statistics.median(r[name][1] for r in runs if name in r)
+        for name in names if name == "app" or name.startswith("app.")
+    }
+    median_ms = statistics.median(walls) / 1000
+    side_effects = []
+    if printed:
+        side_effects.append(f"printed on import: {printed.strip()[:200]!r}")
+    if os.path.exists(db_path):
+        side_effects.append("import created the database file")
+
+    results = {
+        "benchmark": "import_time",
+        "import_app_main": summarize(walls),
+        "budget_ms": args.budget_ms,
+        "within_budget": median_ms <= args.budget_ms,
+        "side_effects": side_effects,
+        "slowest_modules_self_us": dict(sorted(own.items(), key=lambda kv: -kv[1])[:args.top]),
+        "app_modules_cumulative_us": dict(sorted(app_modules.items(), key=lambda kv: -kv[1])[:args.top]),
+    }
+    emit(results)
+    if side_effects or median_ms > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""detect_shape / smooth_points latency per engine, shape class and stroke size.
+
+    python -m benchmarks.bench_recognition --sizes 10 100 1000 10000 100000
+
+Strokes are synthetic (benchmarks/strokes.py) with a fixed seed. The local
+engine takes lists of point dicts, the array engines (numpy, features) take
+arrays, as they do in the app; conversion is not part of the timing.
+"pipeline" is the per-stroke work a pool worker does (preprocess + recognize).
+"""
+import argparse
+
+from benchmarks.common import emit, repeat
+from benchmarks.strokes import SHAPES, as_points, stroke
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10_000, 100_000])
+    parser.add_argument("--shapes", nargs="+", default=list(SHAPES))
+    parser.add_argument("--engines", nargs="+", default=["local", "numpy", "features"])
+    parser.add_argument("--min-seconds", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from app.services.recognition import get_engine, recognize_array
+
+    results = {"benchmark": "recognition", "cases": []}
+    for engine_name in args.engines:
+        engine = get_engine(engine_name)
+        for shape in args.shapes:
+            for n in args.sizes:
+                arr = stroke(shape, n)
+                if hasattr(engine, "detect_shape_array"):
+                    data = arr
+                    detect, smooth = engine.detect_shape_array, engine.smooth_points_array
+                else:
+                    data = as_points(arr)
+                    detect, smooth = engine.detect_shape, engine.smooth_points
+                recognized, _ = detect(data)
+                results["cases"].append({
+                    "engine": engine_name,
+                    "shape": shape,
+                    "points": n,
+                    "recognized_as": recognized,
+                    "detect_shape": repeat(lambda: detect(data), min_seconds=args.min_seconds),
+                    "smooth_points": repeat(lambda: smooth(recognized, data), min_seconds=args.min_seconds),
+                    "pipeline": repeat(lambda: recognize_array(arr, engine), min_seconds=args.min_seconds),
+                })
+    emit(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Scene grouping cost per canvas size.
+
+    python -m benchmarks.bench_scene --strokes 100 1000 10000
+
+Canvases are synthetic: four-stroke rectangles and loose 30-point
+scribbles scattered over a square whose area grows with the stroke count,
+so density stays constant. "group" is scene_grouping.group_strokes (grid
+index), "scene" adds joining each group into one polyline, as the pool job
+does. "all_pairs" checks every pair of strokes without the index, for
+comparison; it only runs up to --max-all-pairs strokes.
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import emit, repeat
+from benchmarks.strokes import _polyline
+
+
+def canvas(count: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    side = 300 * np.sqrt(count)
+    strokes = []
+    while len(strokes) < count:
+        x, y = rng.uniform(0, side, 2)
+        if rng.random() < 0.3 and len(strokes) + 4 <= count:
+            corners = [(x, y), (x + 120, y), (x + 120, y + 80), (x, y + 80), (x, y)]
+            for a, b in zip(corners, corners[1:]):
+                strokes.append(_polyline([a, b], 20) + rng.normal(0, 1, (20, 2)))
+        else:
+            strokes.append(np.array([x, y]) + np.cumsum(rng.normal(0, 3, (30, 2)), axis=0))
+    return strokes
+
+
+def all_pairs(arrays, join_distance):
+    # the unindexed baseline: every endpoint against every other stroke
+    from app.services.scene_grouping import _distances
+
+    touching = 0
+    for i, arr in enumerate(arrays):
+        for point in (arr[0], arr[-1]):
+            for j, other in enumerate(arrays):
+                if j != i and _distances(point, other).min() <= join_distance:
+                    touching += 1
+    return touching
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--strokes", type=int, nargs="+", default=[100, 1000, 10_000])
+    parser.add_argument("--max-all-pairs", type=int, default=1000)
+    parser.add_argument("--min-seconds", type=float, default=0.2)
+    args = parser.parse_args()
+
+    from app.services.scene_grouping import SCENE_JOIN_DISTANCE, group_strokes
+    from app.services.recognition import scene_groups
+
+    results = {"benchmark": "scene", "cases": []}
+    for count in args.strokes:
+        arrays = canvas(count)
+        case = {
+            "strokes": count,
+            "groups": len(group_strokes(arrays)),
+            "group": repeat(lambda: group_strokes(arrays), min_runs=3, min_seconds=args.min_seconds),
+            "scene": repeat(lambda: scene_groups(arrays), min_runs=3, min_seconds=args.min_seconds),
+        }
+        if count <= args.max_all_pairs:
+            case["all_pairs"] = repeat(lambda: all_pairs(arrays, SCENE_JOIN_DISTANCE), min_runs=1, min_seconds=0)
+        results["cases"].append(case)
+    emit(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""User lookup latency: lower(column) scan vs. indexed normalized column.
+
+    python -m benchmarks.bench_user_lookup --users 1000000
+
+Builds a throwaway SQLite database with N users (reused between runs when
+the file already holds N rows) and prints one JSON object with per-lookup
+latency for the legacy func.lower() query and the current CRUD lookups.
+"""
+import argparse
+import os
+import random
+import tempfile
+import uuid
+
+from benchmarks.common import emit, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--legacy-lookups", type=int, default=20)
+    parser.add_argument("--db", default=None, help="defaults to a temp file per user count")
+    args = parser.parse_args()
+    args.db = args.db or os.path.join(tempfile.gettempdir(), f"bench_users_{args.users}.sqlite3")
+
+    # the app reads DATABASE_URL at import time, so point it at the bench DB first
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    from sqlalchemy import func
+    from app.crud import crud
+    from app.database import Base, SessionLocal, engine
+    from app.models.models import User
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        existing = conn.execute(User.__table__.select().with_only_columns(func.count())).scalar()
+        if existing != args.users:
+            conn.execute(User.__table__.delete())
+            for start in range(0, args.users, 50_000):
+                conn.execute(User.__table__.insert(), [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "name": f"User {i}",
+                        "username": f"User_{i}",
+                        "username_normalized": f"user_{i}",
+                        "email": f"user_{i}@example.com",
+                        "password": "x",
+                    }
+                    for i in range(start, min(start + 50_000, args.users))
+                ])
+
+    rng = random.Random(42)
+    usernames = [f"USER_{rng.randrange(args.users)}" for _ in range(args.lookups)]
+    emails = [f"User_{rng.randrange(args.users)}@Example.com" for _ in range(args.lookups)]
+
+    db = SessionLocal()
+    try:
+        def legacy_username(username):
+            db.query(User).filter(func.lower(User.username) == username.lower()).first()
+            db.expunge_all()
+
+        def by_username(username):
+            crud.get_user_by_username(db, username)
+            db.expunge_all()
+
+        def by_email(email):
+            crud.get_user_by_email(db, email)
+            db.expunge_all()
+
+        results = {
+            "benchmark": "user_lookup",
+            "users": args.users,
+            "legacy_lower_username": timed(legacy_username, usernames[:args.legacy_lookups]),
+            "get_user_by_username": timed(by_username, usernames),
+            "get_user_by_email": timed(by_email, emails),
+        }
+    finally:
+        db.close()
+    emit(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Stroke wire cost: request decoding and JSON response encoding.
+
+    python -m benchmarks.bench_wire --sizes 100 1000 10000 100000
+
+"json" is what /ai/perfect-drawing does with a JSON body (pydantic
+validation of StrokeData, then the (N, 2) array); the binary rows are
+stroke_wire.decode_stroke for each wire type. Body sizes are reported too.
+
+The "response" cases encode smoothed_points the old way (a dict per point
+through FastAPI's jsonable_encoder and stdlib json) and from the array with
+fast_json.points_json.
+"""
+import argparse
+import json
+import os
+
+from benchmarks.common import emit, repeat
+from benchmarks.strokes import as_points, stroke
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10_000, 100_000])
+    parser.add_argument("--min-seconds", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # the route module reads DATABASE_URL on import; no database is touched
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from app.routes.ai_drawing import StrokeData
+    from fastapi.encoders import jsonable_encoder
+    from app.services import stroke_wire
+    from app.services.fast_json import points_json
+    from app.services.perfect_drawing_numpy import as_array, to_points
+
+    results = {"benchmark": "wire_decode", "cases": []}
+    for n in args.sizes:
+        arr = stroke("circle", n).round(2)
+        bodies = {"json": json.dumps({"points": as_points(arr)}).encode()}
+        for content_type in stroke_wire.CONTENT_TYPES:
+            bodies[content_type] = stroke_wire.encode_stroke(arr, content_type)
+
+        def decode_json():
+            as_array(StrokeData.model_validate_json(bodies["json"]).points)
+
+        for name, body in bodies.items():
+            if name == "json":
+                fn = decode_json
+            else:
+                fn = lambda body=body, ct=name: stroke_wire.decode_stroke(body, ct)
+            results["cases"].append({
+                "encoding": name,
+                "points": n,
+                "body_bytes": len(body),
+                "decode": repeat(fn, min_seconds=args.min_seconds),
+            })
+
+        results["cases"].append({
+            "encoding": "response_dicts_stdlib",
+            "points": n,
+            "encode": repeat(lambda: json.dumps(jsonable_encoder(to_points(arr))), min_seconds=args.min_seconds),
+        })
+        results["cases"].append({
+            "encoding": "response_points_json",
+            "points": n,
+            "encode": repeat(lambda: points_json(arr), min_seconds=args.min_seconds),
+        })
+    emit(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Helpers shared by the benchmark scripts."""
+import json
+import statistics
+import time
+
+
+def summarize(samples_us) -> dict:
+    samples = sorted(samples_us)
+    return {
+        "runs": len(samples),
+        "mean_us": round(statistics.fmean(samples), 2),
+        "p50_us": round(samples[len(samples) // 2], 2),
+        "p99_us": round(samples[max(0, int(len(samples) * 0.99) - 1)], 2),
+    }
+
+
+def timed(fn, keys) -> dict:
+    # one call per key, latency per call
+    samples = []
+    for key in keys:
+        start = time.perf_counter()
+        fn(key)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return summarize(samples)
+
+
+def repeat(fn, min_runs: int = 5, min_seconds: float = 0.2, max_runs: int = 10_000) -> dict:
+    # call fn() until both min_runs and min_seconds are reached
+    samples = []
+    deadline = time.perf_counter() + min_seconds
+    while len(samples) < max_runs and (len(samples) < min_runs or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return summarize(samples)
+
+
+def emit(results: dict):
+    print(json.dumps(results, indent=2))
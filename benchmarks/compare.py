@@ -0,0 +1,61 @@
+"""Compare two run_all outputs and list regressions.
+
+    python -m benchmarks.compare base.json head.json --threshold 0.10
+
+Latencies (mean_us) are lower-is-better, throughput (requests_per_s)
+higher-is-better. Exits with status 1 when any metric got worse by more
+than the threshold, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+# fields that tell cases of one suite apart
+CASE_KEYS = ("engine", "shape", "points", "encoding", "endpoint", "concurrency")
+
+
+def _metrics(report: dict) -> dict:
+    # {"suite | case | metric": (value, higher_is_better)}
+    flat = {}
+    for suite, result in report.get("suites", {}).items():
+        for case in result.get("cases", [result]):
+            label = " ".join(f"{k}={case[k]}" for k in CASE_KEYS if k in case)
+            for key, value in case.items():
+                name = f"{suite} | {label} | {key}" if label else f"{suite} | {key}"
+                if isinstance(value, dict) and "mean_us" in value:
+                    flat[f"{name}.mean_us"] = (value["mean_us"], False)
+                elif key == "requests_per_s":
+                    flat[name] = (value, True)
+    return flat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = _metrics(json.load(f))
+    with open(args.head) as f:
+        head = _metrics(json.load(f))
+
+    regressions = 0
+    for name in sorted(base.keys() & head.keys()):
+        (old, higher_is_better), (new, _) = base[name], head[name]
+        if not old:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        if worse > args.threshold:
+            regressions += 1
+            print(f"REGRESSION {name}: {old} -> {new} ({change:+.1%})")
+        elif worse < -args.threshold:
+            print(f"improved   {name}: {old} -> {new} ({change:+.1%})")
+    print(f"{regressions} regression(s) over {args.threshold:.0%} across {len(base.keys() & head.keys())} metrics")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Run every benchmark and write one JSON document.
+
+    python -m benchmarks.run_all --output bench-$(git rev-parse --short HEAD).json
+    python -m benchmarks.run_all --quick
+
+Each benchmark runs in its own interpreter (the app reads its database
+settings at import time, and the suites use different databases). The
+output records the commit and machine next to the results, so two runs can
+be diffed with benchmarks.compare.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SUITES = {
+    "recognition": ["benchmarks.bench_recognition"],
+    "wire_decode": ["benchmarks.bench_wire"],
+    "scene": ["benchmarks.bench_scene"],
+    "frames": ["benchmarks.bench_frames"],
+    "user_lookup_10k": ["benchmarks.bench_user_lookup", "--users", "10000"],
+    "user_lookup_1m": ["benchmarks.bench_user_lookup", "--users", "1000000"],
+    "auth": ["benchmarks.bench_auth"],
+    "import_time": ["benchmarks.bench_import"],
+}
+
+QUICK = {
+    "recognition": ["--sizes", "10", "1000", "10000", "--min-seconds", "0.05"],
+    "wire_decode": ["--sizes", "100", "10000", "--min-seconds", "0.05"],
+    "scene": ["--strokes", "100", "1000", "--min-seconds", "0.05"],
+    "frames": ["--frames", "120", "--lookups", "30"],
+    "user_lookup_1m": None,  # skipped: building 1M users takes minutes
+    "auth": ["--requests", "8", "--concurrency", "1", "4"],
+    "import_time": ["--runs", "3"],
+}
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _environment() -> dict:
+    import numpy
+
+    return {
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def _run(module_args) -> dict:
+    env = {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    proc = subprocess.run(
+        [sys.executable, "-m", *module_args], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1:] or ["exit %d" % proc.returncode]}
+    out = proc.stdout
+    # the results are the last thing printed; anything before is app logging
+    start = 0 if out.startswith("{") else out.index("\n{") + 1
+    return json.loads(out[start:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(SUITES))
+    parser.add_argument("--quick", action="store_true", help="smaller inputs, skips the 1M-user lookup")
+    parser.add_argument("--output", help="write here instead of stdout")
+    args = parser.parse_args()
+
+    report = {"environment": _environment(), "quick": args.quick, "suites": {}}
+    for name, module_args in SUITES.items():
+        if args.only and name not in args.only:
+            continue
+        if args.quick and name in QUICK:
+            if QUICK[name] is None:
+                continue
+            module_args = module_args + QUICK[name]
+        print(f"running {name} ...", file=sys.stderr)
+        started = time.perf_counter()
+        report["suites"][name] = _run(module_args)
+        report["suites"][name]["wall_s"] = round(time.perf_counter() - started, 2)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
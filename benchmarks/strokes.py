@@ -0,0 +1,37 @@
+"""Synthetic strokes for the benchmarks: one generator per shape class."""
+import numpy as np
+
+SHAPES = ("circle", "square", "rectangle", "triangle", "line")
+
+
+def _polyline(corners, n: int):
+    # n points spread along the closed/open polyline through `corners`
+    corners = np.asarray(corners, dtype=np.float64)
+    lengths = np.hypot(*np.diff(corners, axis=0).T)
+    positions = np.linspace(0, lengths.sum(), n)
+    edges = np.concatenate(([0], np.cumsum(lengths)))
+    index = np.clip(np.searchsorted(edges, positions, side="right") - 1, 0, len(lengths) - 1)
+    t = ((positions - edges[index]) / lengths[index])[:, None]
+    return corners[index] + t * (corners[index + 1] - corners[index])
+
+
+def stroke(shape: str, n: int, noise: float = 1.5, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    if shape == "circle":
+        angles = np.linspace(0, 2 * np.pi, n)
+        arr = np.column_stack((400 + 150 * np.cos(angles), 300 + 150 * np.sin(angles)))
+    elif shape == "square":
+        arr = _polyline([(100, 100), (300, 100), (300, 300), (100, 300), (100, 100)], n)
+    elif shape == "rectangle":
+        arr = _polyline([(100, 100), (500, 100), (500, 250), (100, 250), (100, 100)], n)
+    elif shape == "triangle":
+        arr = _polyline([(300, 100), (500, 400), (100, 400), (300, 100)], n)
+    elif shape == "line":
+        arr = _polyline([(100, 100), (600, 350)], n)
+    else:
+        raise ValueError(shape)
+    return arr + rng.normal(0, noise, arr.shape)
+
+
+def as_points(arr):
+    return [{"x": x, "y": y} for x, y in arr.tolist()]
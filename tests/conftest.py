@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+import pytest
+
+# the app reads DATABASE_URL and UPLOAD_DIR at import time: a throwaway
+# SQLite database and blob store for the whole session
+_workdir = tempfile.mkdtemp(prefix="smart_tests_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_workdir, 'test.sqlite3')}")
+os.environ.setdefault("UPLOAD_DIR", _workdir)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    user = {"name": "Test User", "email": "test@example.com", "username": "test_user", "password": "Passw0rd!"}
+    client.post("/register", json=user)
+    response = client.post("/login", data={"username": user["username"], "password": user["password"]})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
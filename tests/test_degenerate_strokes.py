@@ -0,0 +1,33 @@
+import pytest
+
+from app.services.online_recognition import OnlineStroke
+from app.services.recognition import get_engine
+
+FLAT = [(x, 0) for x in (0, 1, 2, 2, 3, 4)]
+VERTICAL = [(0, y) for y in (0, 1, 2, 2, 3, 4)]
+DOT = [(5, 5)] * 8
+
+
+def _points(pairs):
+    return [{"x": x, "y": y} for x, y in pairs]
+
+
+@pytest.mark.parametrize("engine", ["local", "numpy", "features"])
+@pytest.mark.parametrize("pairs, expected", [(FLAT, "line"), (VERTICAL, "line"), (DOT, "unknown")])
+def test_flat_strokes_are_not_shapes(engine, pairs, expected):
+    shape, _ = get_engine(engine).detect_shape(_points(pairs))
+    assert shape == expected
+
+
+@pytest.mark.parametrize("pairs", [FLAT, VERTICAL, DOT])
+def test_online_stroke_matches_detect_shape(pairs):
+    stroke = OnlineStroke()
+    stroke.extend(_points(pairs))
+    assert stroke.classify() == get_engine("local").detect_shape(_points(pairs))
+
+
+@pytest.mark.parametrize("pairs", [FLAT, VERTICAL, DOT])
+def test_perfect_drawing_accepts_flat_strokes(client, pairs):
+    response = client.post("/ai/perfect-drawing", json={"points": _points(pairs)})
+    assert response.status_code == 200
+    assert response.json()["recognized_as"] == ("unknown" if pairs is DOT else "line")
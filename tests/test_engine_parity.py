@@ -0,0 +1,129 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from app.services import perfect_drawing_local as local
+from app.services import perfect_drawing_numpy as vectorized
+from app.services import shape_fitting
+
+# The pure-Python and NumPy engines must agree: same label and confidence
+# from detect_shape, same snapped points from smooth_points. They share no
+# code, so these compare two implementations.
+
+SNAP_SHAPES = ("circle", "square", "rectangle", "triangle", "line", "unknown")
+
+
+def _polygon(rng, n):
+    sides = int(rng.integers(2, 7))
+    angles = np.sort(rng.uniform(0, 2 * np.pi, sides))
+    radius = rng.uniform(5, 400)
+    corners = np.column_stack((np.cos(angles), np.sin(angles))) * radius
+    corners = np.vstack((corners, corners[:1])) if rng.random() < 0.7 else corners
+    t = np.linspace(0, len(corners) - 1, n)
+    i = np.minimum(t.astype(int), len(corners) - 2)
+    arr = corners[i] + (t - i)[:, None] * (corners[i + 1] - corners[i])
+    return arr + rng.uniform(-1000, 1000, 2) + rng.normal(0, rng.uniform(0, 3), arr.shape)
+
+
+def _ellipse(rng, n):
+    t = np.linspace(0, 2 * np.pi * rng.uniform(0.6, 1.05), n)
+    a, b = rng.uniform(5, 300, 2)
+    arr = np.column_stack((a * np.cos(t), b * np.sin(t)))
+    return arr + rng.uniform(-500, 500, 2) + rng.normal(0, rng.uniform(0, 3), arr.shape)
+
+
+def _circle(rng, n):
+    t = np.linspace(0, 2 * np.pi, n)
+    arr = rng.uniform(10, 300) * np.column_stack((np.cos(t), np.sin(t)))
+    return arr + rng.uniform(-500, 500, 2) + rng.normal(0, rng.uniform(0, 2), arr.shape)
+
+
+def _walk(rng, n):
+    return np.cumsum(rng.normal(0, rng.uniform(0.5, 20), (n, 2)), axis=0)
+
+
+def random_strokes(count=300, seed=0):
+    rng = np.random.default_rng(seed)
+    makers = (_polygon, _ellipse, _circle, _walk)
+    for _ in range(count):
+        yield makers[int(rng.integers(len(makers)))](rng, int(rng.integers(3, 300)))
+
+
+DEGENERATE = {
+    "empty": np.zeros((0, 2)),
+    "single": np.array([[3.0, 4.0]]),
+    "two": np.array([[0.0, 0.0], [10.0, 10.0]]),
+    "dot": np.full((10, 2), 7.0),
+    "flat": np.array([[x, 0.0] for x in (0, 1, 2, 2, 1, 0)]),
+    "vertical": np.array([[0.0, y] for y in (0, 1, 2, 2, 1, 0)]),
+    "collinear": np.column_stack((np.arange(50.0), 2 * np.arange(50.0))),
+    "back_and_forth": np.array([[0.0, 0.0], [100.0, 0.0]] * 10),
+    "tiny": np.random.default_rng(1).normal(0, 1e-9, (40, 2)),
+    "huge": np.random.default_rng(2).normal(1e7, 1e3, (40, 2)),
+    "negative": -np.abs(np.random.default_rng(3).normal(500, 50, (40, 2))),
+}
+
+
+def _points(arr):
+    return [{"x": x, "y": y} for x, y in arr.tolist()]
+
+
+def _assert_same_detection(arr):
+    label, confidence = local.detect_shape(_points(arr))
+    expected_label, expected_confidence = vectorized.detect_shape(_points(arr))
+    assert label == expected_label
+    assert confidence == pytest.approx(expected_confidence, rel=1e-9, abs=1e-12)
+
+
+def _assert_same_smoothing(arr):
+    points = _points(arr)
+    for shape in SNAP_SHAPES:
+        ours = local.smooth_points(shape, points)
+        theirs = vectorized.smooth_points(shape, points)
+        assert len(ours) == len(theirs)
+        np.testing.assert_allclose(
+            [(p["x"], p["y"]) for p in ours], [(p["x"], p["y"]) for p in theirs], rtol=1e-9, atol=1e-6,
+        )
+
+
+def test_detect_shape_parity_random():
+    for arr in random_strokes():
+        _assert_same_detection(arr)
+
+
+def test_smooth_points_parity_random():
+    for arr in random_strokes(count=100, seed=1):
+        if len(arr) >= 3:
+            _assert_same_smoothing(arr)
+
+
+@pytest.mark.parametrize("name", sorted(DEGENERATE))
+def test_detect_shape_parity_degenerate(name):
+    _assert_same_detection(DEGENERATE[name])
+
+
+@pytest.mark.parametrize("name", sorted(n for n, arr in DEGENERATE.items() if len(arr) >= 3))
+def test_smooth_points_parity_degenerate(name):
+    _assert_same_smoothing(DEGENERATE[name])
+
+
+def test_local_engine_imports_without_numpy():
+    # the pure-Python engine must not fall back on numpy for its fits
+    code = (
+        "import sys; sys.modules['numpy'] = None\n"
+        "from app.services import perfect_drawing_local as local\n"
+        "pts = [{'x': x, 'y': y} for x, y in [(0, 0), (40, 0), (40, 20), (0, 20), (0, 0), (20, 0)]]\n"
+        "print(len(local.smooth_points('rectangle', pts)), len(local.smooth_points('triangle', pts)))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["5", "4"]
+
+
+def test_curve_density_matches_shape_fitting():
+    for radius in (0.1, 0.5, 3, 10, 150, 600, 1e5):
+        assert local.curve_points(radius) == shape_fitting.curve_points(radius)
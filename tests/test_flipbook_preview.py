@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+
+from app.crud import crud
+from app.database import SessionLocal
+from app.models.models import FlipbookFrame
+from app.services import flipbook_render, frame_codec
+from app.services.blob_store import blob_store
+
+
+def _preview(client, headers, flipbook_id, polls=50):
+    for _ in range(polls):
+        response = client.get(f"/flipbooks/{flipbook_id}/preview", headers=headers)
+        if response.status_code != 202:
+            return response
+        time.sleep(0.1)
+    return response
+
+
+def test_failed_render_is_reported_not_retried(client, auth_headers):
+    flipbook = client.post("/flipbooks", json={"title": "Broken"}, headers=auth_headers).json()
+    corrupt = b"\x89PNG\r\n\x1a\n" + b"x" * 100
+    client.post(
+        f"/flipbooks/{flipbook['id']}/frames",
+        files=[("frames", ("f.png", corrupt, "image/png"))],
+        headers=auth_headers,
+    )
+
+    response = _preview(client, auth_headers, flipbook["id"])
+    assert response.status_code == 422
+    assert "frame 0" in response.json()["detail"]
+
+    # still reported, and nothing is queued again
+    assert client.get(f"/flipbooks/{flipbook['id']}/preview", headers=auth_headers).status_code == 422
+    assert not flipbook_render._pending
+
+
+def _stroke_frames(client, headers, title, count=5):
+    # blobs are content-addressed: the title keeps each test's frames apart
+    flipbook = client.post("/flipbooks", json={"title": title}, headers=headers).json()
+    files = [
+        ("frames", (f"{i}.json", json.dumps({"width": 64, "height": 64, "title": title, "strokes": [
+            {"points": [{"x": 4 + i, "y": 4}, {"x": 30 + i, "y": 40}, {"x": 60, "y": 10 + i}]},
+            {"points": [{"x": 2, "y": 60}, {"x": 50, "y": 60}]},
+        ]}), "application/json"))
+        for i in range(count)
+    ]
+    client.post(f"/flipbooks/{flipbook['id']}/frames", files=files, headers=headers)
+    return flipbook["id"]
+
+
+def _frame_rows(flipbook_id):
+    db = SessionLocal()
+    try:
+        return crud.list_frames_encoded(db, flipbook_id, -1, 100)
+    finally:
+        db.close()
+
+
+def test_delta_frames_are_rebuilt_by_the_render_job(client, auth_headers, monkeypatch):
+    flipbook_id = _stroke_frames(client, auth_headers, "Deltas")
+    assert any(row.keyframe is not None for row in _frame_rows(flipbook_id))
+
+    threads = []
+    original = frame_codec.rebuild
+
+    def rebuild(rows, keys=None):
+        threads.append(threading.current_thread().name)
+        return original(rows, keys)
+
+    monkeypatch.setattr(frame_codec, "rebuild", rebuild)
+    frame_codec.frame_cache.clear()
+    response = _preview(client, auth_headers, flipbook_id)
+    assert response.status_code == 200
+    assert threads and all(name.startswith("flipbook-render") for name in threads)
+
+
+def test_missing_delta_blob_is_reported(client, auth_headers):
+    flipbook_id = _stroke_frames(client, auth_headers, "Lost delta")
+    delta = next(row for row in _frame_rows(flipbook_id) if row.keyframe is not None)
+    os.remove(blob_store.path(delta.filename))
+    frame_codec.frame_cache.clear()
+
+    response = _preview(client, auth_headers, flipbook_id)
+    assert response.status_code == 422
+    assert "rebuilt" in response.json()["detail"]
+
+
+def test_delta_without_base_row_is_422(client, auth_headers):
+    flipbook_id = _stroke_frames(client, auth_headers, "Lost keyframe")
+    db = SessionLocal()
+    try:
+        db.query(FlipbookFrame).filter(
+            FlipbookFrame.flipbook_id == flipbook_id, FlipbookFrame.frame_number == 0
+        ).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.get(f"/flipbooks/{flipbook_id}/preview", headers=auth_headers)
+    assert response.status_code == 422
+    assert client.get(f"/flipbooks/{flipbook_id}/frames/1", headers=auth_headers).status_code == 422
@@ -0,0 +1,52 @@
+from app.routes import flipbooks
+
+
+def _png(i):
+    return ("frames", (f"{i}.png", b"\x89PNG\r\n\x1a\n" + bytes([i]) * 16, "image/png"))
+
+
+def _frame_numbers(client, headers, flipbook_id):
+    page = client.get(f"/flipbooks/{flipbook_id}/frames?limit=500", headers=headers).json()
+    return [f["frame_number"] for f in page["frames"]]
+
+
+def test_conflicting_upload_stores_nothing(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(flipbooks, "FRAME_BATCH_SIZE", 2)
+    flipbook = client.post("/flipbooks", json={"title": "Batches"}, headers=auth_headers).json()
+    url = f"/flipbooks/{flipbook['id']}/frames"
+    client.post(url, files=[_png(0)], data={"start_frame": "5"}, headers=auth_headers)
+
+    # frames 0..5 would span three batches; 5 is taken
+    response = client.post(url, files=[_png(i) for i in range(6)], data={"start_frame": "0"}, headers=auth_headers)
+    assert response.status_code == 409
+    assert _frame_numbers(client, auth_headers, flipbook["id"]) == [5]
+
+
+def test_negative_start_frame_is_rejected(client, auth_headers):
+    flipbook = client.post("/flipbooks", json={"title": "Negative"}, headers=auth_headers).json()
+    response = client.post(
+        f"/flipbooks/{flipbook['id']}/frames", files=[_png(1)], data={"start_frame": "-3"}, headers=auth_headers
+    )
+    assert response.status_code == 422
+    assert _frame_numbers(client, auth_headers, flipbook["id"]) == []
+
+
+def test_batches_commit_together(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(flipbooks, "FRAME_BATCH_SIZE", 2)
+    flipbook = client.post("/flipbooks", json={"title": "Together"}, headers=auth_headers).json()
+    response = client.post(f"/flipbooks/{flipbook['id']}/frames", files=[_png(i) for i in range(5)], headers=auth_headers)
+    assert response.json()["frames_stored"] == 5
+    assert _frame_numbers(client, auth_headers, flipbook["id"]) == [0, 1, 2, 3, 4]
+
+
+def test_conflict_in_a_later_batch_rolls_back_earlier_ones(client, auth_headers, monkeypatch):
+    # a concurrent upload can take the range after the up-front check
+    monkeypatch.setattr(flipbooks, "FRAME_BATCH_SIZE", 2)
+    monkeypatch.setattr(flipbooks.crud, "frames_exist", lambda *args: False)
+    flipbook = client.post("/flipbooks", json={"title": "Race"}, headers=auth_headers).json()
+    url = f"/flipbooks/{flipbook['id']}/frames"
+    client.post(url, files=[_png(0)], data={"start_frame": "5"}, headers=auth_headers)
+
+    response = client.post(url, files=[_png(i) for i in range(6)], data={"start_frame": "0"}, headers=auth_headers)
+    assert response.status_code == 409
+    assert _frame_numbers(client, auth_headers, flipbook["id"]) == [5]
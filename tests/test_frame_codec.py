@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from app.services import frame_codec
+
+
+def _stroke(x, y, n=5, **extra):
+    return {"points": [{"x": x + i, "y": y} for i in range(n)], **extra}
+
+
+AWKWARD = [
+    {"move": [0, 1, 1]},   # a stroke that looks like a move reference
+    {"add": _stroke(0, 0)},  # ... or like an add
+    3,                      # a bare integer
+    [{"x": 1, "y": 2}, {"x": 3, "y": 4}],  # points without a wrapper dict
+]
+
+
+def _round_trip(prev, cur):
+    delta = json.loads(frame_codec.dumps(frame_codec.diff_frames(prev, cur, base=0)))
+    return frame_codec.apply_delta(prev, delta)
+
+
+def test_kept_moved_added_and_removed_strokes():
+    prev = {"width": 100, "strokes": [_stroke(0, 0), _stroke(10, 10, color="red"), _stroke(20, 20)]}
+    cur = {"width": 100, "strokes": [_stroke(0, 0), _stroke(13, 8, color="red"), _stroke(50, 50)]}
+    delta = frame_codec.diff_frames(prev, cur, base=0)
+    assert delta["strokes"][:2] == [0, {"move": [1, 3, -2]}]
+    assert _round_trip(prev, cur) == cur
+
+
+@pytest.mark.parametrize("stroke", AWKWARD)
+def test_added_strokes_cannot_pass_for_references(stroke):
+    prev = {"strokes": [_stroke(0, 0)]}
+    cur = {"strokes": [_stroke(0, 0), stroke]}
+    assert _round_trip(prev, cur) == cur
+
+
+def test_unknown_reference_is_rejected():
+    with pytest.raises(ValueError):
+        frame_codec.apply_delta({"strokes": []}, {"strokes": [{"bogus": 1}]})
+
+
+def test_uploaded_awkward_frames_read_back(client, auth_headers):
+    flipbook = client.post("/flipbooks", json={"title": "Awkward"}, headers=auth_headers).json()
+    base = [_stroke(10 * i, 10 * i, n=40) for i in range(10)]
+    frames = [{"strokes": base}] + [{"strokes": base + [stroke]} for stroke in AWKWARD]
+    files = [("frames", (f"{i}.json", json.dumps(f).encode(), "application/json")) for i, f in enumerate(frames)]
+    client.post(f"/flipbooks/{flipbook['id']}/frames", files=files, headers=auth_headers)
+
+    for n, frame in enumerate(frames):
+        response = client.get(f"/flipbooks/{flipbook['id']}/frames/{n}", headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json() == frame
+    delta = client.get(f"/flipbooks/{flipbook['id']}/frames/1?delta=true", headers=auth_headers).json()
+    assert delta["base"] == 0
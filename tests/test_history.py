@@ -0,0 +1,46 @@
+def test_drawing_history_pages_on_the_async_session(client, auth_headers):
+    ids = [
+        client.post("/drawings", files={"file": (f"{i}.png", bytes([i]) * 32, "image/png")}, headers=auth_headers).json()["id"]
+        for i in range(5)
+    ]
+    seen, cursor = [], None
+    while True:
+        url = "/drawings?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url, headers=auth_headers).json()
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen[: len(ids)] == ids[::-1]
+
+
+def test_ai_results_history(client, auth_headers):
+    from app.services.write_behind import ai_result_writer
+
+    points = [{"x": x, "y": y} for x, y in [(0, 0), (100, 0), (100, 100), (0, 100), (0, 0), (50, 0)]]
+    client.post("/ai/perfect-drawing", json={"points": points}, headers=auth_headers)
+    ai_result_writer.flush()
+    page = client.get("/ai/results?limit=1", headers=auth_headers).json()
+    assert len(page["items"]) == 1
+
+
+def test_history_routes_never_open_a_sync_session(client, auth_headers):
+    from datetime import timedelta
+
+    from app.auth.auth import create_token, principal_cache
+    from app.database import get_db
+
+    def no_sync_session():
+        raise AssertionError("sync session requested")
+
+    legacy = create_token({"sub": "TEST_USER"}, timedelta(minutes=5))  # no "uid" claim
+    client.app.dependency_overrides[get_db] = no_sync_session
+    try:
+        for headers in (auth_headers, {"Authorization": f"Bearer {legacy}"}):
+            principal_cache.clear()  # the lookup itself runs on the async session
+            for url in ("/drawings", "/ai/results"):
+                assert client.get(url, headers=headers).status_code == 200
+            # and again from the principal cache
+            assert client.get("/drawings", headers=auth_headers).status_code == 200
+    finally:
+        client.app.dependency_overrides.pop(get_db)
@@ -0,0 +1,36 @@
+import numpy as np
+
+from app.services import fast_json
+
+# a straight stroke: recognized as a line, which no engine's smooth_points
+# snaps, so the response hands the stroke back
+LINE = [{"x": float(x), "y": 0.0, "pressure": 0.5, "t": 10.0 * x} for x in range(8)]
+SQUARE = [{"x": float(x), "y": float(y), "pressure": 0.5} for x, y in
+          [(0, 0), (50, 0), (100, 0), (100, 50), (100, 100), (50, 100), (0, 100), (0, 50), (0, 0)]]
+
+
+def test_unsnapped_stroke_comes_back_as_sent(client):
+    body = client.post("/ai/perfect-drawing", json={"points": LINE}).json()
+    assert body["recognized_as"] == "line"
+    assert body["smoothed_points"] == LINE
+
+
+def test_snapped_stroke_has_plain_points(client):
+    body = client.post("/ai/perfect-drawing", json={"points": SQUARE}).json()
+    assert body["recognized_as"] != "line"
+    assert all(set(p) == {"x", "y"} for p in body["smoothed_points"])
+
+
+def test_batch_and_scene_keep_extra_keys(client):
+    payload = {"strokes": [{"points": LINE}, {"points": SQUARE}]}
+    results = client.post("/ai/perfect-drawing/batch", json=payload).json()["results"]
+    assert results[0]["smoothed_points"] == LINE
+
+    shapes = client.post("/ai/perfect-drawing/scene", json=payload).json()["shapes"]
+    assert shapes[0]["strokes"] == [0]
+    assert shapes[0]["smoothed_points"] == LINE
+
+
+def test_points_json_matches_orjson():
+    arr = np.array([[0.5, -1.0], [1e-7, 3e12]])
+    assert fast_json.points_json(arr) == b'[{"x":0.5,"y":-1.0},{"x":1e-7,"y":3000000000000.0}]'
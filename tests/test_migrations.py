@@ -0,0 +1,79 @@
+import os
+
+import pytest
+import sqlalchemy as sa
+from alembic import command
+from alembic.config import Config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _alembic():
+    config = Config()
+    config.set_main_option("script_location", os.path.join(ROOT, "alembic"))
+    return config
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    # a database at the initial revision, before normalized lookups
+    url = f"sqlite:///{tmp_path / 'migrate.sqlite3'}"
+    monkeypatch.setenv("DATABASE_URL", url)
+    command.upgrade(_alembic(), "f032d5f6656f")
+    return sa.create_engine(url)
+
+
+def _add_users(engine, users):
+    with engine.begin() as conn:
+        conn.execute(
+            sa.text("INSERT INTO users (id, name, email, username, password) VALUES (:id, 'n', :email, :username, 'h')"),
+            [{"id": id_, "email": email, "username": username} for id_, email, username in users],
+        )
+
+
+def _revision(engine):
+    with engine.connect() as conn:
+        return conn.execute(sa.text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def test_user_backfill_folds_unicode_like_lookups(database):
+    _add_users(database, [("1", "Émile@X.com", " Émile "), ("2", "ÖZ@x.com", "ÖZ")])
+
+    command.upgrade(_alembic(), "head")
+    with database.connect() as conn:
+        rows = conn.execute(sa.text("SELECT username_normalized, email FROM users ORDER BY id")).all()
+    assert [tuple(row) for row in rows] == [("émile", "émile@x.com"), ("öz", "öz@x.com")]
+
+
+def test_backfill_runs_in_batches(database):
+    users = [(f"{i:05d}", f"User{i}@X.com", f"Ünïcode{i}") for i in range(2500)]
+    _add_users(database, users)
+
+    command.upgrade(_alembic(), "head")
+    with database.connect() as conn:
+        rows = conn.execute(sa.text("SELECT id, username_normalized, email FROM users ORDER BY id")).all()
+    assert [tuple(row) for row in rows] == [(id_, username.lower(), email.lower()) for id_, email, username in users]
+
+
+def test_ascii_case_duplicates_stop_the_upgrade_before_any_change(database):
+    _add_users(database, [("1", "a@x.com", "alice"), ("2", "A@X.com", "bob")])
+
+    with pytest.raises(RuntimeError, match="email 'a@x.com'"):
+        command.upgrade(_alembic(), "head")
+    assert _revision(database) == "f032d5f6656f"
+    with database.connect() as conn:
+        assert "username_normalized" not in [c["name"] for c in sa.inspect(conn).get_columns("users")]
+
+
+def test_unicode_case_duplicates_are_reported_before_the_backfill(database):
+    # SQL lower() keeps these apart, Python's lower() doesn't
+    _add_users(database, [("1", "öz@x.com", "ömer"), ("2", "ÖZ@x.com", "ömer2"), ("3", "c@x.com", "ÖMER")])
+
+    with pytest.raises(RuntimeError) as error:
+        command.upgrade(_alembic(), "head")
+    assert "email 'öz@x.com' (users 1, 2)" in str(error.value)
+    assert "username_normalized 'ömer' (users 1, 3)" in str(error.value)
+    assert _revision(database) == "c41d7e9a2f58"
+    with database.connect() as conn:
+        # as 3b8e1c2d9a47 left it (SQL lower), the backfill wrote nothing
+        assert conn.execute(sa.text("SELECT email FROM users WHERE id = '2'")).scalar() == "Öz@x.com"
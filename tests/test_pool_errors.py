@@ -0,0 +1,89 @@
+import asyncio
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from starlette.requests import Request
+
+from app.auth import hashing
+from app.routes import ai_drawing, routes
+from app.services import recognition, stroke_wire
+from app.services.process_pool import BoundedProcessPool
+
+
+async def _timed_out(*args, **kwargs):
+    raise asyncio.TimeoutError
+
+
+def test_pool_timeouts_share_one_status(client, auth_headers, monkeypatch):
+    # auth_headers: test_user exists, so /login gets as far as the hashing pool
+    monkeypatch.setattr(recognition.recognition_pool, "run", _timed_out)
+    monkeypatch.setattr(hashing.hashing_pool, "run", _timed_out)
+
+    points = [{"x": float(x), "y": float(x * x % 17)} for x in range(9)]
+    recognition_response = client.post("/ai/perfect-drawing", json={"points": points})
+    login_response = client.post("/login", data={"username": "test_user", "password": "whatever"})
+    assert recognition_response.status_code == login_response.status_code == 503
+    assert recognition_response.headers["retry-after"] == login_response.headers["retry-after"]
+
+
+def _request(forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": ("10.0.0.1", 5000)})
+
+
+@pytest.mark.parametrize("header, forwarded, expected", [
+    ("", "203.0.113.9", "10.0.0.1"),                        # not configured: the peer
+    ("X-Forwarded-For", "203.0.113.9", "203.0.113.9"),
+    ("X-Forwarded-For", "1.2.3.4, 203.0.113.9", "203.0.113.9"),  # the proxy's entry, not the client's
+    ("X-Forwarded-For", None, "10.0.0.1"),
+])
+def test_client_ip(monkeypatch, header, forwarded, expected):
+    monkeypatch.setattr(routes, "CLIENT_IP_HEADER", header)
+    assert routes._client_ip(_request(forwarded)) == expected
+
+
+def _die():
+    os._exit(1)
+
+
+def test_broken_executor_is_shut_down(monkeypatch):
+    shut_down = []
+    original = ProcessPoolExecutor.shutdown
+
+    def shutdown(executor, *args, **kwargs):
+        shut_down.append(executor)
+        return original(executor, *args, **kwargs)
+
+    monkeypatch.setattr(ProcessPoolExecutor, "shutdown", shutdown)
+    pool = BoundedProcessPool(max_workers=1, max_pending=4, timeout=30, start_method="fork")
+
+    async def scenario():
+        with pytest.raises(BrokenProcessPool):
+            await pool.run(_die)
+        return await pool.run(abs, -3)
+
+    try:
+        first = pool._get_executor()
+        assert asyncio.run(scenario()) == 3
+        assert shut_down == [first]
+        assert pool._executor is not first
+    finally:
+        pool.shutdown()
+
+
+def test_batch_stroke_limit(client, monkeypatch):
+    monkeypatch.setattr(ai_drawing, "MAX_BATCH_STROKES", 2)
+    stroke = {"points": [{"x": float(x), "y": float(x % 3)} for x in range(8)]}
+    for path in ("/ai/perfect-drawing/batch", "/ai/perfect-drawing/scene"):
+        assert client.post(path, json={"strokes": [stroke] * 3}).status_code == 413
+        assert client.post(path, json={"strokes": [stroke] * 2}).status_code == 200
+
+    # the binary header's count is checked before the strokes are read
+    body = struct.pack("<I", 1_000_000)
+    response = client.post(
+        "/ai/perfect-drawing/batch", content=body, headers={"content-type": stroke_wire.F32},
+    )
+    assert response.status_code == 413
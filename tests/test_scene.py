@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from app.services import recognition
+from app.services.scene_grouping import group_strokes, join_group
+
+
+def _segment(a, b, n=20):
+    t = np.linspace(0, 1, n)[:, None]
+    return np.asarray(a, float) + t * (np.asarray(b, float) - np.asarray(a, float))
+
+
+def _circle(cx, cy, r, n=60):
+    theta = np.linspace(0, 2 * np.pi, n)
+    return np.c_[cx + r * np.cos(theta), cy + r * np.sin(theta)]
+
+
+RECTANGLE = [
+    _segment((0, 0), (200, 0)), _segment((200, 0), (200, 100)),
+    _segment((200, 100), (0, 100)), _segment((0, 100), (0, 0)),
+]
+ARROW = [_segment((0, 0), (300, 0), 40), _segment((300, 0), (270, -25), 8), _segment((300, 0), (270, 25), 8)]
+CIRCLE_AND_LINE = [_circle(100, 100, 50), _segment((150, 100), (300, 100))]
+
+
+def _payload(strokes):
+    return {"strokes": [{"points": [{"x": x, "y": y} for x, y in arr.tolist()]} for arr in strokes]}
+
+
+# ---------------- GROUPING ---------------- #
+
+def test_touching_strokes_are_grouped():
+    assert group_strokes(RECTANGLE) == [[0, 1, 2, 3]]
+    assert group_strokes(ARROW) == [[0, 1, 2]]
+
+
+def test_distant_strokes_stay_apart():
+    strokes = [_segment((0, 0), (50, 0)), _segment((500, 500), (550, 500)), _segment((52, 0), (100, 0))]
+    assert group_strokes(strokes) == [[0, 2], [1]]
+
+
+def test_groups_over_max_group_are_split():
+    chain = [_segment((60 * i, 0), (60 * i + 60, 0)) for i in range(8)]
+    assert group_strokes(chain, max_group=6) == [[i] for i in range(8)]
+
+
+def test_empty_strokes_are_their_own_group():
+    strokes = [np.zeros((0, 2)), *RECTANGLE[:2]]
+    assert group_strokes(strokes) == [[0], [1, 2]]
+
+
+def test_huge_stroke_joins_small_ones():
+    # the diagonal spans far more grid cells than SCENE_GRID_MAX_CELLS
+    strokes = [_segment((100 * i, 5), (100 * i + 5, 5), 4) for i in range(20)]
+    strokes.append(_segment((0, 0), (2e6, 2e6), 2))
+    assert group_strokes(strokes) == [[0, 20], *([i] for i in range(1, 20))]
+
+
+# ---------------- JOINING ---------------- #
+
+def test_join_walks_through_every_stroke():
+    order, joined = join_group(RECTANGLE, [0, 1, 2, 3])
+    assert sorted(order) == [0, 1, 2, 3]
+    assert len(joined) == sum(len(arr) for arr in RECTANGLE)
+    # one continuous outline: no jump longer than a stroke's own sampling
+    assert np.hypot(*np.diff(joined, axis=0).T).max() < 15
+
+
+def test_join_goes_out_and_back_through_a_junction():
+    stem = _segment((0, 0), (0, 200), 21)
+    bar = _segment((-50, 200), (50, 200), 11)  # the stem ends on its middle
+    order, joined = join_group([stem, bar], [0, 1])
+    assert order == [0, 1]
+    # out to one end of the bar, then back across the whole of it
+    assert len(joined) == len(stem) + 6 + len(bar)
+    assert joined[-1].tolist() == [-50.0, 200.0]
+    assert np.hypot(*np.diff(joined, axis=0).T).max() < 15
+
+
+def test_join_skips_empty_strokes():
+    assert join_group([np.zeros((0, 2))], [0])[0] == []
+
+
+# ---------------- ROUTE ---------------- #
+
+@pytest.fixture
+def features_engine(monkeypatch):
+    monkeypatch.setattr(recognition, "SHAPE_ENGINE", "features")
+
+
+def _shapes(client, strokes):
+    response = client.post("/ai/perfect-drawing/scene", json=_payload(strokes))
+    assert response.status_code == 200
+    return [(shape["strokes"], shape["recognized_as"]) for shape in response.json()["shapes"]]
+
+
+def test_scene_joins_multi_stroke_shapes(client, features_engine):
+    assert _shapes(client, RECTANGLE) == [([0, 1, 2, 3], "rectangle")]
+    assert _shapes(client, ARROW) == [([0, 1, 2], "arrow")]
+
+
+def test_scene_splits_groups_that_are_no_shape(client, features_engine):
+    assert _shapes(client, CIRCLE_AND_LINE) == [([0], "circle"), ([1], "line")]
+
+
+def test_scene_recognizes_stroke_by_stroke_under_local(client):
+    assert recognition.SHAPE_ENGINE == "local"
+    shapes = _shapes(client, CIRCLE_AND_LINE)
+    assert shapes == [([0], "circle"), ([1], "line")]
+    assert [strokes for strokes, _ in _shapes(client, ARROW)] == [[0], [1], [2]]
+
+
+def test_scene_accepts_an_empty_canvas(client):
+    assert _shapes(client, []) == []
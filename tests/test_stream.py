@@ -0,0 +1,44 @@
+from app.routes import ai_drawing
+
+
+def _points(n, start=0):
+    return [{"x": float(i), "y": float(i % 7)} for i in range(start, start + n)]
+
+
+def test_provisional_counts_points(client):
+    with client.websocket_connect("/ai/perfect-drawing/stream") as ws:
+        ws.send_json({"points": _points(8)})
+        message = ws.receive_json()
+        assert message["type"] == "provisional"
+        assert message["n_points"] == 8
+        assert "points" not in message
+
+
+def test_invalid_frames_get_errors_not_a_closed_socket(client):
+    with client.websocket_connect("/ai/perfect-drawing/stream") as ws:
+        ws.send_text("{not json")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_bytes(b"\x00\x01")
+        assert ws.receive_json()["type"] == "error"
+        ws.send_json({"points": [{"x": "nan", "y": 1}]})
+        assert ws.receive_json()["type"] == "error"
+
+        # the connection is still usable
+        ws.send_json({"points": _points(8)})
+        assert ws.receive_json()["type"] == "provisional"
+
+
+def test_stroke_length_is_capped(client, monkeypatch):
+    monkeypatch.setattr(ai_drawing, "STREAM_MAX_POINTS", 20)
+    with client.websocket_connect("/ai/perfect-drawing/stream") as ws:
+        ws.send_json({"points": _points(15)})
+        assert ws.receive_json()["n_points"] == 15
+        ws.send_json({"points": _points(10, 15)})
+        error = ws.receive_json()
+        assert error["type"] == "error" and "20" in error["detail"]
+
+        # the rejected points were not kept
+        ws.send_json({"points": _points(3, 15)})
+        assert ws.receive_json()["n_points"] == 18
+        ws.send_json({"end": True})
+        assert ws.receive_json()["type"] == "final"
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from app.services import stroke_wire
+
+
+def _square(x, y, side=40, n=10):
+    t = np.linspace(0, 1, n, endpoint=False)
+    edges = [(x + side * t, np.full(n, y)), (np.full(n, x + side), y + side * t),
+             (x + side * (1 - t), np.full(n, y + side)), (np.full(n, x), y + side * (1 - t))]
+    return np.vstack([np.c_[ex, ey] for ex, ey in edges] + [[[x, y]]]).astype(np.float32)
+
+
+@pytest.mark.parametrize("content_type", stroke_wire.CONTENT_TYPES)
+def test_batch_results_round_trip(content_type):
+    arrays = [_square(0, 0), _square(100, 100, n=4), np.zeros((0, 2), np.float32)]
+    results = [("square", 0.92, None), ("rectangle", 0.88, None), ("unknown", 0.0, None)]
+    body = stroke_wire.encode_batch(arrays, content_type, results)
+
+    strokes, decoded = stroke_wire.decode_batch(body, content_type, with_results=True)
+    assert decoded == [("square", 0.92), ("rectangle", 0.88), ("unknown", 0.0)]
+    assert [len(s) for s in strokes] == [len(a) for a in arrays]
+    # a request body has no results section
+    with pytest.raises(ValueError):
+        stroke_wire.decode_batch(body, content_type)
+
+
+def test_non_finite_f32_stroke_is_rejected():
+    body = np.array([[0, 0], [np.nan, 1], [2, np.inf]], dtype="<f4").tobytes()
+    with pytest.raises(ValueError):
+        stroke_wire.decode_stroke(body, stroke_wire.F32)
+
+
+def test_large_binary_batch_keeps_results_out_of_headers(client):
+    arrays = [_square(50 * (i % 20), 50 * (i // 20)) for i in range(400)]
+    response = client.post(
+        "/ai/perfect-drawing/batch",
+        content=stroke_wire.encode_batch(arrays, stroke_wire.F32),
+        headers={"Content-Type": stroke_wire.F32, "Accept": stroke_wire.F32},
+    )
+    assert response.status_code == 200
+    assert "x-recognized-as" not in response.headers
+    assert sum(len(k) + len(v) for k, v in response.headers.items()) < 1024
+    strokes, results = stroke_wire.decode_batch(response.content, stroke_wire.F32, with_results=True)
+    assert len(strokes) == len(results) == 400
+    # the same stroke shape everywhere on the canvas, so one answer for all
+    assert len(set(results)) == 1 and results[0][0] != "unknown"
+
+
+def test_single_stroke_results_stay_in_headers(client):
+    response = client.post(
+        "/ai/perfect-drawing",
+        content=stroke_wire.encode_stroke(_square(0, 0), stroke_wire.F32),
+        headers={"Content-Type": stroke_wire.F32, "Accept": stroke_wire.F32},
+    )
+    assert response.headers["x-recognized-as"] not in ("", "unknown")
+    assert float(response.headers["x-confidence"]) > 0
+
+
+def test_non_finite_points_are_rejected(client):
+    body = np.array([[0, 0], [np.nan, 1]] * 4, dtype="<f4").tobytes()
+    response = client.post("/ai/perfect-drawing", content=body, headers={"Content-Type": stroke_wire.F32})
+    assert response.status_code == 400
+
+    json_body = '{"points": [{"x": 0, "y": 0}, {"x": NaN, "y": 1}, {"x": 2, "y": Infinity}]}'
+    response = client.post("/ai/perfect-drawing", content=json_body, headers={"Content-Type": "application/json"})
+    assert response.status_code == 422
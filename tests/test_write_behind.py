@@ -0,0 +1,96 @@
+import numpy as np
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.services.write_behind import WriteBehindQueue
+
+
+class _Table:
+    # insert_rows stand-in: rejects the whole statement if any row is bad
+    def __init__(self, down_for=0):
+        self.rows = []
+        self.statements = 0
+        self.down_for = down_for  # statements failing as if the database were down
+
+    def insert(self, db, rows):
+        self.statements += 1
+        if self.statements <= self.down_for:
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        if any(row["bad"] for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("foreign key constraint failed"))
+        self.rows.extend(rows)
+
+
+def _to_row(entry):
+    if entry == "unconvertible":
+        raise TypeError(entry)
+    return {"id": entry, "bad": entry % 7 == 3}
+
+
+def _queue(table, **kwargs):
+    return WriteBehindQueue(table.insert, to_row=_to_row, flush_size=100, retry_delay=0, **kwargs)
+
+
+def test_only_offending_rows_are_dropped():
+    table = _Table()
+    queue = _queue(table)
+    entries = list(range(50)) + ["unconvertible"]
+    for entry in entries:
+        queue.put(entry)
+    queue.close()
+
+    bad = {i for i in range(50) if i % 7 == 3}
+    assert sorted(row["id"] for row in table.rows) == [i for i in range(50) if i not in bad]
+    assert queue.stats()["failed_rows"] == len(bad) + 1
+    assert queue.stats()["flushed_rows"] == 50 - len(bad)
+
+
+def test_clean_batch_is_one_statement():
+    table = _Table()
+    queue = WriteBehindQueue(table.insert, to_row=lambda i: {"id": i, "bad": False}, flush_size=100)
+    for i in range(20):
+        queue.put(i)
+    queue.close()
+    assert table.statements == 1
+    assert len(table.rows) == 20
+
+
+def test_database_down_fails_the_batch_once(caplog):
+    table = _Table(down_for=10)
+    queue = _queue(table)
+    for i in range(40):
+        queue.put(i * 7)  # all good rows
+    queue.close()
+
+    # the batch and one retry, not a bisection down to every row
+    assert table.statements == 2
+    assert queue.stats()["failed_rows"] == 40
+    assert queue.stats()["flushed_rows"] == 0
+    assert len([r for r in caplog.records if r.levelname == "ERROR"]) == 1
+
+
+def test_batch_is_retried_after_a_transient_error():
+    table = _Table(down_for=1)
+    queue = _queue(table)
+    for i in range(40):
+        queue.put(i)
+    queue.close()
+
+    bad = {i for i in range(40) if i % 7 == 3}
+    assert sorted(row["id"] for row in table.rows) == [i for i in range(40) if i not in bad]
+    assert queue.stats()["failed_rows"] == len(bad)
+
+
+def test_queue_is_bounded_by_bytes():
+    table = _Table()
+    queue = WriteBehindQueue(
+        table.insert, to_row=lambda arr: {"id": len(arr), "bad": False},
+        flush_size=100, flush_interval=60, max_bytes=10_000, sizeof=lambda arr: arr.nbytes,
+    )
+    assert queue.put(np.zeros((400, 2)))       # 6400 bytes
+    assert not queue.put(np.zeros((400, 2)))   # would make 12800
+    assert queue.put(np.zeros((100, 2)))       # 1600 more still fits
+    assert queue.stats()["queued_bytes"] == 8000
+    assert queue.stats()["dropped"] == 1
+    queue.close()
+    assert queue.stats()["queued_bytes"] == 0
+    assert len(table.rows) == 2